@@ -2,11 +2,17 @@ from flask import Flask
 from app.config import Config
 
 def create_app():
+    """Crear la aplicación. No imprime ni abre conexiones: se puede precargar
+    en el proceso maestro del servidor WSGI antes de hacer fork de los workers."""
     app = Flask(__name__)
     
     # ✅ Configuración desde .env (a través de Config)
     app.config['SECRET_KEY'] = Config.SECRET_KEY
     
+    # Pool de conexiones MySQL: una conexión por petición
+    from app import db
+    db.init_app(app)
+    
     # Registrar blueprints
     from app.controllers import auth, dashboard
     from app.controllers import almacen
@@ -29,10 +35,6 @@ def create_app():
     app.register_blueprint(despachos.despachos_bp)
     app.register_blueprint(reportes.reportes_bp)
     
-    print("✅ App Flask creada exitosamente")
-    print(f"   Base de datos: {Config.MYSQL_DB}")
-    print(f"   Host: {Config.MYSQL_HOST}")
-    
     return app
 
 
@@ -0,0 +1,104 @@
+"""Asignación automática de inventario a líneas de despacho (FIFO / FEFO).
+
+Un artículo es la combinación marca + categoría: cada recepción registra su
+propio Producto (lote, con su fecha_fabricacion), así que un mismo artículo
+puede estar repartido en varios productos y estantes. La disponibilidad de
+todos los artículos pedidos se carga con una sola consulta, ya ordenada según
+la política y descontando lo reservado por otros despachos (app/reservas.py);
+luego se asigna en memoria tomando de la primera fila con saldo y pasando a la
+siguiente cuando no alcanza.
+"""
+from collections import deque
+
+from app.config import Config
+from app.reservas import DISPONIBLE
+
+# Orden de salida de cada política. El orden de ingreso es id_inventario (se asigna
+# al crear la línea y no cambia): fecha_modificacion se reescribe en cada salida o
+# ajuste y una línea recién despachada en parte pasaría a ser la más "nueva".
+POLITICAS = {
+    # Lo que entró primero sale primero
+    'FIFO': 'inv.id_inventario',
+    # El lote más antiguo (fecha de fabricación) sale primero
+    'FEFO': 'p.fecha_fabricacion IS NULL, p.fecha_fabricacion, inv.id_inventario'
+}
+
+
+def cargar_disponibilidad(cursor, id_proveedor, productos, politica=None):
+    """Índice de disponibilidad de los artículos de `productos` para una empresa.
+
+    Devuelve (articulos, disponibilidad): articulos mapea id_producto pedido →
+    artículo y disponibilidad mapea artículo → deque([[id_inventario, id_producto, saldo], ...])
+    en orden de salida.
+    """
+    productos = sorted(set(productos))
+    if not productos:
+        return {}, {}
+
+    orden = POLITICAS[politica or Config.ASIGNACION_POLITICA]
+    marcadores = ', '.join(['%s'] * len(productos))
+    cursor.execute(f"""
+        SELECT pr.id_producto AS pedido, p.marca, p.id_categoria_producto,
+            inv.id_inventario, inv.id_producto, {DISPONIBLE} AS disponible
+        FROM Producto pr
+        INNER JOIN Producto p ON p.marca = pr.marca AND p.id_categoria_producto = pr.id_categoria_producto
+        INNER JOIN Inventario inv ON inv.id_producto = p.id_producto
+        LEFT JOIN Reserva_Inventario r ON inv.id_inventario = r.id_inventario
+        WHERE pr.id_producto IN ({marcadores})
+          AND inv.id_proveedor = %s
+          AND inv.estado = 'Disponible'
+          AND {DISPONIBLE} > 0
+        ORDER BY {orden}
+    """, productos + [id_proveedor])
+
+    articulos = {}
+    disponibilidad = {}
+    vistos = set()
+    for fila in cursor.fetchall():
+        articulo = (fila['marca'], fila['id_categoria_producto'])
+        articulos[fila['pedido']] = articulo
+        filas = disponibilidad.setdefault(articulo, deque())
+        # Un inventario aparece una vez por cada producto pedido del mismo artículo
+        if fila['id_inventario'] not in vistos:
+            vistos.add(fila['id_inventario'])
+            filas.append([fila['id_inventario'], fila['id_producto'], fila['disponible']])
+    return articulos, disponibilidad
+
+
+def asignar(filas, cantidad):
+    """Tomar `cantidad` de las filas en orden; devuelve ([(id_inventario, id_producto, cantidad)], faltante).
+
+    Descuenta el saldo de las filas usadas y descarta las agotadas, así varias
+    líneas del mismo artículo no toman dos veces las mismas unidades y cada
+    fila se recorre una sola vez.
+    """
+    asignaciones = []
+    while cantidad > 0 and filas:
+        fila = filas[0]
+        tomar = min(fila[2], cantidad)
+        fila[2] -= tomar
+        cantidad -= tomar
+        asignaciones.append((fila[0], fila[1], tomar))
+        if fila[2] <= 0:
+            filas.popleft()
+    return asignaciones, cantidad
+
+
+def asignar_lineas(cursor, id_proveedor, lineas, politica=None):
+    """Asignar inventario a [(id_producto, cantidad), ...].
+
+    Devuelve (asignaciones, faltantes): asignaciones es [(id_producto,
+    id_inventario, cantidad), ...] lista para Detalle_Despacho (una línea por
+    ubicación) y faltantes {id_producto: cantidad sin stock}.
+    """
+    articulos, disponibilidad = cargar_disponibilidad(cursor, id_proveedor, [p for p, _ in lineas], politica)
+
+    asignaciones = []
+    faltantes = {}
+    for id_producto, cantidad in lineas:
+        filas = disponibilidad.get(articulos.get(id_producto), deque())
+        tomadas, faltante = asignar(filas, cantidad)
+        asignaciones += [(producto, inventario, c) for inventario, producto, c in tomadas]
+        if faltante:
+            faltantes[id_producto] = faltantes.get(id_producto, 0) + faltante
+    return asignaciones, faltantes
@@ -0,0 +1,100 @@
+"""Búsqueda de texto con índices FULLTEXT (parser ngram de MySQL).
+
+El parser ngram parte el texto en fragmentos de 2 caracteres, así que una
+frase entre comillas en BOOLEAN MODE encuentra la palabra en cualquier
+posición, igual que LIKE '%termino%', pero usando el índice. MySQL mantiene
+los índices al insertar o editar filas; solo hay que crearlos una vez
+(flask inventarios indices-busqueda).
+"""
+import re
+
+INDICES = [
+    ('Producto', 'ft_producto_marca', 'marca'),
+    ('Categoria_Producto', 'ft_categoria_nombre', 'nombre_categoria'),
+    ('Proveedor', 'ft_proveedor_nombre', 'nombre_proveedor, empresa')
+]
+
+# Operadores de BOOLEAN MODE que no deben llegar desde el usuario
+_OPERADORES = re.compile(r'[+\-<>()~*"@]')
+
+# Largo mínimo de término que el índice ngram puede resolver (ngram_token_size)
+LARGO_MINIMO = 2
+
+
+def crear_indices(cursor, reconstruir=False):
+    """Crear los índices FULLTEXT que falten; con `reconstruir` también rehace los existentes"""
+    # Con el parser ngram InnoDB descarta todo token que contenga una palabra
+    # vacía de su lista por defecto ("a", "i", "de", "la", "en"...): la mayoría
+    # de los pares de letras de nombres en español no se indexarían y "pan" o
+    # "la" dejarían de encontrar lo que encontraba LIKE. La lista se lee al
+    # crear el índice, así que se desactiva para esta sesión antes del ALTER.
+    cursor.execute("SET SESSION innodb_ft_enable_stopword = OFF")
+    for tabla, indice, columnas in INDICES:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (tabla, indice))
+        if cursor.fetchone()[0]:
+            if not reconstruir:
+                continue
+            cursor.execute(f"ALTER TABLE {tabla} DROP INDEX {indice}")
+        cursor.execute(f"ALTER TABLE {tabla} ADD FULLTEXT INDEX {indice} ({columnas}) WITH PARSER ngram")
+        print(f"✅ Índice {indice} creado en {tabla}")
+
+
+def frase(termino):
+    """Término del usuario como frase exacta para MATCH ... IN BOOLEAN MODE"""
+    limpio = ' '.join(_OPERADORES.sub(' ', termino).split())
+    return f'"{limpio}"' if len(limpio) >= LARGO_MINIMO else None
+
+
+def condicion_producto(termino):
+    """Filtro (sql, params) por marca o categoría para consultas con alias p.
+
+    Cada subconsulta usa su propio índice FULLTEXT. Los términos de un solo
+    carácter no los resuelve el índice y se buscan como prefijo de la marca.
+    """
+    busqueda = frase(termino)
+    if not busqueda:
+        return " AND p.marca LIKE %s", [f'{termino.strip()}%']
+
+    sql = """ AND (
+            p.id_producto IN (
+                SELECT id_producto FROM Producto
+                WHERE MATCH(marca) AGAINST (%s IN BOOLEAN MODE)
+            )
+            OR p.id_categoria_producto IN (
+                SELECT id_categoria_producto FROM Categoria_Producto
+                WHERE MATCH(nombre_categoria) AGAINST (%s IN BOOLEAN MODE)
+            )
+        )"""
+    return sql, [busqueda, busqueda]
+
+
+def buscar_proveedores(cursor, termino):
+    """Proveedores por nombre o empresa, ordenados por relevancia.
+
+    Si el término es numérico también busca NIT que empiecen con él (un NIT
+    parcial sigue encontrando al proveedor); el NIT exacto va primero.
+    """
+    busqueda = frase(termino)
+    digitos = termino.strip() if termino.strip().isdigit() else None
+    nit = int(digitos) if digitos else None
+    nit_prefijo = f'{digitos}%' if digitos else None
+
+    if not busqueda:
+        cursor.execute("""
+            SELECT * FROM Proveedor
+            WHERE nombre_proveedor LIKE %s OR empresa LIKE %s OR CAST(nit AS CHAR) LIKE %s
+            ORDER BY (nit <=> %s) DESC, id_proveedor DESC
+        """, (f'{termino.strip()}%', f'{termino.strip()}%', nit_prefijo, nit))
+        return cursor.fetchall()
+
+    cursor.execute("""
+        SELECT *, MATCH(nombre_proveedor, empresa) AGAINST (%s) as relevancia
+        FROM Proveedor
+        WHERE MATCH(nombre_proveedor, empresa) AGAINST (%s IN BOOLEAN MODE)
+        OR CAST(nit AS CHAR) LIKE %s
+        ORDER BY (nit <=> %s) DESC, relevancia DESC, id_proveedor DESC
+    """, (termino, busqueda, nit_prefijo, nit))
+    return cursor.fetchall()
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from app.config import Config
+
+
+class CacheTTL:
+    """Caché en memoria con expiración por entrada e invalidación explícita.
+
+    Es por proceso: invalidar() limpia la copia del worker que atendió la
+    escritura; en los demás workers la entrada caduca al cumplirse el TTL.
+    Cada clave lleva una versión para que un cálculo que empezó antes de una
+    invalidación no vuelva a guardar datos viejos.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._datos = {}
+        self._versiones = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def consultar(self, clave):
+        """Devolver (encontrado, valor, versión); la versión se pasa a guardar()"""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada and entrada[0] > time.monotonic():
+                self.hits += 1
+                return True, entrada[1], None
+            self.misses += 1
+            return False, None, self._versiones.setdefault(clave, 0)
+
+    def guardar(self, clave, valor, version):
+        """Guardar un valor calculado, salvo que la clave se haya invalidado entretanto"""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if self._versiones.get(clave, 0) == version:
+                self._datos[clave] = (time.monotonic() + self.ttl, valor)
+
+    def invalidar(self, *claves):
+        """Descartar las claves indicadas (o todas si no se indica ninguna)"""
+        with self._lock:
+            for clave in claves or list(self._versiones):
+                self._datos.pop(clave, None)
+                self._versiones[clave] = self._versiones.get(clave, 0) + 1
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'ttl': self.ttl,
+                'entradas': len(self._datos),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0
+            }
+
+
+# Widgets del dashboard (claves = nombres de app.controllers.dashboard.WIDGETS)
+dashboard_cache = CacheTTL(Config.DASHBOARD_CACHE_TTL)
+
+# Widgets afectados por cada tipo de escritura
+WIDGETS_STOCK = ('stats', 'distribucion_almacenes', 'ocupacion_almacenes', 'alertas')
+WIDGETS_RECEPCIONES = ('stats', 'recepciones_despachos', 'alertas')
+WIDGETS_DESPACHOS = ('recepciones_despachos', 'alertas')
+
+
+def invalidar_dashboard(*widgets):
+    """Hook para las rutas de escritura: descartar los widgets que cambiaron"""
+    dashboard_cache.invalidar(*widgets)
@@ -0,0 +1,245 @@
+"""Colocación de recepciones en estantes.
+
+Cada Detalle_Ingreso lleva cuántas unidades ya se ubicaron
+(cantidad_asignada). El Pedido pasa a 'Asignado' recién cuando no le queda
+ninguna línea pendiente, sea que se coloque de a una línea o completo:
+
+    plan explícito   [(id_detalle_ingreso, id_estante, cantidad), ...]
+    automático       plan_automatico(): primero los estantes donde ya está el
+                     producto del mismo proveedor, después el que lo recibe
+                     entero con menos sobrante y por último los de más espacio
+
+colocar() aplica el plan en la transacción del cursor (dictionary=True) con
+un StockLedger, que escribe Inventario con un upsert por
+producto/estante/proveedor, y un UPDATE por conjunto de Detalle_Ingreso.
+El Pedido se bloquea primero, así dos operadores no colocan la misma línea.
+
+Para bases existentes, `flask movimientos colocacion` agrega la columna,
+une las líneas de Inventario repetidas y crea la clave única del upsert.
+"""
+from app.kpi import CREAR_TABLA as CREAR_KPI, subir_versiones
+from app.reservas import CREAR_TABLA as CREAR_RESERVAS
+from app.stock import StockLedger, CLAVE_UBICACION
+from app.utils.sql import tabla_valores
+
+COLUMNA = ('cantidad_asignada', "ALTER TABLE Detalle_Ingreso ADD COLUMN cantidad_asignada INT NOT NULL DEFAULT 0")
+
+# Líneas repetidas por producto/estante/proveedor y la línea que las absorbe (la más antigua)
+_REPETIDAS = """
+    CREATE TEMPORARY TABLE Inventario_Repetido (PRIMARY KEY (id_inventario))
+    SELECT inv.id_inventario, inv.stock_producto, g.conservar
+    FROM Inventario inv
+    INNER JOIN (
+        SELECT id_producto, id_estante, id_proveedor, MIN(id_inventario) AS conservar
+        FROM Inventario
+        WHERE id_proveedor IS NOT NULL
+        GROUP BY id_producto, id_estante, id_proveedor
+        HAVING COUNT(*) > 1
+    ) g ON inv.id_producto = g.id_producto AND inv.id_estante = g.id_estante
+       AND inv.id_proveedor = g.id_proveedor
+    WHERE inv.id_inventario <> g.conservar
+"""
+
+
+def preparar_esquema(cursor):
+    """Agregar cantidad_asignada, unir líneas repetidas y crear la clave única de Inventario"""
+    columna, ddl = COLUMNA
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = 'Detalle_Ingreso' AND column_name = %s
+    """, (columna,))
+    if not cursor.fetchone()[0]:
+        cursor.execute(ddl)
+        # Antes un pedido 'Asignado' se daba por colocado completo
+        cursor.execute("""
+            UPDATE Detalle_Ingreso di
+            INNER JOIN Pedido ped ON di.id_pedido = ped.id_pedido
+            SET di.cantidad_asignada = di.cantidad
+            WHERE ped.estado = 'Asignado'
+        """)
+        print(f"✅ Columna {columna} agregada a Detalle_Ingreso ({cursor.rowcount} líneas ya asignadas)")
+
+    indice, columnas = CLAVE_UBICACION
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = 'Inventario' AND index_name = %s
+    """, (indice,))
+    if cursor.fetchone()[0]:
+        return
+    unidas = unir_repetidas(cursor)
+    if unidas:
+        print(f"✅ {unidas} líneas de Inventario repetidas unidas a su ubicación")
+    cursor.execute(f"ALTER TABLE Inventario ADD UNIQUE KEY {indice} ({columnas})")
+    print(f"✅ Clave única {indice} creada en Inventario")
+
+
+def unir_repetidas(cursor):
+    """Sumar cada línea repetida a la más antigua de su ubicación y borrarla.
+
+    Los despachos y reservas que apuntaban a las borradas pasan a la que queda.
+    Devuelve la cantidad de líneas borradas.
+    """
+    cursor.execute(CREAR_RESERVAS)
+    cursor.execute(CREAR_KPI)
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS Inventario_Repetido")
+    cursor.execute(_REPETIDAS)
+    cursor.execute("SELECT COUNT(*) FROM Inventario_Repetido")
+    repetidas = cursor.fetchone()[0]
+    if repetidas:
+        cursor.execute("""
+            UPDATE Inventario inv
+            INNER JOIN (
+                SELECT conservar, SUM(stock_producto) AS stock
+                FROM Inventario_Repetido GROUP BY conservar
+            ) t ON inv.id_inventario = t.conservar
+            SET inv.estado = IF(t.stock > 0, 'Disponible', inv.estado),
+                inv.stock_producto = inv.stock_producto + t.stock
+        """)
+        cursor.execute("""
+            UPDATE Detalle_Despacho dd
+            INNER JOIN Inventario_Repetido d ON dd.id_inventario = d.id_inventario
+            SET dd.id_inventario = d.conservar
+        """)
+        cursor.execute("""
+            INSERT INTO Reserva_Inventario (id_inventario, cantidad)
+            SELECT d.conservar, SUM(r.cantidad)
+            FROM Inventario_Repetido d
+            INNER JOIN Reserva_Inventario r ON d.id_inventario = r.id_inventario
+            GROUP BY d.conservar
+            ON DUPLICATE KEY UPDATE cantidad = Reserva_Inventario.cantidad + VALUES(cantidad)
+        """)
+        cursor.execute("""
+            DELETE r FROM Reserva_Inventario r
+            INNER JOIN Inventario_Repetido d ON r.id_inventario = d.id_inventario
+        """)
+        cursor.execute("""
+            DELETE inv FROM Inventario inv
+            INNER JOIN Inventario_Repetido d ON inv.id_inventario = d.id_inventario
+        """)
+        subir_versiones(cursor, "inv.id_inventario IN (SELECT conservar FROM Inventario_Repetido)")
+    cursor.execute("DROP TEMPORARY TABLE Inventario_Repetido")
+    return repetidas
+
+
+def lineas_pedido(cursor, id_pedido):
+    """Bloquear un pedido 'Recibido' y devolver (pedido, {id_detalle_ingreso: línea con lo pendiente})"""
+    cursor.execute("""
+        SELECT id_pedido, estado, id_proveedor FROM Pedido WHERE id_pedido = %s FOR UPDATE
+    """, (id_pedido,))
+    pedido = cursor.fetchone()
+    if not pedido:
+        raise ValueError(f'No existe la recepción {id_pedido}')
+    if pedido['estado'] != 'Recibido':
+        raise ValueError('El pedido no está en estado Recibido')
+
+    cursor.execute("""
+        SELECT id_detalle_ingreso, id_producto, cantidad - cantidad_asignada AS pendiente
+        FROM Detalle_Ingreso
+        WHERE id_pedido = %s
+        ORDER BY id_detalle_ingreso
+        FOR UPDATE
+    """, (id_pedido,))
+    return pedido, {fila['id_detalle_ingreso']: fila for fila in cursor.fetchall()}
+
+
+def plan_automatico(cursor, lineas, id_proveedor, id_almacen=None):
+    """Repartir lo pendiente de cada línea en estantes con espacio libre.
+
+    Las líneas más grandes eligen primero. Lanza ValueError si no alcanza el
+    espacio; el UPDATE condicionado de Estante vuelve a controlar al escribir.
+    """
+    pendientes = sorted((l for l in lineas.values() if l['pendiente'] > 0), key=lambda l: -l['pendiente'])
+    if not pendientes:
+        return []
+
+    filtro, params = ("AND id_almacen = %s", [id_almacen]) if id_almacen else ("", [])
+    cursor.execute(f"""
+        SELECT id_estante, capacidad - capacidad_ocupada AS libre
+        FROM Estante
+        WHERE estado != 'Inutilizable' AND capacidad > capacidad_ocupada {filtro}
+    """, params)
+    libres = {fila['id_estante']: fila['libre'] for fila in cursor.fetchall()}
+
+    productos = sorted({l['id_producto'] for l in pendientes})
+    marcadores = ', '.join(['%s'] * len(productos))
+    cursor.execute(f"""
+        SELECT DISTINCT id_producto, id_estante
+        FROM Inventario
+        WHERE id_producto IN ({marcadores}) AND id_proveedor = %s AND stock_producto > 0
+        ORDER BY id_producto, id_estante
+    """, productos + [id_proveedor])
+    ubicados = {}
+    for fila in cursor.fetchall():
+        ubicados.setdefault(fila['id_producto'], []).append(fila['id_estante'])
+
+    plan = []
+    faltante = 0
+    for linea in pendientes:
+        restante = linea['pendiente']
+        for id_estante in _candidatos(libres, ubicados.get(linea['id_producto'], ()), restante):
+            cantidad = min(restante, libres[id_estante])
+            if cantidad <= 0:
+                continue
+            plan.append((linea['id_detalle_ingreso'], id_estante, cantidad))
+            libres[id_estante] -= cantidad
+            restante -= cantidad
+            if not restante:
+                break
+        faltante += restante
+    if faltante:
+        raise ValueError(f'No hay espacio libre para {faltante} unidades de la recepción'
+                         f'{" en el almacén seleccionado" if id_almacen else ""}')
+    return plan
+
+
+def _candidatos(libres, propios, cantidad):
+    """Estantes en orden de preferencia; el resto se ordena solo si hace falta"""
+    yield from (e for e in propios if e in libres)
+    entran = [e for e, libre in libres.items() if libre >= cantidad]
+    if entran:
+        yield min(entran, key=lambda e: (libres[e], e))
+    yield from sorted(libres, key=lambda e: (-libres[e], e))
+
+
+def colocar(cursor, id_pedido, id_persona, plan=None, id_almacen=None):
+    """Ubicar líneas de una recepción; sin plan se reparte todo lo pendiente.
+
+    Devuelve (movimientos, completo): `completo` indica que el pedido quedó
+    'Asignado' porque ya no le quedan unidades por ubicar.
+    """
+    pedido, lineas = lineas_pedido(cursor, id_pedido)
+    if plan is None:
+        plan = plan_automatico(cursor, lineas, pedido['id_proveedor'], id_almacen)
+    if not plan:
+        raise ValueError('La recepción no tiene unidades pendientes de asignar')
+
+    asignado = {}
+    for id_detalle, _, cantidad in plan:
+        if id_detalle not in lineas:
+            raise ValueError(f'La línea {id_detalle} no pertenece a la recepción {id_pedido}')
+        if cantidad <= 0:
+            raise ValueError('Las cantidades deben ser mayores a 0')
+        asignado[id_detalle] = asignado.get(id_detalle, 0) + cantidad
+    for id_detalle, cantidad in asignado.items():
+        pendiente = lineas[id_detalle]['pendiente']
+        if cantidad > pendiente:
+            raise ValueError(f'La línea {id_detalle} tiene {pendiente} unidades pendientes, se piden {cantidad}')
+
+    # Inventario (upsert), estantes (solo si caben), almacenes, movimientos y dashboard
+    ledger = StockLedger(cursor, id_persona)
+    for id_detalle, id_estante, cantidad in plan:
+        ledger.entrada(lineas[id_detalle]['id_producto'], id_estante, pedido['id_proveedor'],
+                       cantidad, 'Ingreso Inicial')
+    movimientos = ledger.aplicar()
+
+    valores, params = tabla_valores(('id', 'cantidad'), sorted(asignado.items()))
+    cursor.execute(f"""
+        UPDATE Detalle_Ingreso di
+        INNER JOIN ({valores}) v ON di.id_detalle_ingreso = v.id
+        SET di.cantidad_asignada = di.cantidad_asignada + v.cantidad
+    """, params)
+
+    completo = all(linea['pendiente'] == asignado.get(i, 0) for i, linea in lineas.items())
+    if completo:
+        cursor.execute("UPDATE Pedido SET estado = 'Asignado' WHERE id_pedido = %s", (id_pedido,))
+    return movimientos, completo
@@ -8,9 +8,51 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'mi-clave-super-secreta-123456')
     
+    # Servidor de desarrollo (run.py); en producción se usa wsgi.py
+    DEBUG = os.getenv('FLASK_DEBUG', '0') == '1'
+    
     # Credenciales de MySQL
     MYSQL_HOST = os.getenv('MYSQL_HOST', 'localhost')
     MYSQL_USER = os.getenv('MYSQL_USER', 'root')
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', 'grand batle124')
     MYSQL_DB = os.getenv('MYSQL_DB', 'sistema_administracion_almacenes_3')
-    MYSQL_PORT = int(os.getenv('MYSQL_PORT', '3306'))
\ No newline at end of file
+    MYSQL_PORT = int(os.getenv('MYSQL_PORT', '3306'))
+    
+    # Pool de conexiones (app/db.py)
+    MYSQL_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', '10'))
+    MYSQL_POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', '5'))
+    
+    # Transacciones de stock (app/db.py en_transaccion): intentos ante deadlock y espera inicial en segundos
+    TRANSACCION_REINTENTOS = int(os.getenv('TRANSACCION_REINTENTOS', '4'))
+    TRANSACCION_ESPERA = float(os.getenv('TRANSACCION_ESPERA', '0.05'))
+    
+    # Líneas por traslado en lote (/movimientos/trasladar/lote)
+    TRASLADO_MAXIMO_LINEAS = int(os.getenv('TRASLADO_MAXIMO_LINEAS', '1000'))
+    
+    # Dashboard: hilos para consultar widgets en paralelo y espera máxima por widget
+    DASHBOARD_WORKERS = int(os.getenv('DASHBOARD_WORKERS', '6'))
+    DASHBOARD_WIDGET_TIMEOUT = float(os.getenv('DASHBOARD_WIDGET_TIMEOUT', '3'))
+    # Segundos que se reutilizan los datos del dashboard (0 desactiva la caché)
+    DASHBOARD_CACHE_TTL = float(os.getenv('DASHBOARD_CACHE_TTL', '30'))
+    
+    # Paginación por cursor (keyset) de los listados grandes
+    PAGINA_TAMANO = int(os.getenv('PAGINA_TAMANO', '50'))
+    PAGINA_MAXIMA = int(os.getenv('PAGINA_MAXIMA', '500'))
+    
+    # Rutas de picking (app/picking.py): metros entre pasillos y entre posiciones
+    PICKING_ANCHO_PASILLO = float(os.getenv('PICKING_ANCHO_PASILLO', '3'))
+    PICKING_LARGO_POSICION = float(os.getenv('PICKING_LARGO_POSICION', '1'))
+    # Paradas hasta las que se aplica 2-opt sobre la ruta S-shape
+    PICKING_2OPT_MAX_PARADAS = int(os.getenv('PICKING_2OPT_MAX_PARADAS', '60'))
+    
+    # Asignación automática de inventario en despachos (app/asignacion.py): FIFO o FEFO
+    ASIGNACION_POLITICA = os.getenv('ASIGNACION_POLITICA', 'FIFO').strip().upper()
+    if ASIGNACION_POLITICA not in ('FIFO', 'FEFO'):
+        raise ValueError(f"ASIGNACION_POLITICA debe ser FIFO o FEFO (se recibió {ASIGNACION_POLITICA!r})")
+    
+    # Importación masiva de recepciones (app/importacion.py): líneas por lote
+    IMPORTACION_LOTE = int(os.getenv('IMPORTACION_LOTE', '1000'))
+    
+    # Autocompletado de productos (app/typeahead.py): segundos antes de recargar el índice y resultados por consulta
+    TYPEAHEAD_TTL = float(os.getenv('TYPEAHEAD_TTL', '300'))
+    TYPEAHEAD_LIMITE = int(os.getenv('TYPEAHEAD_LIMITE', '10'))
@@ -1,32 +1,10 @@
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from datetime import datetime
-import mysql.connector
-from app.config import Config
+from app.db import get_db_connection
+from app.kpi import subir_versiones
 
 almacen_bp = Blueprint('almacen', __name__, url_prefix='/almacenes')
 
-def get_db_connection():
-    """Obtener conexión a la base de datos"""
-    return mysql.connector.connect(
-        host=Config.MYSQL_HOST,
-        user=Config.MYSQL_USER,
-        password=Config.MYSQL_PASSWORD,
-        database=Config.MYSQL_DB
-    )
-
-def actualizar_capacidad_estante(cursor, id_estante):
-    """Actualizar capacidad_ocupada de un estante basado en su inventario"""
-    query = """
-        UPDATE Estante 
-        SET capacidad_ocupada = (
-            SELECT COALESCE(SUM(i.stock_producto), 0)
-            FROM Inventario i
-            WHERE i.id_estante = %s
-        )
-        WHERE id_estante = %s
-    """
-    cursor.execute(query, (id_estante, id_estante))
-
 def actualizar_capacidad_almacen(cursor, id_almacen):
     """Actualizar capacidad_ocupada de un almacén basado en sus estantes"""
     query = """
@@ -40,19 +18,52 @@ def actualizar_capacidad_almacen(cursor, id_almacen):
     """
     cursor.execute(query, (id_almacen, id_almacen))
 
-def actualizar_todas_capacidades_almacen(cursor, id_almacen):
-    """Actualizar todas las capacidades en cascada: Inventario → Estante → Almacén"""
-    # Paso 1: Actualizar capacidad de todos los estantes del almacén
-    cursor.execute("SELECT id_estante FROM Estante WHERE id_almacen = %s", (id_almacen,))
-    estantes = cursor.fetchall()
+def recalcular_capacidades(cursor, id_almacen=None):
+    """Recalcular en cascada Inventario → Estante → Almacén con dos UPDATE por conjunto.
+
+    Sin id_almacen recalcula todos los estantes y almacenes a la vez. Los flujos
+    de escritura ya mantienen los contadores; esto solo sirve para repararlos.
+    """
+    filtro_estante = "WHERE e.id_almacen = %s" if id_almacen else ""
+    filtro_almacen = "WHERE a.id_almacen = %s" if id_almacen else ""
+    params = (id_almacen,) if id_almacen else ()
     
-    for estante in estantes:
-        # Acceder al diccionario correctamente
-        id_estante = estante['id_estante'] if isinstance(estante, dict) else estante[0]
-        actualizar_capacidad_estante(cursor, id_estante)
+    # Paso 1: Todos los estantes en un solo UPDATE
+    cursor.execute(f"""
+        UPDATE Estante e
+        LEFT JOIN (
+            SELECT id_estante, SUM(stock_producto) AS total
+            FROM Inventario
+            GROUP BY id_estante
+        ) inv ON inv.id_estante = e.id_estante
+        SET e.capacidad_ocupada = COALESCE(inv.total, 0)
+        {filtro_estante}
+    """, params)
     
-    # Paso 2: Actualizar capacidad del almacén
-    actualizar_capacidad_almacen(cursor, id_almacen)
+    # Paso 2: Todos los almacenes en un solo UPDATE
+    cursor.execute(f"""
+        UPDATE Almacen a
+        LEFT JOIN (
+            SELECT id_almacen, SUM(capacidad_ocupada) AS total
+            FROM Estante
+            GROUP BY id_almacen
+        ) est ON est.id_almacen = a.id_almacen
+        SET a.capacidad_ocupada = COALESCE(est.total, 0)
+        {filtro_almacen}
+    """, params)
+
+@almacen_bp.cli.command('recalcular-capacidades')
+def recalcular_capacidades_command():
+    """Recalcular capacidad_ocupada de todos los estantes y almacenes"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        recalcular_capacidades(cursor)
+        conn.commit()
+        print("✅ Capacidades recalculadas")
+    finally:
+        cursor.close()
+        conn.close()
 
 @almacen_bp.route('/', methods=['GET'])
 def index():
@@ -61,15 +72,6 @@ def index():
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        # Actualizar capacidades de todos los almacenes
-        cursor.execute("SELECT id_almacen FROM Almacen")
-        almacenes_ids = cursor.fetchall()
-        
-        for alm in almacenes_ids:
-            actualizar_todas_capacidades_almacen(cursor, alm['id_almacen'])
-        
-        conn.commit()
-        
         # Obtener almacenes con información del responsable
         query = """
             SELECT a.*, p.nombre, p.apellido_paterno 
@@ -142,10 +144,6 @@ def ver_detalle(id_almacen):
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        # Actualizar capacidades antes de mostrar
-        actualizar_todas_capacidades_almacen(cursor, id_almacen)
-        conn.commit()
-        
         # Obtener almacén
         cursor.execute("""
             SELECT a.*, p.nombre, p.apellido_paterno 
@@ -185,10 +183,6 @@ def editar(id_almacen):
         cursor = conn.cursor(dictionary=True)
         
         if request.method == 'GET':
-            # Actualizar capacidades antes de mostrar
-            actualizar_todas_capacidades_almacen(cursor, id_almacen)
-            conn.commit()
-            
             cursor.execute("""
                 SELECT a.*, p.nombre, p.apellido_paterno 
                 FROM Almacen a 
@@ -227,6 +221,8 @@ def editar(id_almacen):
             WHERE id_almacen = %s
         """
         cursor.execute(query, (nombre, capacidad, ubicacion, id_persona if id_persona else None, id_almacen))
+        # El nombre se muestra en la disponibilidad de cada empresa con stock aquí
+        subir_versiones(cursor, "e.id_almacen = %s", (id_almacen,))
         conn.commit()
         
         cursor.close()
@@ -339,14 +335,6 @@ def editar_estante(id_estante):
             return redirect(url_for('almacen.index'))
         
         if request.method == 'GET':
-            # Actualizar capacidad antes de mostrar
-            actualizar_capacidad_estante(cursor, id_estante)
-            conn.commit()
-            
-            # Recargar el estante con datos actualizados
-            cursor.execute("SELECT * FROM Estante WHERE id_estante = %s", (id_estante,))
-            estante = cursor.fetchone()
-            
             cursor.close()
             conn.close()
             return render_template('modulos/almacen.html', tab='editar_estante', estante=estante)
@@ -368,6 +356,7 @@ def editar_estante(id_estante):
             WHERE id_estante = %s
         """
         cursor.execute(query, (pasillo, capacidad, estado, id_estante))
+        subir_versiones(cursor, "e.id_estante = %s", (id_estante,))
         conn.commit()
         
         # Actualizar capacidad del almacén
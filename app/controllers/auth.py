@@ -1,26 +1,13 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-import mysql.connector
 import bcrypt
-from app.config import Config
+from app import db
 
 bp = Blueprint('auth', __name__)
 
-# Configuración de BD (COPIADA DE TU CÓDIGO QUE SÍ FUNCIONA)
-
-DB_CONFIG = {
-    'host': Config.MYSQL_HOST,      # ← Viene del .env
-    'user': Config.MYSQL_USER,      # ← Viene del .env
-    'password': Config.MYSQL_PASSWORD,  # ← Viene del .env
-    'database': Config.MYSQL_DB,    # ← Viene del .env
-    'port': Config.MYSQL_PORT       # ← Viene del .env
-}
-
 def get_db_connection():
-    """Crear conexión a la base de datos - MÉTODO CONFIABLE"""
+    """Obtener la conexión de la petición desde el pool - MÉTODO CONFIABLE"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        if connection.is_connected():
-            return connection
+        return db.get_db_connection()
     except Exception as e:
         print(f"❌ Error conectando a MySQL: {e}")
         flash('Error de conexión a la base de datos', 'danger')
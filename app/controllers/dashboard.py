@@ -1,20 +1,16 @@
-from flask import Blueprint, render_template, session, redirect, url_for
-from app.utils.decorators import login_required
-import mysql.connector
+from flask import Blueprint, render_template, session, redirect, url_for, jsonify
+from app.utils.decorators import login_required, role_required
 from app.config import Config
+from app.db import get_db_connection, obtener_conexion_pool
+from app.kpi import clave_dia, reconstruir_kpi
+from app.cache import dashboard_cache
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 
 bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
-def get_db_connection():
-    """Obtener conexión a la base de datos"""
-    return mysql.connector.connect(
-        host=Config.MYSQL_HOST,
-        user=Config.MYSQL_USER,
-        password=Config.MYSQL_PASSWORD,
-        database=Config.MYSQL_DB
-    )
-
 # Diccionario central que define todos los módulos disponibles en el sistema.
 ALL_MODULES = {
     'Usuarios': {'nombre': 'Usuarios', 'descripcion': 'Gestión de empleados y clientes', 'url': 'usuarios.index', 'icono': '👥', 'color': 'morado'},
@@ -29,305 +25,370 @@ ALL_MODULES = {
     'Configuracion': {'nombre': 'Configuración', 'descripcion': 'Ajustes del sistema y permisos', 'url': 'configuracion.index', 'icono': '⚙️', 'color': 'negro'}
 }
 
-# Mapeo de roles a los módulos que deben ver y la plantilla a usar.
-# Mapeo de roles a los módulos que deben ver y la plantilla a usar.
+# Mapeo de roles a los módulos que deben ver, la plantilla a usar
+# y los widgets que esa plantilla muestra (solo esos se consultan).
 ROLE_DASHBOARDS = {
     'Administrador': {
         'modulos_keys': ['Usuarios', 'Empresas', 'Almacenes', 'Productos', 'Inventario', 'Recepciones', 'Despachos', 'Movimientos', 'Reportes', 'Configuracion'],
-        'template': 'dashboard_administrador.html'
+        'template': 'dashboard_administrador.html',
+        'widgets': ['stats', 'alertas']
     },
     'Contador': {
         'modulos_keys': ['Reportes', 'Empresas', 'Inventario'],
-        'template': 'dashboard_contador.html'
+        'template': 'dashboard_contador.html',
+        'widgets': ['stats', 'alertas', 'recepciones_despachos', 'productos_categoria']
     },
     'Gerente': {
         'modulos_keys': ['Reportes', 'Inventario', 'Recepciones', 'Movimientos', 'Despachos'],
-        'template': 'dashboard_gerente.html'
+        'template': 'dashboard_gerente.html',
+        'widgets': ['stats', 'alertas', 'distribucion_almacenes', 'ocupacion_almacenes', 'recepciones_despachos', 'productos_categoria']
     },
     'Auxiliar': {
         'modulos_keys': ['Recepciones', 'Despachos', 'Inventario', 'Movimientos'],
-        'template': 'dashboard_auxiliar.html'
+        'template': 'dashboard_auxiliar.html',
+        'widgets': ['stats', 'alertas']
     },
     'Personal de Logistica': {
         'modulos_keys': ['Almacenes', 'Movimientos', 'Recepciones', 'Despachos'],
-        'template': 'dashboard_personal_de_logistica.html'
+        'template': 'dashboard_personal_de_logistica.html',
+        'widgets': []
     },
     'Cliente': {
         'modulos_keys': ['Inventario', 'Despachos'],
-        'template': 'dashboard_cliente.html'
+        'template': 'dashboard_cliente.html',
+        'widgets': ['stats']
     }
 }
 
-def get_dashboard_stats():
-    """Obtiene las estadísticas principales del dashboard"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    stats = {}
-    
-    try:
-        # 1. Productos Únicos
-        cursor.execute("SELECT COUNT(DISTINCT id_producto) as total FROM Producto")
-        stats['productos_unicos'] = cursor.fetchone()['total'] or 0
-        
-        # 2. Almacenes Activos
-        cursor.execute("SELECT COUNT(*) as total FROM Almacen")
-        stats['almacenes_activos'] = cursor.fetchone()['total'] or 0
-        
-        # 3. Recepciones Pendientes
-        cursor.execute("SELECT COUNT(*) as total FROM Pedido WHERE estado = 'Pendiente'")
-        stats['recepciones_pendientes'] = cursor.fetchone()['total'] or 0
-        
-        # 4. Clientes Registrados
-        cursor.execute("SELECT COUNT(*) as total FROM Cliente")
-        stats['clientes_registrados'] = cursor.fetchone()['total'] or 0
-        
-        # 5. Movimientos del Día
-        cursor.execute("""
-            SELECT COUNT(*) as total 
-            FROM Movimiento_Producto 
-            WHERE fecha_movimiento = CURDATE()
-        """)
-        stats['movimientos_hoy'] = cursor.fetchone()['total'] or 0
-        
-    except Exception as e:
-        print(f"Error obteniendo estadísticas: {e}")
-        stats = {
-            'productos_unicos': 0,
-            'almacenes_activos': 0,
-            'recepciones_pendientes': 0,
-            'clientes_registrados': 0,
-            'movimientos_hoy': 0
-        }
-    finally:
-        cursor.close()
-        conn.close()
-    
-    return stats
+STATS_VACIAS = {
+    'productos_unicos': 0,
+    'almacenes_activos': 0,
+    'recepciones_pendientes': 0,
+    'clientes_registrados': 0,
+    'movimientos_hoy': 0
+}
+
+def get_dashboard_stats(cursor):
+    """Obtiene las estadísticas principales del dashboard en una sola consulta.
 
-def get_distribucion_almacenes():
+    Pendientes y movimientos del día salen de Resumen_KPI (ver app/kpi.py).
+    """
+    cursor.execute("""
+        SELECT
+            (SELECT COUNT(DISTINCT id_producto) FROM Producto) as productos_unicos,
+            (SELECT COUNT(*) FROM Almacen) as almacenes_activos,
+            (SELECT valor FROM Resumen_KPI
+             WHERE clave = 'recepciones_pendientes' AND id_ref = 0) as recepciones_pendientes,
+            (SELECT COUNT(*) FROM Cliente) as clientes_registrados,
+            (SELECT valor FROM Resumen_KPI
+             WHERE clave = 'movimientos_dia' AND id_ref = %s) as movimientos_hoy
+    """, (clave_dia(datetime.now().date()),))
+    fila = cursor.fetchone()
+    return {clave: fila[clave] or 0 for clave in STATS_VACIAS}
+
+def get_distribucion_almacenes(cursor):
     """Obtiene la distribución de productos por almacén"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT a.nombre_almacen, COALESCE(k.valor, 0) as total_productos
+        FROM Almacen a
+        LEFT JOIN Resumen_KPI k ON k.clave = 'stock_almacen' AND k.id_ref = a.id_almacen
+        ORDER BY total_productos DESC
+    """)
+    resultados = cursor.fetchall()
     
-    try:
-        cursor.execute("""
-            SELECT a.nombre_almacen, COALESCE(SUM(i.stock_producto), 0) as total_productos
-            FROM Almacen a
-            LEFT JOIN Estante e ON a.id_almacen = e.id_almacen
-            LEFT JOIN Inventario i ON e.id_estante = i.id_estante
-            GROUP BY a.id_almacen, a.nombre_almacen
-            ORDER BY total_productos DESC
-        """)
-        resultados = cursor.fetchall()
-        
-        return {
-            'labels': [r['nombre_almacen'] for r in resultados],
-            'data': [int(r['total_productos'] or 0) for r in resultados]
-        }
-    except Exception as e:
-        print(f"Error obteniendo distribución de almacenes: {e}")
-        return {'labels': [], 'data': []}
-    finally:
-        cursor.close()
-        conn.close()
+    return {
+        'labels': [r['nombre_almacen'] for r in resultados],
+        'data': [int(r['total_productos'] or 0) for r in resultados]
+    }
 
-def get_ocupacion_almacenes():
+def get_ocupacion_almacenes(cursor):
     """Obtiene la ocupación de cada almacén"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT 
+            nombre_almacen,
+            capacidad,
+            capacidad_ocupada,
+            ROUND((capacidad_ocupada/capacidad)*100, 2) as porcentaje_ocupacion
+        FROM Almacen
+        WHERE capacidad > 0
+        ORDER BY porcentaje_ocupacion DESC
+    """)
+    resultados = cursor.fetchall()
     
-    try:
-        cursor.execute("""
-            SELECT 
-                nombre_almacen,
-                capacidad,
-                capacidad_ocupada,
-                ROUND((capacidad_ocupada/capacidad)*100, 2) as porcentaje_ocupacion
-            FROM Almacen
-            WHERE capacidad > 0
-            ORDER BY porcentaje_ocupacion DESC
-        """)
-        resultados = cursor.fetchall()
-        
-        return {
-            'labels': [r['nombre_almacen'] for r in resultados],
-            'capacidad': [r['capacidad'] for r in resultados],
-            'ocupada': [r['capacidad_ocupada'] for r in resultados],
-            'porcentajes': [float(r['porcentaje_ocupacion'] or 0) for r in resultados]
-        }
-    except Exception as e:
-        print(f"Error obteniendo ocupación de almacenes: {e}")
-        return {'labels': [], 'capacidad': [], 'ocupada': [], 'porcentajes': []}
-    finally:
-        cursor.close()
-        conn.close()
+    return {
+        'labels': [r['nombre_almacen'] for r in resultados],
+        'capacidad': [r['capacidad'] for r in resultados],
+        'ocupada': [r['capacidad_ocupada'] for r in resultados],
+        'porcentajes': [float(r['porcentaje_ocupacion'] or 0) for r in resultados]
+    }
 
-def get_recepciones_despachos():
-    """Obtiene recepciones y despachos de los últimos 30 días"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+def get_recepciones_despachos(cursor):
+    """Obtiene recepciones y despachos de los últimos 30 días (una sola consulta)"""
+    cursor.execute("""
+        SELECT 'recepcion' as serie, DATE(fecha_pedido) as fecha, COUNT(*) as cantidad
+        FROM Pedido
+        WHERE fecha_pedido >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+        GROUP BY DATE(fecha_pedido)
+        UNION ALL
+        SELECT 'despacho' as serie, DATE(fecha_despacho) as fecha, COUNT(*) as cantidad
+        FROM Pedido_Despacho
+        WHERE fecha_despacho >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+        AND fecha_despacho IS NOT NULL
+        GROUP BY DATE(fecha_despacho)
+    """)
+    resultados = cursor.fetchall()
     
-    try:
-        # Recepciones
-        cursor.execute("""
-            SELECT DATE(fecha_pedido) as fecha, COUNT(*) as cantidad
-            FROM Pedido
-            WHERE fecha_pedido >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-            GROUP BY DATE(fecha_pedido)
-            ORDER BY fecha
-        """)
-        recepciones = cursor.fetchall()
-        
-        # Despachos
-        cursor.execute("""
-            SELECT DATE(fecha_despacho) as fecha, COUNT(*) as cantidad
-            FROM Pedido_Despacho
-            WHERE fecha_despacho >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-            AND fecha_despacho IS NOT NULL
-            GROUP BY DATE(fecha_despacho)
-            ORDER BY fecha
-        """)
-        despachos = cursor.fetchall()
-        
-        # Crear conjunto de fechas únicas
-        fechas_set = set()
-        for r in recepciones:
-            if r['fecha']:
-                fechas_set.add(r['fecha'])
-        for d in despachos:
-            if d['fecha']:
-                fechas_set.add(d['fecha'])
-        
-        fechas = sorted(list(fechas_set))
-        
-        # Crear diccionarios para búsqueda rápida
-        rec_dict = {r['fecha']: r['cantidad'] for r in recepciones if r['fecha']}
-        desp_dict = {d['fecha']: d['cantidad'] for d in despachos if d['fecha']}
-        
-        return {
-            'labels': [f.strftime('%d/%m') for f in fechas],
-            'recepciones': [rec_dict.get(f, 0) for f in fechas],
-            'despachos': [desp_dict.get(f, 0) for f in fechas]
-        }
-    except Exception as e:
-        print(f"Error obteniendo recepciones y despachos: {e}")
-        return {'labels': [], 'recepciones': [], 'despachos': []}
-    finally:
-        cursor.close()
-        conn.close()
+    # Crear diccionarios para búsqueda rápida
+    rec_dict = {r['fecha']: r['cantidad'] for r in resultados if r['fecha'] and r['serie'] == 'recepcion'}
+    desp_dict = {r['fecha']: r['cantidad'] for r in resultados if r['fecha'] and r['serie'] == 'despacho'}
+    
+    fechas = sorted(set(rec_dict) | set(desp_dict))
+    
+    return {
+        'labels': [f.strftime('%d/%m') for f in fechas],
+        'recepciones': [rec_dict.get(f, 0) for f in fechas],
+        'despachos': [desp_dict.get(f, 0) for f in fechas]
+    }
 
-def get_productos_por_categoria():
+def get_productos_por_categoria(cursor):
     """Obtiene la cantidad de productos por categoría"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT cp.nombre_categoria, COUNT(p.id_producto) as cantidad
+        FROM Categoria_Producto cp
+        LEFT JOIN Producto p ON cp.id_categoria_producto = p.id_categoria_producto
+        WHERE cp.estado = 'ACTIVA'
+        GROUP BY cp.id_categoria_producto, cp.nombre_categoria
+        HAVING cantidad > 0
+        ORDER BY cantidad DESC
+    """)
+    resultados = cursor.fetchall()
     
-    try:
-        cursor.execute("""
-            SELECT cp.nombre_categoria, COUNT(p.id_producto) as cantidad
-            FROM Categoria_Producto cp
-            LEFT JOIN Producto p ON cp.id_categoria_producto = p.id_categoria_producto
-            WHERE cp.estado = 'ACTIVA'
-            GROUP BY cp.id_categoria_producto, cp.nombre_categoria
-            HAVING cantidad > 0
-            ORDER BY cantidad DESC
-        """)
-        resultados = cursor.fetchall()
-        
-        return {
-            'labels': [r['nombre_categoria'] for r in resultados],
-            'data': [r['cantidad'] for r in resultados]
-        }
-    except Exception as e:
-        print(f"Error obteniendo productos por categoría: {e}")
-        return {'labels': [], 'data': []}
-    finally:
-        cursor.close()
-        conn.close()
+    return {
+        'labels': [r['nombre_categoria'] for r in resultados],
+        'data': [r['cantidad'] for r in resultados]
+    }
 
-def get_alertas():
-    """Obtiene las alertas del sistema"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
+def get_alertas(cursor):
+    """Obtiene las alertas del sistema.
+
+    Los cuatro tipos de alerta salen de una sola consulta UNION ALL; 'grupo'
+    conserva el orden de presentación y 'orden' el orden dentro de cada grupo.
+    """
     alertas = []
     
-    try:
-        # Almacenes con capacidad > 90%
-        cursor.execute("""
-            SELECT nombre_almacen, 
-                   ROUND((capacidad_ocupada/capacidad)*100, 2) as porcentaje
-            FROM Almacen
-            WHERE capacidad > 0 AND (capacidad_ocupada/capacidad)*100 > 90
-            ORDER BY porcentaje DESC
-        """)
-        almacenes_criticos = cursor.fetchall()
-        for a in almacenes_criticos:
+    cursor.execute("""
+        SELECT * FROM (
+            (
+                -- Almacenes con capacidad > 90%
+                SELECT 1 as grupo, nombre_almacen as etiqueta,
+                    ROUND((capacidad_ocupada/capacidad)*100, 2) as valor,
+                    (capacidad_ocupada/capacidad) as orden
+                FROM Almacen
+                WHERE capacidad > 0 AND (capacidad_ocupada/capacidad)*100 > 90
+            )
+            UNION ALL
+            (
+                -- Productos con stock bajo (< 10 unidades)
+                SELECT 2, p.marca, k.valor, -k.valor
+                FROM Resumen_KPI k
+                JOIN Producto p ON p.id_producto = k.id_ref
+                WHERE k.clave = 'stock_producto' AND k.valor > 0 AND k.valor < 10
+                ORDER BY k.valor
+                LIMIT 5
+            )
+            UNION ALL
+            (
+                -- Despachos con retraso
+                SELECT 3, numero_guia, DATEDIFF(CURDATE(), fecha_solicitud), DATEDIFF(CURDATE(), fecha_solicitud)
+                FROM Pedido_Despacho
+                WHERE estado IN ('Pendiente', 'En Preparación')
+                AND DATEDIFF(CURDATE(), fecha_solicitud) > 5
+                ORDER BY DATEDIFF(CURDATE(), fecha_solicitud) DESC
+                LIMIT 5
+            )
+            UNION ALL
+            (
+                -- Pedidos pendientes por más de 7 días
+                SELECT 4, numero_documento, DATEDIFF(CURDATE(), fecha_pedido), DATEDIFF(CURDATE(), fecha_pedido)
+                FROM Pedido
+                WHERE estado = 'Pendiente'
+                AND DATEDIFF(CURDATE(), fecha_pedido) > 7
+                ORDER BY DATEDIFF(CURDATE(), fecha_pedido) DESC
+                LIMIT 5
+            )
+        ) alertas
+        ORDER BY grupo, orden DESC
+    """)
+    
+    for fila in cursor.fetchall():
+        grupo, etiqueta = fila['grupo'], fila['etiqueta']
+        if grupo == 1:
             alertas.append({
                 'tipo': 'warning',
                 'icono': '⚠️',
-                'mensaje': f"Almacén '{a['nombre_almacen']}' al {a['porcentaje']}% de capacidad"
+                'mensaje': f"Almacén '{etiqueta}' al {fila['valor']:.2f}% de capacidad"
             })
-        
-        # Productos con stock bajo (< 10 unidades)
-        cursor.execute("""
-            SELECT p.marca, SUM(i.stock_producto) as stock_total
-            FROM Producto p
-            JOIN Inventario i ON p.id_producto = i.id_producto
-            GROUP BY p.id_producto, p.marca
-            HAVING stock_total < 10 AND stock_total > 0
-            ORDER BY stock_total
-            LIMIT 5
-        """)
-        productos_bajo_stock = cursor.fetchall()
-        for prod in productos_bajo_stock:
+        elif grupo == 2:
             alertas.append({
                 'tipo': 'danger',
                 'icono': '🔴',
-                'mensaje': f"Stock bajo: {prod['marca']} ({prod['stock_total']} unidades)"
+                'mensaje': f"Stock bajo: {etiqueta} ({int(fila['valor'])} unidades)"
             })
-        
-        # Despachos con retraso
-        cursor.execute("""
-            SELECT numero_guia, DATEDIFF(CURDATE(), fecha_solicitud) as dias_retraso
-            FROM Pedido_Despacho
-            WHERE estado IN ('Pendiente', 'En Preparación')
-            AND DATEDIFF(CURDATE(), fecha_solicitud) > 5
-            ORDER BY dias_retraso DESC
-            LIMIT 5
-        """)
-        despachos_retrasados = cursor.fetchall()
-        for desp in despachos_retrasados:
+        elif grupo == 3:
             alertas.append({
                 'tipo': 'danger',
                 'icono': '⏰',
-                'mensaje': f"Despacho {desp['numero_guia']} retrasado {desp['dias_retraso']} días"
+                'mensaje': f"Despacho {etiqueta} retrasado {int(fila['valor'])} días"
             })
-        
-        # Pedidos pendientes por más de 7 días
-        cursor.execute("""
-            SELECT numero_documento, DATEDIFF(CURDATE(), fecha_pedido) as dias_pendiente
-            FROM Pedido
-            WHERE estado = 'Pendiente'
-            AND DATEDIFF(CURDATE(), fecha_pedido) > 7
-            ORDER BY dias_pendiente DESC
-            LIMIT 5
-        """)
-        pedidos_pendientes = cursor.fetchall()
-        for ped in pedidos_pendientes:
+        else:
             alertas.append({
                 'tipo': 'warning',
                 'icono': '📋',
-                'mensaje': f"Pedido #{ped['numero_documento']} pendiente {ped['dias_pendiente']} días"
+                'mensaje': f"Pedido #{etiqueta} pendiente {int(fila['valor'])} días"
             })
-            
-    except Exception as e:
-        print(f"Error obteniendo alertas: {e}")
+    
+    return alertas
+
+@bp.cli.command('reconstruir-kpi')
+def reconstruir_kpi_command():
+    """Crear (si falta) y recalcular desde cero la tabla Resumen_KPI"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        reconstruir_kpi(cursor)
+        conn.commit()
+        print("✅ Resumen_KPI reconstruido")
     finally:
         cursor.close()
         conn.close()
+
+# Widgets del dashboard: nombre de la variable de plantilla → consulta
+WIDGETS = {
+    'stats': get_dashboard_stats,
+    'distribucion_almacenes': get_distribucion_almacenes,
+    'ocupacion_almacenes': get_ocupacion_almacenes,
+    'recepciones_despachos': get_recepciones_despachos,
+    'productos_categoria': get_productos_por_categoria,
+    'alertas': get_alertas
+}
+
+# Nombre visible y valor a mostrar cuando un widget falla o no responde a tiempo
+WIDGETS_NO_DISPONIBLES = {
+    'stats': ('Estadísticas', {clave: '—' for clave in STATS_VACIAS}),
+    'distribucion_almacenes': ('Distribución por almacén', {'labels': [], 'data': []}),
+    'ocupacion_almacenes': ('Ocupación de almacenes', {'labels': [], 'capacidad': [], 'ocupada': [], 'porcentajes': []}),
+    'recepciones_despachos': ('Recepciones y despachos', {'labels': [], 'recepciones': [], 'despachos': []}),
+    'productos_categoria': ('Productos por categoría', {'labels': [], 'data': []}),
+    'alertas': ('Alertas', [])
+}
+
+# Hilos compartidos por todas las peticiones; se crean en el primer submit
+_executor = ThreadPoolExecutor(max_workers=max(Config.DASHBOARD_WORKERS, 1),
+                               thread_name_prefix='dashboard')
+
+def consultar_cache(nombres):
+    """Separa los widgets servidos desde caché de los que hay que consultar"""
+    datos = {}
+    pendientes = {}
+    for nombre in nombres:
+        encontrado, valor, version = dashboard_cache.consultar(nombre)
+        if encontrado:
+            datos[nombre] = valor
+        else:
+            pendientes[nombre] = version
+    return datos, pendientes
+
+def marcar_no_disponibles(datos, fallidos):
+    """Rellena los widgets fallidos y los avisa en las alertas"""
+    for nombre in fallidos:
+        datos[nombre] = copy.deepcopy(WIDGETS_NO_DISPONIBLES[nombre][1])
     
-    return alertas
+    if fallidos and 'alertas' in datos:
+        # Lista nueva: la original puede estar compartida con la caché
+        datos['alertas'] = list(datos['alertas']) + [{
+            'tipo': 'info',
+            'icono': '⏳',
+            'mensaje': f"{WIDGETS_NO_DISPONIBLES[nombre][0]}: no disponible por el momento"
+        } for nombre in fallidos]
+    
+    return datos
+
+def get_dashboard_data(nombres=WIDGETS):
+    """Obtiene los widgets indicados sobre una sola conexión y cursor"""
+    datos, pendientes = consultar_cache(nombres)
+    fallidos = []
+    if not pendientes:
+        return datos
+    
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        for nombre, version in pendientes.items():
+            try:
+                datos[nombre] = WIDGETS[nombre](cursor)
+                dashboard_cache.guardar(nombre, datos[nombre], version)
+            except Exception as e:
+                print(f"Widget '{nombre}' no disponible: {e}")
+                fallidos.append(nombre)
+    finally:
+        cursor.close()
+        conn.close()
+    
+    return marcar_no_disponibles(datos, fallidos)
+
+def ejecutar_widget(consulta, limite):
+    """Ejecuta un widget en un hilo del pool con su propia conexión.
+
+    `limite` es el instante (time.monotonic) en que el widget deja de
+    esperarse. Lo que quede hasta ahí se pasa a MySQL como max_execution_time:
+    cancelar el futuro no detiene una consulta en curso, así que es MySQL quien
+    la corta y la conexión vuelve al pool a tiempo. El pool restablece la
+    sesión al devolverla (pool_reset_session).
+    """
+    restante = int((limite - time.monotonic()) * 1000)
+    if restante <= 0:
+        raise TimeoutError('tiempo agotado antes de empezar')
+    
+    conn = obtener_conexion_pool()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        cursor.execute("SET SESSION max_execution_time = %s", (restante,))
+        return consulta(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_dashboard_data_concurrente(nombres=WIDGETS):
+    """Obtiene los widgets indicados en paralelo.
+
+    Cada widget tiene DASHBOARD_WIDGET_TIMEOUT segundos desde que se encola; el
+    que no termina a tiempo se muestra como no disponible sin frenar al resto.
+    """
+    datos, pendientes = consultar_cache(nombres)
+    fallidos = []
+    if not pendientes:
+        return datos
+    
+    limite = time.monotonic() + Config.DASHBOARD_WIDGET_TIMEOUT
+    futuros = {nombre: _executor.submit(ejecutar_widget, WIDGETS[nombre], limite)
+               for nombre in pendientes}
+    wait(futuros.values(), timeout=Config.DASHBOARD_WIDGET_TIMEOUT)
+    
+    for nombre, futuro in futuros.items():
+        if futuro.done() and not futuro.exception():
+            datos[nombre] = futuro.result()
+            dashboard_cache.guardar(nombre, datos[nombre], pendientes[nombre])
+            continue
+        
+        motivo = futuro.exception() if futuro.done() else 'tiempo agotado'
+        print(f"Widget '{nombre}' no disponible: {motivo}")
+        # Si aún no empezó, liberar su turno en el pool de hilos
+        futuro.cancel()
+        fallidos.append(nombre)
+    
+    return marcar_no_disponibles(datos, fallidos)
 
 @bp.route('/')
 @login_required
@@ -353,23 +414,27 @@ def index():
             
         modulos.append(modulo)
     
-    # Obtener datos del dashboard
-    stats = get_dashboard_stats()
-    distribucion_almacenes = get_distribucion_almacenes()
-    ocupacion_almacenes = get_ocupacion_almacenes()
-    recepciones_despachos = get_recepciones_despachos()
-    productos_categoria = get_productos_por_categoria()
-    alertas = get_alertas()
+    # Obtener solo los widgets del rol (en paralelo si hay más de un hilo configurado)
+    if Config.DASHBOARD_WORKERS > 1:
+        datos = get_dashboard_data_concurrente(dashboard_info['widgets'])
+    else:
+        datos = get_dashboard_data(dashboard_info['widgets'])
+    
+    # Los widgets que la plantilla no muestra van vacíos
+    for nombre, (_, vacio) in WIDGETS_NO_DISPONIBLES.items():
+        datos.setdefault(nombre, copy.deepcopy(vacio))
     
     # Renderizar la plantilla específica para el rol
     return render_template(
         dashboard_info['template'], 
         modulos=modulos, 
         user_role=user_role,
-        stats=stats,
-        distribucion_almacenes=distribucion_almacenes,
-        ocupacion_almacenes=ocupacion_almacenes,
-        recepciones_despachos=recepciones_despachos,
-        productos_categoria=productos_categoria,
-        alertas=alertas
-    )
\ No newline at end of file
+        **datos
+    )
+
+@bp.route('/cache')
+@login_required
+@role_required(['Administrador'])
+def cache_stats():
+    """API: aciertos y fallos de la caché del dashboard para ajustar el TTL"""
+    return jsonify(dashboard_cache.estadisticas())
@@ -1,17 +1,44 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session, jsonify
+from flask import Blueprint, render_template, request, flash, redirect, url_for, session, jsonify, Response
 from datetime import datetime
-import mysql.connector
-from app.config import Config
+from app.db import get_db_connection, en_transaccion
+from app.cache import invalidar_dashboard, WIDGETS_STOCK, WIDGETS_DESPACHOS
+from app.utils.sql import tabla_valores
+from app.secuencias import crear_secuencias, siguiente, GUIA_DESPACHO
+from app.picking import construir_plano, planificar_ruta, consolidar_oleada
+from app.asignacion import asignar_lineas
+from app.busqueda import condicion_producto
+from app.utils.paginacion import codificar_cursor, decodificar_cursor, tamano_pagina
+from app.reservas import reservar, liberar, lineas_despacho, reconstruir_reservas, DISPONIBLE, ESTADOS_ABIERTOS
+from app.kpi import version_proveedor
+from app.stock import StockLedger
 
 despachos_bp = Blueprint('despachos', __name__, url_prefix='/despachos')
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host=Config.MYSQL_HOST,
-        user=Config.MYSQL_USER,
-        password=Config.MYSQL_PASSWORD,
-        database=Config.MYSQL_DB
-    )
+@despachos_bp.cli.command('secuencias')
+def secuencias_command():
+    """Crear la tabla Secuencia y sembrar la de guías con los datos actuales"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        crear_secuencias(cursor)
+        conn.commit()
+        print("✅ Secuencias listas")
+    finally:
+        cursor.close()
+        conn.close()
+
+@despachos_bp.cli.command('reservas')
+def reservas_command():
+    """Crear (si falta) y recalcular Reserva_Inventario desde los despachos abiertos"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        reconstruir_reservas(cursor)
+        conn.commit()
+        print("✅ Reservas de inventario recalculadas")
+    finally:
+        cursor.close()
+        conn.close()
 
 @despachos_bp.route('/')
 def index():
@@ -82,10 +109,31 @@ def crear():
             flash('Debe seleccionar un proveedor y al menos un producto', 'warning')
             return redirect(url_for('despachos.crear'))
         
-        # Generar número de guía
-        cursor.execute("SELECT COUNT(*) as total FROM Pedido_Despacho")
-        total = cursor.fetchone()['total']
-        numero_guia = f"GS-{datetime.now().strftime('%Y%m%d')}-{total + 1:04d}"
+        # Líneas con ubicación elegida a mano; el resto (o todas, en modo
+        # automático) se asignan por FIFO/FEFO repartiendo entre estantes
+        automatica = request.form.get('asignacion_automatica') == '1'
+        lineas = []
+        pendientes = []
+        for i in range(len(productos)):
+            if productos[i] and cantidades[i]:
+                if inventarios[i] and not automatica:
+                    lineas.append((int(productos[i]), int(inventarios[i]), int(cantidades[i])))
+                else:
+                    pendientes.append((int(productos[i]), int(cantidades[i])))
+        
+        if pendientes:
+            asignadas, faltantes = asignar_lineas(cursor, int(id_proveedor), pendientes)
+            if faltantes:
+                flash(f'Stock insuficiente para asignar {sum(faltantes.values())} unidades '
+                      f'de {len(faltantes)} producto(s)', 'warning')
+                return redirect(url_for('despachos.crear'))
+            lineas += asignadas
+        
+        # Comprometer el stock hasta que el despacho se confirme o se cancele
+        reservar(cursor, [(id_inventario, cantidad) for _, id_inventario, cantidad in lineas])
+        
+        # Generar número de guía (secuencia atómica, sin contar la tabla)
+        numero_guia = f"GS-{datetime.now().strftime('%Y%m%d')}-{siguiente(GUIA_DESPACHO):04d}"
         
         # Insertar pedido de despacho
         cursor.execute("""
@@ -95,13 +143,12 @@ def crear():
         
         id_pedido_despacho = cursor.lastrowid
         
-        # Insertar detalles
-        for i in range(len(productos)):
-            if productos[i] and cantidades[i]:
-                cursor.execute("""
-                    INSERT INTO Detalle_Despacho (id_pedido_despacho, id_producto, id_inventario, cantidad_solicitada)
-                    VALUES (%s, %s, %s, %s)
-                """, (id_pedido_despacho, productos[i], inventarios[i] if inventarios[i] else None, cantidades[i]))
+        # Insertar detalles (un solo INSERT multi-fila)
+        cursor.executemany("""
+            INSERT INTO Detalle_Despacho (id_pedido_despacho, id_producto, id_inventario, cantidad_solicitada)
+            VALUES (%s, %s, %s, %s)
+        """, [(id_pedido_despacho, id_producto, id_inventario, cantidad)
+              for id_producto, id_inventario, cantidad in lineas])
         
         conn.commit()
         cursor.close()
@@ -157,6 +204,18 @@ def detalle(id):
         flash(f'Error al cargar detalle: {str(e)}', 'danger')
         return redirect(url_for('despachos.index'))
 
+def obtener_planos(cursor, detalles):
+    """Planos (app/picking.py) de los almacenes que aparecen en las líneas"""
+    almacenes = sorted({d['id_almacen'] for d in detalles if d.get('id_almacen') is not None})
+    if not almacenes:
+        return {}
+    
+    marcadores = ', '.join(['%s'] * len(almacenes))
+    cursor.execute(f"""
+        SELECT id_almacen, id_estante, pasillo FROM Estante WHERE id_almacen IN ({marcadores})
+    """, almacenes)
+    return construir_plano(cursor.fetchall())
+
 @despachos_bp.route('/<int:id>/picking')
 def picking(id):
     """4. Vista de preparación/picking"""
@@ -186,6 +245,9 @@ def picking(id):
         """, (id,))
         detalles = cursor.fetchall()
         
+        # Ordenar las líneas según la ruta más corta por los pasillos de cada almacén
+        detalles, distancia = planificar_ruta(detalles, obtener_planos(cursor, detalles))
+        
         # Actualizar estado a "En Preparación"
         if despacho['estado'] == 'Pendiente':
             cursor.execute("""
@@ -197,7 +259,8 @@ def picking(id):
         cursor.close()
         conn.close()
         
-        return render_template('modulos/despachos.html', despacho=despacho, detalles=detalles, tab='picking')
+        return render_template('modulos/despachos.html', despacho=despacho, detalles=detalles,
+                             distancia=distancia, tab='picking')
     except Exception as e:
         flash(f'Error al cargar picking: {str(e)}', 'danger')
         return redirect(url_for('despachos.index'))
@@ -207,90 +270,86 @@ def confirmar(id):
     """5. Confirmar despacho y actualizar inventario"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
         
         cantidades_despachadas = request.form.getlist('cantidades_despachadas[]')
         ids_detalle = request.form.getlist('ids_detalle[]')
+        cantidades = {int(ids_detalle[i]): int(cantidades_despachadas[i]) for i in range(len(ids_detalle))}
         
-        # Obtener despacho
-        cursor.execute("SELECT * FROM Pedido_Despacho WHERE id_pedido_despacho = %s", (id,))
-        despacho = cursor.fetchone()
-        
-        if despacho['estado'] == 'Despachado':
-            flash('Este despacho ya fue confirmado', 'warning')
-            return redirect(url_for('despachos.detalle', id=id))
-        
-        # Procesar cada detalle
-        for i in range(len(ids_detalle)):
-            id_detalle = ids_detalle[i]
-            cantidad_despachada = int(cantidades_despachadas[i])
+        def registrar(cursor):
+            # Obtener despacho (bloqueado hasta el commit para no confirmarlo dos veces)
+            cursor.execute("SELECT * FROM Pedido_Despacho WHERE id_pedido_despacho = %s FOR UPDATE", (id,))
+            despacho = cursor.fetchone()
+            if despacho['estado'] == 'Despachado':
+                return False
             
-            # Obtener detalle
-            cursor.execute("""
-                SELECT dd.*, inv.stock_producto, inv.id_estante, e.id_almacen
-                FROM Detalle_Despacho dd
-                LEFT JOIN Inventario inv ON dd.id_inventario = inv.id_inventario
-                LEFT JOIN Estante e ON inv.id_estante = e.id_estante
-                WHERE dd.id_detalle_despacho = %s
-            """, (id_detalle,))
-            detalle = cursor.fetchone()
+            aplicar_despacho(cursor, despacho, cantidades, session.get('user_id'))
             
-            if cantidad_despachada > 0:
-                # Actualizar cantidad despachada
-                cursor.execute("""
-                    UPDATE Detalle_Despacho SET cantidad_despachada = %s WHERE id_detalle_despacho = %s
-                """, (cantidad_despachada, id_detalle))
-                
-                # Reducir inventario
-                nuevo_stock = detalle['stock_producto'] - cantidad_despachada
-                
-                if nuevo_stock <= 0:
-                    # Marcar como despachado en lugar de eliminar
-                    cursor.execute("""
-                        UPDATE Inventario 
-                        SET stock_producto = 0, estado = 'Despachado', fecha_modificacion = %s 
-                        WHERE id_inventario = %s
-                    """, (datetime.now().date(), detalle['id_inventario']))
-                else:
-                    # Solo actualizar stock
-                    cursor.execute("""
-                        UPDATE Inventario 
-                        SET stock_producto = %s, fecha_modificacion = %s 
-                        WHERE id_inventario = %s
-                    """, (nuevo_stock, datetime.now().date(), detalle['id_inventario']))
-                
-                # Reducir capacidad ocupada del estante
-                cursor.execute("""
-                    UPDATE Estante SET capacidad_ocupada = capacidad_ocupada - %s WHERE id_estante = %s
-                """, (cantidad_despachada, detalle['id_estante']))
-                
-                # Reducir capacidad ocupada del almacén
-                cursor.execute("""
-                    UPDATE Almacen SET capacidad_ocupada = capacidad_ocupada - %s WHERE id_almacen = %s
-                """, (cantidad_despachada, detalle['id_almacen']))
-                
-                # Registrar movimiento de salida
-                cursor.execute("""
-                    INSERT INTO Movimiento_Producto (cantidad_producto, motivo, fecha_movimiento, id_persona, id_producto)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (cantidad_despachada, f'Despacho {despacho["numero_guia"]}', datetime.now().date(), 
-                      session.get('user_id'), detalle['id_producto']))
-        
-        # Actualizar estado del pedido
-        cursor.execute("""
-            UPDATE Pedido_Despacho SET estado = 'Despachado', fecha_despacho = %s WHERE id_pedido_despacho = %s
-        """, (datetime.now().date(), id))
+            # Actualizar estado del pedido
+            cursor.execute("""
+                UPDATE Pedido_Despacho SET estado = 'Despachado', fecha_despacho = %s WHERE id_pedido_despacho = %s
+            """, (datetime.now().date(), id))
+            return True
         
-        conn.commit()
-        cursor.close()
+        confirmado = en_transaccion(conn, registrar)
         conn.close()
         
+        if not confirmado:
+            flash('Este despacho ya fue confirmado', 'warning')
+            return redirect(url_for('despachos.detalle', id=id))
+        
+        invalidar_dashboard(*WIDGETS_STOCK, *WIDGETS_DESPACHOS)
         flash('Despacho confirmado exitosamente', 'success')
         return redirect(url_for('despachos.detalle', id=id))
     except Exception as e:
         flash(f'Error al confirmar despacho: {str(e)}', 'danger')
         return redirect(url_for('despachos.picking', id=id))
 
+def aplicar_despacho(cursor, despacho, cantidades, id_persona):
+    """Descontar del inventario las cantidades despachadas {id_detalle: cantidad}.
+
+    Trabaja por conjuntos: una lectura de los detalles, un UPDATE de
+    Detalle_Despacho y el StockLedger para inventario, capacidades,
+    movimientos y dashboard, sin importar cuántas líneas tenga el despacho.
+    Devuelve las líneas aplicadas.
+    """
+    cursor.execute("""
+        SELECT id_detalle_despacho, id_producto, id_inventario, cantidad_solicitada
+        FROM Detalle_Despacho
+        WHERE id_pedido_despacho = %s
+    """, (despacho['id_pedido_despacho'],))
+    detalles = {d['id_detalle_despacho']: d for d in cursor.fetchall()}
+    
+    # La reserva se convierte en salida real: se libera todo lo solicitado
+    if despacho['estado'] in ESTADOS_ABIERTOS:
+        liberar(cursor, [(d['id_inventario'], d['cantidad_solicitada']) for d in detalles.values()])
+    
+    lineas = []
+    for id_detalle, cantidad in cantidades.items():
+        if cantidad <= 0 or id_detalle not in detalles:
+            continue
+        detalle = detalles[id_detalle]
+        if detalle['id_inventario'] is None:
+            raise ValueError(f'El detalle {id_detalle} no tiene inventario asignado')
+        lineas.append((id_detalle, detalle['id_inventario'], cantidad))
+    
+    if not lineas:
+        return 0
+    
+    # Cantidad despachada por línea
+    valores, params = tabla_valores(('id', 'cantidad'), [(id_detalle, cantidad) for id_detalle, _, cantidad in lineas])
+    cursor.execute(f"""
+        UPDATE Detalle_Despacho dd
+        INNER JOIN ({valores}) v ON dd.id_detalle_despacho = v.id
+        SET dd.cantidad_despachada = v.cantidad
+    """, params)
+    
+    # Las líneas que quedan en 0 se marcan como despachadas en lugar de eliminarse
+    ledger = StockLedger(cursor, id_persona, estado_agotado='Despachado')
+    motivo = f'Despacho {despacho["numero_guia"]}'
+    for _, id_inventario, cantidad in lineas:
+        ledger.salida(id_inventario, cantidad, motivo)
+    return ledger.aplicar()
+
 @despachos_bp.route('/<int:id>/editar', methods=['GET', 'POST'])
 def editar(id):
     """6. Editar despacho (solo si está pendiente)"""
@@ -349,13 +408,17 @@ def cancelar(id):
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute("SELECT estado FROM Pedido_Despacho WHERE id_pedido_despacho = %s", (id,))
+        cursor.execute("SELECT estado FROM Pedido_Despacho WHERE id_pedido_despacho = %s FOR UPDATE", (id,))
         despacho = cursor.fetchone()
         
         if despacho['estado'] == 'Despachado':
             flash('No se puede cancelar un despacho ya despachado', 'warning')
             return redirect(url_for('despachos.detalle', id=id))
         
+        # Devolver a disponible el stock que tenía reservado
+        if despacho['estado'] in ESTADOS_ABIERTOS:
+            liberar(cursor, lineas_despacho(cursor, id))
+        
         cursor.execute("""
             UPDATE Pedido_Despacho SET estado = 'Cancelado' WHERE id_pedido_despacho = %s
         """, (id,))
@@ -364,6 +427,7 @@ def cancelar(id):
         cursor.close()
         conn.close()
         
+        invalidar_dashboard(*WIDGETS_DESPACHOS)
         flash('Despacho cancelado exitosamente', 'success')
         return redirect(url_for('despachos.index'))
     except Exception as e:
@@ -400,71 +464,178 @@ def historial_empresa(id):
         flash(f'Error al cargar historial: {str(e)}', 'danger')
         return redirect(url_for('despachos.index'))
 
+@despachos_bp.route('/oleada', methods=['GET', 'POST'])
+def oleada():
+    """10. Oleada de picking: preparar varios despachos pendientes en un solo recorrido"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        if request.method == 'GET':
+            cursor.execute("""
+                SELECT pd.id_pedido_despacho, pd.numero_guia, pd.fecha_solicitud,
+                    prov.nombre_proveedor, prov.empresa,
+                    COUNT(dd.id_detalle_despacho) as total_items,
+                    SUM(dd.cantidad_solicitada) as total_solicitado
+                FROM Pedido_Despacho pd
+                INNER JOIN Proveedor prov ON pd.id_proveedor = prov.id_proveedor
+                LEFT JOIN Detalle_Despacho dd ON pd.id_pedido_despacho = dd.id_pedido_despacho
+                WHERE pd.estado = 'Pendiente'
+                GROUP BY pd.id_pedido_despacho
+                ORDER BY pd.fecha_solicitud, pd.id_pedido_despacho
+            """)
+            pendientes = cursor.fetchall()
+            
+            cursor.close()
+            conn.close()
+            
+            return render_template('modulos/despachos.html', pendientes=pendientes, tab='oleada')
+        
+        # POST - Armar la oleada
+        ids = [int(i) for i in request.form.getlist('despachos[]') if i.isdigit()]
+        if not ids:
+            flash('Seleccione al menos un despacho pendiente', 'warning')
+            return redirect(url_for('despachos.oleada'))
+        
+        marcadores = ', '.join(['%s'] * len(ids))
+        
+        # Bloquear los despachos: otro usuario no puede tomarlos para otra oleada
+        cursor.execute(f"""
+            SELECT id_pedido_despacho FROM Pedido_Despacho
+            WHERE id_pedido_despacho IN ({marcadores}) AND estado = 'Pendiente'
+            FOR UPDATE
+        """, ids)
+        ids = [d['id_pedido_despacho'] for d in cursor.fetchall()]
+        if not ids:
+            flash('Los despachos seleccionados ya no están pendientes', 'warning')
+            return redirect(url_for('despachos.oleada'))
+        
+        marcadores = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"""
+            SELECT dd.*, pd.numero_guia, prov.empresa, prov.nombre_proveedor,
+                p.marca, cat.nombre_categoria,
+                inv.stock_producto, e.pasillo, a.nombre_almacen, a.id_almacen, e.id_estante
+            FROM Detalle_Despacho dd
+            INNER JOIN Pedido_Despacho pd ON dd.id_pedido_despacho = pd.id_pedido_despacho
+            INNER JOIN Proveedor prov ON pd.id_proveedor = prov.id_proveedor
+            INNER JOIN Producto p ON dd.id_producto = p.id_producto
+            INNER JOIN Categoria_Producto cat ON p.id_categoria_producto = cat.id_categoria_producto
+            LEFT JOIN Inventario inv ON dd.id_inventario = inv.id_inventario
+            LEFT JOIN Estante e ON inv.id_estante = e.id_estante
+            LEFT JOIN Almacen a ON e.id_almacen = a.id_almacen
+            WHERE dd.id_pedido_despacho IN ({marcadores})
+        """, ids)
+        detalles = cursor.fetchall()
+        
+        # Un recorrido para toda la oleada y la lista de separación por despacho
+        lineas, separacion = consolidar_oleada(detalles)
+        lineas, distancia = planificar_ruta(lineas, obtener_planos(cursor, lineas))
+        
+        cursor.execute(f"""
+            UPDATE Pedido_Despacho SET estado = 'En Preparación'
+            WHERE id_pedido_despacho IN ({marcadores})
+        """, ids)
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        return render_template('modulos/despachos.html',
+                             lineas=lineas,
+                             separacion=separacion,
+                             distancia=distancia,
+                             tab='oleada')
+    except Exception as e:
+        flash(f'Error al armar la oleada: {str(e)}', 'danger')
+        return redirect(url_for('despachos.index'))
+
 @despachos_bp.route('/productos/<int:id_proveedor>')
 def productos_empresa(id_proveedor):
-    """9. API: Obtener productos disponibles de una empresa - CON DEBUG"""
+    """9. API: Disponibilidad de una empresa en formato columnar, con ETag.
+
+    Parámetros opcionales: q (búsqueda por marca o categoría), limite y cursor
+    (paginación keyset). El ETag es la versión de la empresa en Resumen_KPI
+    (app.kpi.version_proveedor), que suben en su misma transacción el ledger
+    de stock, las reservas y las ediciones de estantes y almacenes: se lee
+    por clave primaria y si no cambió se responde 304 sin armar las filas.
+    """
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        # DEBUG: Verificar si el proveedor existe
-        cursor.execute("SELECT * FROM Proveedor WHERE id_proveedor = %s", (id_proveedor,))
-        proveedor = cursor.fetchone()
-        print(f"[DEBUG] Proveedor encontrado: {proveedor}")
-        
-        # DEBUG: Ver cuántos productos tiene este proveedor en inventario
-        cursor.execute("""
-            SELECT COUNT(*) as total 
-            FROM Inventario 
-            WHERE id_proveedor = %s AND stock_producto > 0
-        """, (id_proveedor,))
-        total_inv = cursor.fetchone()
-        print(f"[DEBUG] Total en inventario con stock > 0: {total_inv}")
-        
-        # CONSULTA PRINCIPAL
-        cursor.execute("""
+        etag = f'disp-{id_proveedor}-v{version_proveedor(cursor, id_proveedor)}'
+        if request.if_none_match.contains(etag):
+            cursor.close()
+            conn.close()
+            respuesta = Response(status=304)
+            respuesta.set_etag(etag)
+            return respuesta
+        
+        termino = request.args.get('q', '').strip()
+        limite = request.args.get('limite', type=int)
+        
+        filtros = ""
+        params = [id_proveedor]
+        if termino:
+            condicion, valores = condicion_producto(termino)
+            filtros += condicion
+            params += valores
+        
+        # Pasillo y marca pueden ser NULL: se ordena y compara con '' para no perder filas
+        orden = "a.nombre_almacen, COALESCE(e.pasillo, ''), COALESCE(p.marca, ''), inv.id_inventario"
+        if limite:
+            limite = tamano_pagina(limite)
+            desde = decodificar_cursor(request.args.get('cursor'), 4)
+            if desde:
+                filtros += f" AND ({orden}) > (%s, %s, %s, %s)"
+                params += desde
+        
+        # Disponible = stock menos lo reservado por otros despachos
+        cursor.execute(f"""
             SELECT 
-                prov.id_proveedor,
-                prov.nombre_proveedor,
-                prov.empresa,
-                a.nombre_almacen,
-                e.pasillo,
+                inv.id_inventario,
+                p.id_producto,
                 p.marca,
                 cat.nombre_categoria,
+                a.nombre_almacen,
+                e.pasillo,
                 inv.stock_producto,
-                inv.id_inventario,
-                inv.fecha_modificacion,
-                p.id_producto
+                {DISPONIBLE} as disponible
             FROM Inventario inv
-            INNER JOIN Proveedor prov ON inv.id_proveedor = prov.id_proveedor
             INNER JOIN Producto p ON inv.id_producto = p.id_producto
             INNER JOIN Categoria_Producto cat ON p.id_categoria_producto = cat.id_categoria_producto
             INNER JOIN Estante e ON inv.id_estante = e.id_estante
             INNER JOIN Almacen a ON e.id_almacen = a.id_almacen
+            LEFT JOIN Reserva_Inventario r ON inv.id_inventario = r.id_inventario
             WHERE inv.id_proveedor = %s 
-              AND inv.stock_producto > 0
               AND inv.estado = 'Disponible'
-            ORDER BY a.nombre_almacen, e.pasillo, p.marca
-        """, (id_proveedor,))
-        productos = cursor.fetchall()
-        
-        print(f"[DEBUG] Productos encontrados: {len(productos)}")
-        print(f"[DEBUG] Datos: {productos}")
+              AND {DISPONIBLE} > 0
+              {filtros}
+            ORDER BY {orden}
+            {'LIMIT %s' if limite else ''}
+        """, params + ([limite + 1] if limite else []))
+        columnas = list(cursor.column_names)
+        filas = cursor.fetchall()
         
         cursor.close()
         conn.close()
         
-        return jsonify({
-            'success': True, 
-            'productos': productos,
-            'debug': {
-                'id_proveedor': id_proveedor,
-                'total_productos': len(productos),
-                'proveedor': proveedor
-            }
+        siguiente_cursor = None
+        if limite and len(filas) > limite:
+            filas = filas[:limite]
+            ultima = filas[-1]
+            siguiente_cursor = codificar_cursor([ultima['nombre_almacen'], ultima['pasillo'] or '',
+                                                 ultima['marca'] or '', ultima['id_inventario']])
+        
+        respuesta = jsonify({
+            'success': True,
+            'columnas': columnas,
+            'filas': [[fila[c] for c in columnas] for fila in filas],
+            'siguiente': siguiente_cursor
         })
+        # El navegador guarda la respuesta pero la revalida siempre con If-None-Match
+        respuesta.set_etag(etag)
+        respuesta.headers['Cache-Control'] = 'private, no-cache'
+        return respuesta
     except Exception as e:
-        print(f"[ERROR] {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'success': False, 'error': str(e)})
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)})
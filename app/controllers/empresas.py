@@ -1,18 +1,10 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for
 from datetime import datetime
-import mysql.connector
-from app.config import Config
+from app.db import get_db_connection
+from app.busqueda import buscar_proveedores
 
 empresas_bp = Blueprint('empresas', __name__, url_prefix='/empresas')
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host=Config.MYSQL_HOST,
-        user=Config.MYSQL_USER,
-        password=Config.MYSQL_PASSWORD,
-        database=Config.MYSQL_DB
-    )
-
 @empresas_bp.route('/', methods=['GET'])
 def index():
     """Listar todas las empresas"""
@@ -217,14 +209,8 @@ def buscar():
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute("""
-            SELECT * FROM Proveedor 
-            WHERE nombre_proveedor LIKE %s 
-            OR empresa LIKE %s 
-            OR nit LIKE %s
-            ORDER BY id_proveedor DESC
-        """, (f'%{query}%', f'%{query}%', f'%{query}%'))
-        empresas = cursor.fetchall()
+        # Índice FULLTEXT sobre nombre y empresa, resultados por relevancia
+        empresas = buscar_proveedores(cursor, query)
         
         cursor.close()
         conn.close()
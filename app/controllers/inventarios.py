@@ -1,16 +1,23 @@
+import click
 from flask import Blueprint, render_template, request, flash, redirect, url_for
-import mysql.connector
-from app.config import Config
+from app.db import get_db_connection
+from app.busqueda import condicion_producto, crear_indices
+from app.utils.paginacion import codificar_cursor, decodificar_cursor, tamano_pagina
 
 inventarios_bp = Blueprint('inventarios', __name__, url_prefix='/inventarios')
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host=Config.MYSQL_HOST,
-        user=Config.MYSQL_USER,
-        password=Config.MYSQL_PASSWORD,
-        database=Config.MYSQL_DB
-    )
+@inventarios_bp.cli.command('indices-busqueda')
+@click.option('--reconstruir', is_flag=True, help='Rehacer también los índices existentes (sin palabras vacías)')
+def indices_busqueda_command(reconstruir):
+    """Crear los índices FULLTEXT de productos, categorías y proveedores"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        crear_indices(cursor, reconstruir)
+        print("✅ Índices de búsqueda listos")
+    finally:
+        cursor.close()
+        conn.close()
 
 @inventarios_bp.route('/', methods=['GET'])
 def index():
@@ -23,6 +30,26 @@ def index():
         filtro_almacen = request.args.get('almacen', '')
         filtro_categoria = request.args.get('categoria', '')
         filtro_busqueda = request.args.get('busqueda', '')
+        por_pagina = tamano_pagina(request.args.get('por_pagina'))
+        token = request.args.get('cursor', '')
+        
+        # Filtros compartidos por la página y las estadísticas
+        filtros = ""
+        params = []
+        
+        if filtro_almacen:
+            filtros += " AND a.id_almacen = %s"
+            params.append(int(filtro_almacen))
+        
+        if filtro_categoria:
+            filtros += " AND cat.id_categoria_producto = %s"
+            params.append(int(filtro_categoria))
+        
+        if filtro_busqueda:
+            # Índices FULLTEXT sobre marca y categoría (ver app/busqueda.py)
+            condicion, valores = condicion_producto(filtro_busqueda)
+            filtros += condicion
+            params.extend(valores)
         
         # Query base
         query = """
@@ -37,27 +64,33 @@ def index():
             INNER JOIN Estante e ON inv.id_estante = e.id_estante
             INNER JOIN Almacen a ON e.id_almacen = a.id_almacen
             WHERE 1=1
-        """
-        params = []
-        
-        # Aplicar filtros
-        if filtro_almacen:
-            query += " AND a.id_almacen = %s"
-            params.append(int(filtro_almacen))
-        
-        if filtro_categoria:
-            query += " AND cat.id_categoria_producto = %s"
-            params.append(int(filtro_categoria))
-        
-        if filtro_busqueda:
-            query += " AND p.marca LIKE %s"
-            params.append(f'%{filtro_busqueda}%')
-        
-        query += " ORDER BY a.nombre_almacen, e.pasillo, p.marca"
-        
-        cursor.execute(query, params)
+        """ + filtros
+        params_pagina = list(params)
+        
+        # Paginación por cursor: continuar después de la última fila mostrada.
+        # id_inventario desempata filas con mismo almacén, pasillo y marca.
+        # Pasillo y marca pueden ser NULL: la comparación daría NULL y esas filas
+        # se perderían, así que se ordena y compara con '' en su lugar.
+        orden = "a.nombre_almacen, COALESCE(e.pasillo, ''), COALESCE(p.marca, ''), inv.id_inventario"
+        desde = decodificar_cursor(token, 4)
+        if desde:
+            query += f" AND ({orden}) > (%s, %s, %s, %s)"
+            params_pagina.extend(desde)
+        
+        query += f" ORDER BY {orden} LIMIT %s"
+        params_pagina.append(por_pagina + 1)
+        
+        cursor.execute(query, params_pagina)
         inventario = cursor.fetchall()
         
+        # Se pidió una fila de más solo para saber si hay página siguiente
+        siguiente = None
+        if len(inventario) > por_pagina:
+            inventario = inventario[:por_pagina]
+            ultimo = inventario[-1]
+            siguiente = codificar_cursor([ultimo['nombre_almacen'], ultimo['pasillo'] or '',
+                                          ultimo['marca'] or '', ultimo['id_inventario']])
+        
         # Obtener datos para filtros
         cursor.execute("SELECT * FROM Almacen ORDER BY nombre_almacen")
         almacenes = cursor.fetchall()
@@ -65,16 +98,20 @@ def index():
         cursor.execute("SELECT * FROM Categoria_Producto WHERE estado = 'ACTIVA' ORDER BY nombre_categoria")
         categorias = cursor.fetchall()
         
-        # Calcular estadísticas
+        # Calcular estadísticas con los mismos filtros, sin traer las filas
         cursor.execute("""
             SELECT 
+                COUNT(*) as total_lineas,
                 COUNT(DISTINCT inv.id_producto) as total_productos,
                 SUM(inv.stock_producto) as total_unidades,
                 COUNT(DISTINCT a.id_almacen) as total_almacenes
             FROM Inventario inv
+            INNER JOIN Producto p ON inv.id_producto = p.id_producto
+            INNER JOIN Categoria_Producto cat ON p.id_categoria_producto = cat.id_categoria_producto
             INNER JOIN Estante e ON inv.id_estante = e.id_estante
             INNER JOIN Almacen a ON e.id_almacen = a.id_almacen
-        """)
+            WHERE 1=1
+        """ + filtros, params)
         estadisticas = cursor.fetchone()
         
         cursor.close()
@@ -87,7 +124,10 @@ def index():
                             estadisticas=estadisticas,
                             filtro_almacen=filtro_almacen,
                             filtro_categoria=filtro_categoria,
-                            filtro_busqueda=filtro_busqueda)
+                            filtro_busqueda=filtro_busqueda,
+                            por_pagina=por_pagina,
+                            cursor_actual=token,
+                            cursor_siguiente=siguiente)
     except Exception as e:
         flash(f'Error al cargar inventario: {str(e)}', 'danger')
         return redirect(url_for('dashboard.index'))
@@ -1,51 +1,82 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session
-from datetime import datetime
-import mysql.connector
+from flask import Blueprint, render_template, request, flash, redirect, url_for, session, jsonify
+from app.db import get_db_connection, en_transaccion
 from app.config import Config
+from app.cache import invalidar_dashboard, WIDGETS_STOCK
+from app.stock import StockLedger
+from app.historial import preparar_esquema, rellenar_proveedores, filtros_movimientos, pagina_movimientos
+from app import colocacion
+from app.utils.paginacion import codificar_cursor, decodificar_cursor, tamano_pagina
 
 movimientos_bp = Blueprint('movimientos', __name__, url_prefix='/movimientos')
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host=Config.MYSQL_HOST,
-        user=Config.MYSQL_USER,
-        password=Config.MYSQL_PASSWORD,
-        database=Config.MYSQL_DB
-    )
+@movimientos_bp.cli.command('historial')
+def historial_command():
+    """Agregar id_proveedor e índices al historial y rellenar los movimientos anteriores"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        preparar_esquema(cursor)
+        actualizados = rellenar_proveedores(conn, cursor)
+        print(f"✅ Proveedor completado en {actualizados} movimientos")
+    finally:
+        cursor.close()
+        conn.close()
+
+@movimientos_bp.cli.command('colocacion')
+def colocacion_command():
+    """Agregar cantidad_asignada a Detalle_Ingreso y la clave única producto/estante/proveedor a Inventario"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        colocacion.preparar_esquema(cursor)
+        conn.commit()
+        print("✅ Colocación de recepciones lista")
+    finally:
+        cursor.close()
+        conn.close()
 
 @movimientos_bp.route('/', methods=['GET'])
 def index():
-    """Listar todos los movimientos"""
+    """Listar movimientos con filtros, paginados por cursor"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute("""
-            SELECT DISTINCT m.id_movimiento_producto, m.cantidad_producto, m.motivo, 
-                m.fecha_movimiento, m.id_persona, m.id_producto,
-                p.marca, cat.nombre_categoria, 
-                per.nombre, per.apellido_paterno,
-                prov.nombre_proveedor, prov.empresa
-            FROM Movimiento_Producto m
-            INNER JOIN Producto p ON m.id_producto = p.id_producto
-            INNER JOIN Categoria_Producto cat ON p.id_categoria_producto = cat.id_categoria_producto
-            LEFT JOIN Persona per ON m.id_persona = per.id_persona
-            LEFT JOIN (
-                SELECT id_producto, id_proveedor, 
-                    ROW_NUMBER() OVER (PARTITION BY id_producto ORDER BY id_inventario DESC) as rn
-                FROM Inventario
-            ) inv ON p.id_producto = inv.id_producto AND inv.rn = 1
-            LEFT JOIN Proveedor prov ON inv.id_proveedor = prov.id_proveedor
-            ORDER BY m.fecha_movimiento DESC, m.id_movimiento_producto DESC
-        """)
-        movimientos = cursor.fetchall()
+        # Obtener filtros
+        fecha_desde = request.args.get('fecha_desde', '')
+        fecha_hasta = request.args.get('fecha_hasta', '')
+        filtro_persona = request.args.get('persona', '')
+        filtro_producto = request.args.get('producto', '').strip()
+        por_pagina = tamano_pagina(request.args.get('por_pagina'))
+        token = request.args.get('cursor', '')
+        
+        filtros, params = filtros_movimientos(fecha_desde, fecha_hasta, filtro_persona, filtro_producto)
+        movimientos, hay_mas = pagina_movimientos(cursor, filtros, params,
+                                                  decodificar_cursor(token, 2), por_pagina)
+        
+        siguiente = None
+        if hay_mas:
+            ultimo = movimientos[-1]
+            siguiente = codificar_cursor([ultimo['fecha_movimiento'], ultimo['id_movimiento_producto']])
+        
+        # Operadores para el filtro
+        cursor.execute("SELECT id_persona, nombre, apellido_paterno FROM Persona ORDER BY nombre, apellido_paterno")
+        personas = cursor.fetchall()
         
         cursor.close()
         conn.close()
         
         return render_template('modulos/movimientos.html',
                             tab='lista',
-                            movimientos=movimientos)
+                            movimientos=movimientos,
+                            personas=personas,
+                            fecha_desde=fecha_desde,
+                            fecha_hasta=fecha_hasta,
+                            filtro_persona=filtro_persona,
+                            filtro_producto=filtro_producto,
+                            por_pagina=por_pagina,
+                            cursor_actual=token,
+                            cursor_siguiente=siguiente)
     except Exception as e:
         flash(f'Error al cargar movimientos: {str(e)}', 'danger')
         return redirect(url_for('dashboard.index'))
@@ -58,22 +89,35 @@ def asignar():
         cursor = conn.cursor(dictionary=True)
         
         if request.method == 'GET':
-            # Obtener productos de recepciones con estado 'Recibido' - SIN agrupar por proveedor
+            # Líneas de recepciones 'Recibido' con unidades sin ubicar - SIN agrupar por proveedor
             cursor.execute("""
                 SELECT di.id_detalle_ingreso, p.id_producto, p.marca, cat.nombre_categoria,
                     ped.id_pedido, ped.id_proveedor, prov.nombre_proveedor, prov.empresa,
                     di.cantidad as cantidad_recibida,
+                    di.cantidad - di.cantidad_asignada as cantidad_pendiente,
                     ped.estado
                 FROM Detalle_Ingreso di
                 INNER JOIN Producto p ON di.id_producto = p.id_producto
                 INNER JOIN Categoria_Producto cat ON p.id_categoria_producto = cat.id_categoria_producto
                 INNER JOIN Pedido ped ON di.id_pedido = ped.id_pedido
                 INNER JOIN Proveedor prov ON ped.id_proveedor = prov.id_proveedor
-                WHERE ped.estado = 'Recibido'
+                WHERE ped.estado = 'Recibido' AND di.cantidad_asignada < di.cantidad
                 ORDER BY prov.nombre_proveedor, p.marca, di.id_detalle_ingreso
             """)
             productos_pendientes = cursor.fetchall()
             
+            # Recepciones completas para asignar en una sola operación
+            recepciones = {}
+            for prod in productos_pendientes:
+                recepcion = recepciones.setdefault(prod['id_pedido'], {
+                    'id_pedido': prod['id_pedido'],
+                    'nombre_proveedor': prod['nombre_proveedor'],
+                    'lineas': 0,
+                    'pendiente': 0
+                })
+                recepcion['lineas'] += 1
+                recepcion['pendiente'] += prod['cantidad_pendiente']
+            
             # Obtener almacenes disponibles
             cursor.execute("""
                 SELECT a.id_almacen, a.nombre_almacen, a.ubicacion,
@@ -89,113 +133,102 @@ def asignar():
             return render_template('modulos/movimientos.html',
                                 tab='asignar',
                                 productos=productos_pendientes,
+                                recepciones=sorted(recepciones.values(), key=lambda r: r['id_pedido']),
                                 almacenes=almacenes)
         
         # POST - Asignar producto
         id_detalle_ingreso = request.form.get('id_detalle_ingreso')
         id_pedido = request.form.get('id_pedido')
-        id_proveedor = request.form.get('id_proveedor')
         id_estante = request.form.get('id_estante')
         cantidad = request.form.get('cantidad')
         
-        if not all([id_detalle_ingreso, id_pedido, id_proveedor, id_estante, cantidad]):
+        if not all([id_detalle_ingreso, id_pedido, id_estante, cantidad]):
             flash('Todos los campos son obligatorios', 'warning')
             return redirect(url_for('movimientos.asignar'))
         
-        cantidad = int(cantidad)
-        
-        # Obtener información del detalle de ingreso
-        cursor.execute("""
-            SELECT di.id_detalle_ingreso, di.id_producto, di.cantidad, ped.estado
-            FROM Detalle_Ingreso di
-            INNER JOIN Pedido ped ON di.id_pedido = ped.id_pedido
-            WHERE di.id_detalle_ingreso = %s
-        """, (id_detalle_ingreso,))
-        detalle = cursor.fetchone()
-        
-        if not detalle or detalle['estado'] != 'Recibido':
-            flash('El pedido no está en estado Recibido', 'warning')
-            cursor.close()
-            conn.close()
-            return redirect(url_for('movimientos.asignar'))
-        
-        if cantidad > detalle['cantidad']:
-            flash('La cantidad solicitada supera la cantidad recibida', 'warning')
-            cursor.close()
-            conn.close()
-            return redirect(url_for('movimientos.asignar'))
-        
-        # Verificar capacidad del estante
-        cursor.execute("SELECT capacidad, capacidad_ocupada FROM Estante WHERE id_estante = %s", (id_estante,))
-        estante = cursor.fetchone()
-        
-        if estante['capacidad_ocupada'] + cantidad > estante['capacidad']:
-            flash('El estante no tiene capacidad suficiente', 'warning')
-            cursor.close()
-            conn.close()
-            return redirect(url_for('movimientos.asignar'))
-        
-        # Verificar si ya existe inventario para ese producto, estante y proveedor
-        cursor.execute("""
-            SELECT id_inventario, stock_producto 
-            FROM Inventario 
-            WHERE id_producto = %s AND id_estante = %s AND id_proveedor = %s
-        """, (detalle['id_producto'], id_estante, id_proveedor))
-        inventario_existe = cursor.fetchone()
-        
-        if inventario_existe:
-            # Actualizar inventario existente
-            nuevo_stock = inventario_existe['stock_producto'] + cantidad
-            cursor.execute("""
-                UPDATE Inventario 
-                SET stock_producto = %s, fecha_modificacion = %s
-                WHERE id_inventario = %s
-            """, (nuevo_stock, datetime.now().date(), inventario_existe['id_inventario']))
-        else:
-            # Crear nuevo registro de inventario
-            cursor.execute("""
-                INSERT INTO Inventario (stock_producto, fecha_modificacion, id_estante, id_producto, id_proveedor, estado)
-                VALUES (%s, %s, %s, %s, %s, 'Disponible')
-            """, (cantidad, datetime.now().date(), id_estante, detalle['id_producto'], id_proveedor))
-        
-        # Actualizar capacidad ocupada del estante
-        cursor.execute("""
-            UPDATE Estante 
-            SET capacidad_ocupada = capacidad_ocupada + %s
-            WHERE id_estante = %s
-        """, (cantidad, id_estante))
-        
-        # Actualizar capacidad ocupada del almacén
-        cursor.execute("""
-            UPDATE Almacen a
-            INNER JOIN Estante e ON a.id_almacen = e.id_almacen
-            SET a.capacidad_ocupada = a.capacidad_ocupada + %s
-            WHERE e.id_estante = %s
-        """, (cantidad, id_estante))
+        plan = [(int(id_detalle_ingreso), int(id_estante), int(cantidad))]
         
-        # Registrar movimiento
-        cursor.execute("""
-            INSERT INTO Movimiento_Producto (cantidad_producto, motivo, fecha_movimiento, id_persona, id_producto)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (cantidad, 'Ingreso Inicial', datetime.now().date(), session.get('user_id'), detalle['id_producto']))
+        def registrar(cursor):
+            # El pedido pasa a 'Asignado' solo cuando no le quedan líneas pendientes
+            return colocacion.colocar(cursor, int(id_pedido), session.get('user_id'), plan=plan)
         
-        # Cambiar estado del pedido a 'Asignado'
-        cursor.execute("""
-            UPDATE Pedido
-            SET estado = 'Asignado'
-            WHERE id_pedido = %s
-        """, (id_pedido,))
-        
-        conn.commit()
+        _, completo = en_transaccion(conn, registrar)
         cursor.close()
         conn.close()
         
-        flash('Producto asignado exitosamente al inventario', 'success')
+        invalidar_dashboard(*WIDGETS_STOCK)
+        flash('Producto asignado exitosamente al inventario'
+              + (' - recepción asignada completa' if completo else ''), 'success')
         return redirect(url_for('movimientos.asignar'))
     except Exception as e:
         flash(f'Error al asignar producto: {str(e)}', 'danger')
         return redirect(url_for('movimientos.asignar'))
 
+def plan_recepcion():
+    """(id_pedido, plan, id_almacen) de una asignación de recepción completa.
+
+    Acepta JSON {"id_pedido", "plan": [{"id_detalle_ingreso", "id_estante", "cantidad"}, ...]}
+    o el formulario (id_pedido, id_detalle_ingreso[], id_estante[], cantidad[]).
+    Sin plan se ubica todo lo pendiente automáticamente, opcionalmente en
+    id_almacen. Lanza ValueError si algo no es válido.
+    """
+    datos = (request.get_json(silent=True) or {}) if request.is_json else request.form
+    try:
+        id_pedido = int(datos.get('id_pedido'))
+        id_almacen = int(datos['id_almacen']) if datos.get('id_almacen') else None
+    except (TypeError, ValueError):
+        raise ValueError('Seleccione una recepción válida')
+    
+    if request.is_json:
+        try:
+            plan = [(int(l['id_detalle_ingreso']), int(l['id_estante']), int(l['cantidad']))
+                    for l in datos.get('plan') or []]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Cada línea del plan necesita id_detalle_ingreso, id_estante y cantidad numéricos')
+    else:
+        detalles = request.form.getlist('id_detalle_ingreso[]')
+        estantes = request.form.getlist('id_estante[]')
+        cantidades = request.form.getlist('cantidad[]')
+        if not (len(detalles) == len(estantes) == len(cantidades)):
+            raise ValueError('La cantidad de líneas, estantes y cantidades no coincide')
+        try:
+            plan = [(int(d), int(e), int(c)) for d, e, c in zip(detalles, estantes, cantidades)]
+        except (TypeError, ValueError):
+            raise ValueError('Línea, estante y cantidad deben ser numéricos')
+    
+    if len(plan) > Config.TRASLADO_MAXIMO_LINEAS:
+        raise ValueError(f'Se pueden asignar como máximo {Config.TRASLADO_MAXIMO_LINEAS} líneas por vez')
+    return id_pedido, plan or None, id_almacen
+
+@movimientos_bp.route('/asignar/recepcion', methods=['POST'])
+def asignar_recepcion():
+    """Ubicar todas las líneas de una recepción en una sola transacción"""
+    try:
+        id_pedido, plan, id_almacen = plan_recepcion()
+        conn = get_db_connection()
+        
+        def registrar(cursor):
+            # Inventario (upsert multi-fila), estantes condicionados a la capacidad,
+            # líneas de la recepción y estado del pedido: todo o nada
+            return colocacion.colocar(cursor, id_pedido, session.get('user_id'),
+                                      plan=plan, id_almacen=id_almacen)
+        
+        movimientos, completo = en_transaccion(conn, registrar)
+        conn.close()
+        
+        invalidar_dashboard(*WIDGETS_STOCK)
+        if request.is_json:
+            return jsonify({'success': True, 'movimientos': movimientos, 'completo': completo})
+        if completo:
+            flash(f'Recepción #{id_pedido} asignada completa: {movimientos} ubicaciones', 'success')
+        else:
+            flash(f'Recepción #{id_pedido}: {movimientos} ubicaciones, quedan líneas pendientes', 'info')
+    except Exception as e:
+        if request.is_json:
+            return jsonify({'success': False, 'error': str(e)}), 400 if isinstance(e, ValueError) else 500
+        flash(f'Error al asignar la recepción: {str(e)}', 'danger')
+    return redirect(url_for('movimientos.asignar'))
+
 @movimientos_bp.route('/trasladar', methods=['GET', 'POST'])
 def trasladar():
     """Mover producto entre estantes"""
@@ -243,109 +276,87 @@ def trasladar():
             return redirect(url_for('movimientos.trasladar'))
         
         cantidad = int(cantidad)
-        
-        # Obtener información del inventario origen
-        cursor.execute("""
-            SELECT inv.*, e.capacidad_ocupada as estante_ocupado_origen
-            FROM Inventario inv
-            INNER JOIN Estante e ON inv.id_estante = e.id_estante
-            WHERE inv.id_inventario = %s
-        """, (id_inventario,))
-        inv_origen = cursor.fetchone()
-        
-        if cantidad > inv_origen['stock_producto']:
-            flash('Cantidad mayor al stock disponible', 'warning')
-            cursor.close()
-            conn.close()
-            return redirect(url_for('movimientos.trasladar'))
-        
-        # Verificar capacidad del estante destino
-        cursor.execute("SELECT capacidad, capacidad_ocupada FROM Estante WHERE id_estante = %s", (id_estante_destino,))
-        estante_destino = cursor.fetchone()
-        
-        if estante_destino['capacidad_ocupada'] + cantidad > estante_destino['capacidad']:
-            flash('El estante destino no tiene capacidad suficiente', 'warning')
-            cursor.close()
-            conn.close()
+        if cantidad <= 0:
+            flash('La cantidad debe ser mayor a 0', 'warning')
             return redirect(url_for('movimientos.trasladar'))
         
-        # Reducir stock en origen
-        nuevo_stock_origen = inv_origen['stock_producto'] - cantidad
-        if nuevo_stock_origen == 0:
-            cursor.execute("DELETE FROM Inventario WHERE id_inventario = %s", (id_inventario,))
-        else:
-            cursor.execute("""
-                UPDATE Inventario 
-                SET stock_producto = %s, fecha_modificacion = %s
-                WHERE id_inventario = %s
-            """, (nuevo_stock_origen, datetime.now().date(), id_inventario))
-        
-        # Actualizar capacidad estante origen
-        cursor.execute("""
-            UPDATE Estante 
-            SET capacidad_ocupada = capacidad_ocupada - %s
-            WHERE id_estante = %s
-        """, (cantidad, inv_origen['id_estante']))
-        
-        # Actualizar capacidad almacén origen
-        cursor.execute("""
-            UPDATE Almacen a
-            INNER JOIN Estante e ON a.id_almacen = e.id_almacen
-            SET a.capacidad_ocupada = a.capacidad_ocupada - %s
-            WHERE e.id_almacen = (SELECT id_almacen FROM Estante WHERE id_estante = %s)
-        """, (cantidad, inv_origen['id_estante']))
+        def registrar(cursor):
+            # Origen, destino (solo si cabe), capacidades, movimiento y dashboard en una pasada
+            ledger = StockLedger(cursor, session.get('user_id'))
+            ledger.traslado(id_inventario, id_estante_destino, cantidad)
+            ledger.aplicar()
         
-        # Agregar stock en destino
-        cursor.execute("""
-            SELECT id_inventario, stock_producto 
-            FROM Inventario 
-            WHERE id_producto = %s AND id_estante = %s AND id_proveedor <=> %s
-        """, (inv_origen['id_producto'], id_estante_destino, inv_origen['id_proveedor']))
-        inv_destino = cursor.fetchone()
-        
-        if inv_destino:
-            cursor.execute("""
-                UPDATE Inventario 
-                SET stock_producto = stock_producto + %s, fecha_modificacion = %s
-                WHERE id_inventario = %s
-            """, (cantidad, datetime.now().date(), inv_destino['id_inventario']))
-        else:
-            cursor.execute("""
-                INSERT INTO Inventario (stock_producto, fecha_modificacion, id_estante, id_producto, id_proveedor, estado)
-                VALUES (%s, %s, %s, %s, %s, 'Disponible')
-            """, (cantidad, datetime.now().date(), id_estante_destino, inv_origen['id_producto'], inv_origen['id_proveedor']))
-        
-        # Actualizar capacidad estante destino
-        cursor.execute("""
-            UPDATE Estante 
-            SET capacidad_ocupada = capacidad_ocupada + %s
-            WHERE id_estante = %s
-        """, (cantidad, id_estante_destino))
-        
-        # Actualizar capacidad almacén destino
-        cursor.execute("""
-            UPDATE Almacen a
-            INNER JOIN Estante e ON a.id_almacen = e.id_almacen
-            SET a.capacidad_ocupada = a.capacidad_ocupada + %s
-            WHERE e.id_almacen = (SELECT id_almacen FROM Estante WHERE id_estante = %s)
-        """, (cantidad, id_estante_destino))
-        
-        # Registrar movimiento
-        cursor.execute("""
-            INSERT INTO Movimiento_Producto (cantidad_producto, motivo, fecha_movimiento, id_persona, id_producto)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (cantidad, 'Traslado', datetime.now().date(), session.get('user_id'), inv_origen['id_producto']))
-        
-        conn.commit()
+        en_transaccion(conn, registrar)
         cursor.close()
         conn.close()
         
+        invalidar_dashboard(*WIDGETS_STOCK)
         flash('Traslado realizado exitosamente', 'success')
         return redirect(url_for('movimientos.trasladar'))
     except Exception as e:
         flash(f'Error al trasladar: {str(e)}', 'danger')
         return redirect(url_for('movimientos.trasladar'))
 
+def lineas_traslado():
+    """Líneas [(id_inventario, id_estante_destino, cantidad), ...] de un traslado por lote.
+
+    Acepta JSON {"lineas": [{"id_inventario", "id_estante_destino", "cantidad"}, ...]}
+    o el formulario (id_inventario[], cantidad[] e id_estante_destino[] o un
+    único id_estante_destino para todas). Lanza ValueError si algo no es válido.
+    """
+    if request.is_json:
+        datos = (request.get_json(silent=True) or {}).get('lineas') or []
+        try:
+            lineas = [(int(l['id_inventario']), int(l['id_estante_destino']), int(l['cantidad'])) for l in datos]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Cada línea necesita id_inventario, id_estante_destino y cantidad numéricos')
+    else:
+        ids = request.form.getlist('id_inventario[]')
+        cantidades = request.form.getlist('cantidad[]')
+        destinos = request.form.getlist('id_estante_destino[]') or [request.form.get('id_estante_destino')] * len(ids)
+        if not (len(ids) == len(cantidades) == len(destinos)):
+            raise ValueError('La cantidad de inventarios, destinos y cantidades no coincide')
+        try:
+            lineas = [(int(i), int(d), int(c)) for i, d, c in zip(ids, destinos, cantidades)]
+        except (TypeError, ValueError):
+            raise ValueError('Inventario, estante destino y cantidad deben ser numéricos')
+
+    if not lineas:
+        raise ValueError('No se seleccionó ninguna línea para trasladar')
+    if len(lineas) > Config.TRASLADO_MAXIMO_LINEAS:
+        raise ValueError(f'Se pueden trasladar como máximo {Config.TRASLADO_MAXIMO_LINEAS} líneas por vez')
+    if any(cantidad <= 0 for _, _, cantidad in lineas):
+        raise ValueError('Las cantidades deben ser mayores a 0')
+    return lineas
+
+@movimientos_bp.route('/trasladar/lote', methods=['POST'])
+def trasladar_lote():
+    """Trasladar muchas líneas de inventario en una sola transacción"""
+    try:
+        lineas = lineas_traslado()
+        conn = get_db_connection()
+        
+        def registrar(cursor):
+            # Stock, capacidades (una sentencia condicionada para todos los destinos),
+            # movimientos (INSERT multi-fila) y dashboard: todo o nada
+            ledger = StockLedger(cursor, session.get('user_id'))
+            for id_inventario, id_estante_destino, cantidad in lineas:
+                ledger.traslado(id_inventario, id_estante_destino, cantidad)
+            return ledger.aplicar()
+        
+        movimientos = en_transaccion(conn, registrar)
+        conn.close()
+        
+        invalidar_dashboard(*WIDGETS_STOCK)
+        if request.is_json:
+            return jsonify({'success': True, 'movimientos': movimientos})
+        flash(f'Traslado por lote realizado: {movimientos} líneas', 'success')
+    except Exception as e:
+        if request.is_json:
+            return jsonify({'success': False, 'error': str(e)}), 400 if isinstance(e, ValueError) else 500
+        flash(f'Error al trasladar por lote: {str(e)}', 'danger')
+    return redirect(url_for('movimientos.trasladar'))
+
 @movimientos_bp.route('/ajustar', methods=['GET', 'POST'])
 def ajustar():
     """Ajustar stock (correcciones, mermas)"""
@@ -386,57 +397,17 @@ def ajustar():
         
         ajuste = int(ajuste)
         
-        # Obtener inventario actual
-        cursor.execute("""
-            SELECT inv.*, e.capacidad_ocupada, e.capacidad, e.id_almacen
-            FROM Inventario inv
-            INNER JOIN Estante e ON inv.id_estante = e.id_estante
-            WHERE inv.id_inventario = %s
-        """, (id_inventario,))
-        inventario = cursor.fetchone()
-        
-        nuevo_stock = inventario['stock_producto'] + ajuste
+        def registrar(cursor):
+            # Inventario (se elimina si queda en 0), estante, almacén, movimiento y dashboard
+            ledger = StockLedger(cursor, session.get('user_id'))
+            ledger.ajuste(id_inventario, ajuste, motivo)
+            ledger.aplicar()
         
-        if nuevo_stock < 0:
-            flash('El stock no puede ser negativo', 'warning')
-            cursor.close()
-            conn.close()
-            return redirect(url_for('movimientos.ajustar'))
-        
-        # Actualizar inventario
-        if nuevo_stock == 0:
-            cursor.execute("DELETE FROM Inventario WHERE id_inventario = %s", (id_inventario,))
-        else:
-            cursor.execute("""
-                UPDATE Inventario 
-                SET stock_producto = %s, fecha_modificacion = %s
-                WHERE id_inventario = %s
-            """, (nuevo_stock, datetime.now().date(), id_inventario))
-        
-        # Actualizar capacidad del estante
-        cursor.execute("""
-            UPDATE Estante 
-            SET capacidad_ocupada = capacidad_ocupada + %s
-            WHERE id_estante = %s
-        """, (ajuste, inventario['id_estante']))
-        
-        # Actualizar capacidad del almacén
-        cursor.execute("""
-            UPDATE Almacen 
-            SET capacidad_ocupada = capacidad_ocupada + %s
-            WHERE id_almacen = %s
-        """, (ajuste, inventario['id_almacen']))
-        
-        # Registrar movimiento
-        cursor.execute("""
-            INSERT INTO Movimiento_Producto (cantidad_producto, motivo, fecha_movimiento, id_persona, id_producto)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (abs(ajuste), motivo, datetime.now().date(), session.get('user_id'), inventario['id_producto']))
-        
-        conn.commit()
+        en_transaccion(conn, registrar)
         cursor.close()
         conn.close()
         
+        invalidar_dashboard(*WIDGETS_STOCK)
         flash('Ajuste de stock realizado exitosamente', 'success')
         return redirect(url_for('movimientos.ajustar'))
     except Exception as e:
@@ -481,7 +452,7 @@ def obtener_info_proveedor(id_producto, id_proveedor):
         cursor.execute("""
             SELECT prov.nombre_proveedor, prov.empresa,
                 COALESCE(SUM(di.cantidad), 0) as total_recibido,
-                COALESCE(SUM(CASE WHEN ped.estado = 'Asignado' THEN di.cantidad ELSE 0 END), 0) as cantidad_asignada
+                COALESCE(SUM(di.cantidad_asignada), 0) as cantidad_asignada
             FROM Proveedor prov
             INNER JOIN Pedido ped ON prov.id_proveedor = ped.id_proveedor
             INNER JOIN Detalle_Ingreso di ON ped.id_pedido = di.id_pedido
@@ -1,17 +1,52 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session
+import click
+from flask import Blueprint, render_template, request, flash, redirect, url_for, session, jsonify
 from datetime import datetime
-import mysql.connector
+from app.db import get_db_connection, obtener_conexion_pool, en_transaccion
+from app.kpi import sumar_kpi, delta_pendientes
+from app.cache import invalidar_dashboard, WIDGETS_RECEPCIONES
+from app.importacion import validar_lineas, leer_filas, importar_recepcion
 from app.config import Config
+from app.typeahead import indice_productos
 
 recepciones_bp = Blueprint('recepciones', __name__, url_prefix='/recepciones')
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host=Config.MYSQL_HOST,
-        user=Config.MYSQL_USER,
-        password=Config.MYSQL_PASSWORD,
-        database=Config.MYSQL_DB
-    )
+@recepciones_bp.cli.command('importar')
+@click.argument('ruta', type=click.Path(exists=True, dir_okay=False))
+@click.option('--proveedor', 'id_proveedor', type=int, required=True, help='id_proveedor de la empresa')
+@click.option('--fecha', 'fecha_pedido', default=None, help='Fecha de pedido AAAA-MM-DD (por defecto hoy)')
+@click.option('--documento', 'numero_documento', type=int, default=None, help='Número de documento del proveedor')
+@click.option('--estado', default='Pendiente', show_default=True)
+def importar_command(ruta, id_proveedor, fecha_pedido, numero_documento, estado):
+    """Importar una recepción desde un archivo CSV/XLSX"""
+    pedido = {
+        'numero_documento': numero_documento,
+        'fecha_pedido': fecha_pedido or datetime.now().date(),
+        'fecha_entrega': None,
+        'estado': estado,
+        'id_proveedor': id_proveedor
+    }
+    
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if ruta.lower().endswith('.xlsx'):
+            id_pedido, lineas, errores = importar_recepcion(cursor, leer_filas(ruta, ruta), pedido)
+        else:
+            with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+                id_pedido, lineas, errores = importar_recepcion(cursor, leer_filas(archivo, ruta), pedido)
+        
+        if errores:
+            conn.rollback()
+            print("❌ No se importó el archivo:")
+            for error in errores:
+                print(f"   {error}")
+            return
+        
+        conn.commit()
+        print(f"✅ Recepción {id_pedido} importada: {lineas} líneas")
+    finally:
+        cursor.close()
+        conn.close()
 
 @recepciones_bp.route('/', methods=['GET'])
 def index():
@@ -61,21 +96,13 @@ def crear():
             cursor.execute("SELECT * FROM Proveedor ORDER BY nombre_proveedor")
             empresas = cursor.fetchall()
             
-            cursor.execute("""
-                SELECT p.*, c.nombre_categoria 
-                FROM Producto p
-                INNER JOIN Categoria_Producto c ON p.id_categoria_producto = c.id_categoria_producto
-                ORDER BY p.id_producto DESC
-            """)
-            productos = cursor.fetchall()
-            
             cursor.close()
             conn.close()
             
+            # Los productos se buscan con /recepciones/productos/buscar mientras se escribe
             return render_template('modulos/recepciones.html',
                                 tab='crear',
-                                empresas=empresas,
-                                productos=productos)
+                                empresas=empresas)
         
         # POST - Crear recepción
         id_proveedor = request.form.get('id_proveedor')
@@ -101,8 +128,16 @@ def crear():
             conn.close()
             return redirect(url_for('recepciones.crear'))
         
+        # Validar todas las líneas antes de escribir nada
+        lineas, errores = validar_lineas(productos_ids, cantidades, precios)
+        if errores:
+            flash('Productos inválidos: ' + '; '.join(errores[:5]), 'warning')
+            cursor.close()
+            conn.close()
+            return redirect(url_for('recepciones.crear'))
+        
         # Calcular precio total
-        precio_total = sum(float(precios[i]) * int(cantidades[i]) for i in range(len(productos_ids)))
+        precio_total = sum(precio * cantidad for _, cantidad, precio in lineas)
         
         # Crear pedido
         query_pedido = """
@@ -117,27 +152,87 @@ def crear():
             estado,
             int(id_proveedor)
         ))
-        conn.commit()
         
         id_pedido = cursor.lastrowid
         
-        # Insertar detalles de ingreso
-        for i in range(len(productos_ids)):
-            cursor.execute("""
-                INSERT INTO Detalle_Ingreso (precio_unitario, cantidad, id_producto, id_pedido)
-                VALUES (%s, %s, %s, %s)
-            """, (float(precios[i]), int(cantidades[i]), int(productos_ids[i]), id_pedido))
+        # Insertar detalles de ingreso (un solo INSERT multi-fila, misma transacción que el pedido)
+        cursor.executemany("""
+            INSERT INTO Detalle_Ingreso (precio_unitario, cantidad, id_producto, id_pedido)
+            VALUES (%s, %s, %s, %s)
+        """, [(precio, cantidad, id_producto, id_pedido) for id_producto, cantidad, precio in lineas])
+        
+        # Actualizar resumen del dashboard en la misma transacción
+        sumar_kpi(cursor, delta_pendientes(None, estado))
         
         conn.commit()
         cursor.close()
         conn.close()
         
+        invalidar_dashboard(*WIDGETS_RECEPCIONES)
         flash('Recepción creada exitosamente', 'success')
         return redirect(url_for('recepciones.ver_detalle', id_pedido=id_pedido))
     except Exception as e:
         flash(f'Error al crear recepción: {str(e)}', 'danger')
         return redirect(url_for('recepciones.crear'))
 
+@recepciones_bp.route('/importar', methods=['GET', 'POST'])
+def importar():
+    """Importar una recepción completa desde un archivo CSV/XLSX del proveedor"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        if request.method == 'GET':
+            cursor.execute("""
+                SELECT id_proveedor, nombre_proveedor, empresa, nit
+                FROM Proveedor
+                ORDER BY empresa, nombre_proveedor
+            """)
+            empresas = cursor.fetchall()
+            
+            cursor.close()
+            conn.close()
+            
+            return render_template('modulos/recepciones.html', tab='importar', empresas=empresas)
+        
+        # POST - Importar archivo
+        archivo = request.files.get('archivo')
+        id_proveedor = request.form.get('id_proveedor')
+        fecha_pedido = request.form.get('fecha_pedido')
+        numero_documento = request.form.get('numero_documento', '').strip()
+        
+        if not archivo or not archivo.filename or not id_proveedor or not fecha_pedido:
+            flash('Archivo, empresa y fecha de pedido son obligatorios', 'warning')
+            return redirect(url_for('recepciones.importar'))
+        
+        pedido = {
+            'numero_documento': int(numero_documento) if numero_documento else None,
+            'fecha_pedido': fecha_pedido,
+            'fecha_entrega': request.form.get('fecha_entrega') or None,
+            'estado': request.form.get('estado', 'Pendiente'),
+            'id_proveedor': int(id_proveedor)
+        }
+        
+        # Werkzeug guarda el archivo subido en disco si es grande: se lee como flujo
+        filas = leer_filas(archivo.stream, archivo.filename)
+        id_pedido, lineas, errores = importar_recepcion(cursor, filas, pedido)
+        
+        if errores:
+            conn.rollback()
+            flash('No se importó el archivo: ' + '; '.join(errores[:10]), 'danger')
+            return redirect(url_for('recepciones.importar'))
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        invalidar_dashboard(*WIDGETS_RECEPCIONES)
+        flash(f'Recepción importada exitosamente: {lineas} líneas', 'success')
+        return redirect(url_for('recepciones.ver_detalle', id_pedido=id_pedido))
+    except Exception as e:
+        flash(f'Error al importar recepción: {str(e)}', 'danger')
+        return redirect(url_for('recepciones.importar'))
+
 @recepciones_bp.route('/<int:id_pedido>', methods=['GET'])
 def ver_detalle(id_pedido):
     """Ver detalle de recepción"""
@@ -211,23 +306,33 @@ def editar(id_pedido):
         fecha_entrega = request.form.get('fecha_entrega')
         estado = request.form.get('estado')
         
-        query = """
-            UPDATE Pedido
-            SET numero_documento = %s, fecha_pedido = %s, fecha_entrega = %s, estado = %s
-            WHERE id_pedido = %s
-        """
-        cursor.execute(query, (
-            int(numero_documento) if numero_documento else None,
-            fecha_pedido,
-            fecha_entrega if fecha_entrega else None,
-            estado,
-            id_pedido
-        ))
-        conn.commit()
+        def registrar(cursor):
+            # Estado anterior bloqueado: dos ediciones simultáneas no descuentan
+            # dos veces la misma recepción pendiente
+            cursor.execute("SELECT estado FROM Pedido WHERE id_pedido = %s FOR UPDATE", (id_pedido,))
+            anterior = cursor.fetchone()
+            
+            query = """
+                UPDATE Pedido
+                SET numero_documento = %s, fecha_pedido = %s, fecha_entrega = %s, estado = %s
+                WHERE id_pedido = %s
+            """
+            cursor.execute(query, (
+                int(numero_documento) if numero_documento else None,
+                fecha_pedido,
+                fecha_entrega if fecha_entrega else None,
+                estado,
+                id_pedido
+            ))
+            
+            if anterior:
+                sumar_kpi(cursor, delta_pendientes(anterior['estado'], estado))
         
+        en_transaccion(conn, registrar)
         cursor.close()
         conn.close()
         
+        invalidar_dashboard(*WIDGETS_RECEPCIONES)
         flash('Recepción actualizada exitosamente', 'success')
         return redirect(url_for('recepciones.ver_detalle', id_pedido=id_pedido))
     except Exception as e:
@@ -239,18 +344,24 @@ def eliminar(id_pedido):
     """Eliminar recepción"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Eliminar detalles primero
-        cursor.execute("DELETE FROM Detalle_Ingreso WHERE id_pedido = %s", (id_pedido,))
         
-        # Eliminar pedido
-        cursor.execute("DELETE FROM Pedido WHERE id_pedido = %s", (id_pedido,))
-        conn.commit()
+        def registrar(cursor):
+            cursor.execute("SELECT estado FROM Pedido WHERE id_pedido = %s FOR UPDATE", (id_pedido,))
+            pedido = cursor.fetchone()
+            
+            # Eliminar detalles primero
+            cursor.execute("DELETE FROM Detalle_Ingreso WHERE id_pedido = %s", (id_pedido,))
+            
+            # Eliminar pedido
+            cursor.execute("DELETE FROM Pedido WHERE id_pedido = %s", (id_pedido,))
+            
+            if pedido:
+                sumar_kpi(cursor, delta_pendientes(pedido['estado'], None))
         
-        cursor.close()
+        en_transaccion(conn, registrar)
         conn.close()
         
+        invalidar_dashboard(*WIDGETS_RECEPCIONES)
         flash('Recepción eliminada exitosamente', 'success')
         return redirect(url_for('recepciones.index'))
     except Exception as e:
@@ -288,6 +399,28 @@ def listar_productos():
         flash(f'Error: {str(e)}', 'danger')
         return redirect(url_for('recepciones.index'))
 
+@recepciones_bp.route('/productos/buscar', methods=['GET'])
+def buscar_productos():
+    """Autocompletado de productos por marca o categoría (JSON columnar)"""
+    try:
+        termino = request.args.get('q', '').strip()
+        limite = min(request.args.get('limite', Config.TYPEAHEAD_LIMITE, type=int) or Config.TYPEAHEAD_LIMITE,
+                     Config.PAGINA_MAXIMA)
+        
+        # Con gunicorn el índice ya se carga al arrancar el worker (post_fork); en el
+        # servidor de desarrollo la primera búsqueda lanza la carga sin esperarla
+        indice_productos.iniciar(obtener_conexion_pool)
+        
+        filas = indice_productos.buscar(termino, limite) if termino else []
+        return jsonify({
+            'success': True,
+            'columnas': ['id_producto', 'marca', 'nombre_categoria'],
+            'filas': filas,
+            'cargando': not indice_productos.listo()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 @recepciones_bp.route('/productos/crear', methods=['POST'])
 def crear_producto():
     """Crear nuevo producto"""
@@ -309,11 +442,18 @@ def crear_producto():
             VALUES (%s, %s, %s, %s)
         """, (marca, fecha_fabricacion if fecha_fabricacion else None, 
             float(costo_inicial) if costo_inicial else 0, int(id_categoria)))
+        id_producto = cursor.lastrowid
         conn.commit()
         
+        cursor.execute("SELECT nombre_categoria FROM Categoria_Producto WHERE id_categoria_producto = %s",
+                       (int(id_categoria),))
+        categoria = cursor.fetchone()
+        
         cursor.close()
         conn.close()
         
+        indice_productos.agregar(id_producto, marca, categoria[0] if categoria else '')
+        invalidar_dashboard('stats', 'productos_categoria')
         flash('Producto creado exitosamente', 'success')
         return redirect(url_for('recepciones.listar_productos'))
     except Exception as e:
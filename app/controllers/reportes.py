@@ -1,30 +1,33 @@
 import os
 from flask import Blueprint, render_template, request, session, redirect, url_for, flash, send_file, current_app
 from app.utils.decorators import login_required
-from app.config import Config
-import mysql.connector
-import pandas as pd
+from app.db import get_db_connection
 import io
-import matplotlib.pyplot as plt
-import matplotlib.gridspec as gridspec
-from matplotlib.backends.backend_pdf import PdfPages
-import seaborn as sns
 import base64
 from datetime import datetime
-import matplotlib
-matplotlib.use('Agg')  # Elimina el warning del hilo GUI
+from functools import lru_cache
+from types import SimpleNamespace
 
 # Blueprint
 reportes_bp = Blueprint('reportes', __name__, url_prefix='/reportes')
 
-def get_db_connection():
-    """Establece y devuelve la conexión a la base de datos MySQL."""
-    return mysql.connector.connect(
-        host=Config.MYSQL_HOST,
-        user=Config.MYSQL_USER,
-        password=Config.MYSQL_PASSWORD,
-        database=Config.MYSQL_DB
-    )
+# === CARGA DIFERIDA DE ANALÍTICA ===
+@lru_cache(maxsize=None)
+def analitica():
+    """Importa pandas, matplotlib y seaborn en la primera petición que los usa.
+
+    Así create_app() y los workers que nunca generan reportes no pagan el
+    tiempo de importación ni la memoria de estas librerías.
+    """
+    import matplotlib
+    matplotlib.use('Agg')  # Elimina el warning del hilo GUI
+    import matplotlib.pyplot as plt
+    import matplotlib.gridspec as gridspec
+    from matplotlib.backends.backend_pdf import PdfPages
+    import pandas as pd
+    import seaborn as sns
+
+    return SimpleNamespace(pd=pd, plt=plt, gridspec=gridspec, PdfPages=PdfPages, sns=sns)
 
 # === CONTROL DE ACCESO ===
 def tiene_acceso_reportes():
@@ -97,6 +100,7 @@ def generar():
     grafico = data.get('grafico_tipo', 'barras')
 
     try:
+        pd = analitica().pd
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
@@ -127,6 +131,7 @@ def exportar_excel():
     if not tiene_acceso_reportes():
         return {'error': 'Acceso denegado'}, 403
 
+    pd = analitica().pd
     data = request.get_json()
     df = pd.DataFrame(data['data'])
     
@@ -249,6 +254,8 @@ def exportar_pdf():
     if not tiene_acceso_reportes():
         return {'error': 'Acceso denegado'}, 403
 
+    lib = analitica()
+    pd, plt, gridspec, PdfPages = lib.pd, lib.plt, lib.gridspec, lib.PdfPages
     data = request.get_json()
     df = pd.DataFrame(data['data'])
     chart_b64 = data.get('chart_url', '').split(',')[1] if data.get('chart_url') else None
@@ -482,6 +489,8 @@ def construir_query_segura(tipo, fi, ff, prov, cat, alm, est, resp):
 # === GENERAR GRÁFICO (generar_grafico) ===
 def generar_grafico(df, tipo, estilo):
     """Genera gráficos de barras o torta y los codifica en Base64."""
+    lib = analitica()
+    plt, sns = lib.plt, lib.sns
     plt.figure(figsize=(8, 5))
     # Estilo minimalista y profesional
     sns.set_style("white")
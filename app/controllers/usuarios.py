@@ -1,19 +1,10 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for, session
 from datetime import datetime
-import mysql.connector
 from werkzeug.security import generate_password_hash
-from app.config import Config
+from app.db import get_db_connection
 
 usuarios_bp = Blueprint('usuarios', __name__, url_prefix='/usuarios')
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host=Config.MYSQL_HOST,
-        user=Config.MYSQL_USER,
-        password=Config.MYSQL_PASSWORD,
-        database=Config.MYSQL_DB
-    )
-
 @usuarios_bp.route('/', methods=['GET'])
 def index():
     """Listar todos los usuarios (empleados y clientes)"""
@@ -0,0 +1,145 @@
+import os
+import random
+import threading
+import time
+
+from flask import g, has_app_context
+from mysql.connector import errorcode, pooling
+from mysql.connector.errors import PoolError
+
+from app.config import Config
+
+# Pool único por proceso. Se crea en el primer uso (no al importar), así los
+# workers que hacen fork heredan el módulo pero no los sockets abiertos.
+_pool = None
+_pool_lock = threading.Lock()
+
+# Errores tras los que InnoDB ya descartó el trabajo y conviene repetir la transacción
+ERRORES_REINTENTABLES = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+
+def get_pool():
+    """Crear (una sola vez) y devolver el pool de conexiones MySQL"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name='almacenes',
+                    pool_size=Config.MYSQL_POOL_SIZE,
+                    pool_reset_session=True,
+                    host=Config.MYSQL_HOST,
+                    user=Config.MYSQL_USER,
+                    password=Config.MYSQL_PASSWORD,
+                    database=Config.MYSQL_DB,
+                    port=Config.MYSQL_PORT
+                )
+    return _pool
+
+
+def reiniciar_pool():
+    """Olvidar el pool heredado tras un fork; el proceso hijo crea el suyo.
+
+    Los sockets de un pool creado antes del fork quedarían compartidos entre
+    procesos, así que cada worker empieza sin pool propio.
+    """
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reiniciar_pool)
+
+
+def obtener_conexion_pool():
+    """Sacar una conexión del pool esperando como máximo MYSQL_POOL_TIMEOUT segundos.
+
+    El close() de la conexión devuelta la regresa al pool.
+    """
+    pool = get_pool()
+    limite = time.monotonic() + Config.MYSQL_POOL_TIMEOUT
+    while True:
+        try:
+            return pool.get_connection()
+        except PoolError:
+            # mysql.connector no espera: si el pool está agotado falla al instante
+            if time.monotonic() >= limite:
+                raise
+            time.sleep(0.05)
+
+
+class ConexionPeticion:
+    """Conexión compartida por todos los accesos de una misma petición.
+
+    Los controladores siguen llamando a conn.close() como antes; aquí eso solo
+    descarta la transacción pendiente. La conexión vuelve al pool en el
+    teardown de la petición (ver cerrar_conexion).
+    """
+
+    def __init__(self, cnx):
+        self._cnx = cnx
+
+    def __getattr__(self, nombre):
+        return getattr(self._cnx, nombre)
+
+    def close(self):
+        # Igual que al cerrar una conexión real: lo no confirmado se pierde
+        if self._cnx.in_transaction:
+            self._cnx.rollback()
+
+
+def get_db_connection():
+    """Obtener conexión a la base de datos.
+
+    Dentro de una petición (o contexto de aplicación) devuelve siempre la misma
+    conexión, guardada en flask.g. Fuera de contexto (hilos, scripts) devuelve
+    una conexión propia del pool que el llamador debe cerrar.
+    """
+    if not has_app_context():
+        return obtener_conexion_pool()
+
+    if 'db' not in g:
+        g.db = ConexionPeticion(obtener_conexion_pool())
+    return g.db
+
+
+def en_transaccion(conn, operacion, intentos=None):
+    """Ejecutar operacion(cursor) y confirmar; devuelve lo que devuelva operacion.
+
+    Si choca con otra transacción (deadlock o espera de bloqueo vencida) se
+    hace rollback y se repite desde el principio, esperando el doble en cada
+    intento con una variación al azar para que las transacciones que chocaron
+    no vuelvan a coincidir. Cualquier otro error deshace la transacción y se
+    propaga. operacion no debe tener efectos fuera de la base de datos.
+    """
+    intentos = intentos or Config.TRANSACCION_REINTENTOS
+    for intento in range(1, intentos + 1):
+        cursor = conn.cursor(dictionary=True)
+        try:
+            resultado = operacion(cursor)
+            conn.commit()
+            return resultado
+        except Exception as e:
+            conn.rollback()
+            if getattr(e, 'errno', None) not in ERRORES_REINTENTABLES or intento == intentos:
+                raise
+            time.sleep(Config.TRANSACCION_ESPERA * 2 ** (intento - 1) * random.uniform(0.5, 1.5))
+        finally:
+            cursor.close()
+
+
+def cerrar_conexion(error=None):
+    """Devolver al pool la conexión de la petición, si se llegó a abrir"""
+    conexion = g.pop('db', None)
+    if conexion is None:
+        return
+    try:
+        conexion._cnx.close()
+    except Exception as e:
+        print(f"❌ Error devolviendo la conexión al pool: {e}")
+
+
+def init_app(app):
+    """Registrar la devolución de conexiones al terminar cada petición"""
+    app.teardown_appcontext(cerrar_conexion)
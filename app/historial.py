@@ -0,0 +1,131 @@
+"""Historial de movimientos: esquema, relleno y consulta paginada.
+
+Cada Movimiento_Producto guarda el proveedor (empresa dueña del stock) al
+momento de escribirse, así el listado no necesita calcular por pedido el
+"último proveedor" de cada producto sobre todo Inventario. Para bases
+existentes, `flask movimientos historial` agrega la columna y los índices y
+rellena las filas anteriores (se puede repetir: solo toca las que faltan).
+
+El listado se pagina por cursor sobre (fecha_movimiento, id_movimiento_producto)
+usando los índices compuestos de abajo, también con filtros de operador o producto.
+"""
+from app.busqueda import condicion_producto
+
+COLUMNA = ('id_proveedor', "ALTER TABLE Movimiento_Producto ADD COLUMN id_proveedor INT NULL")
+
+INDICES = [
+    ('idx_movimiento_fecha', 'fecha_movimiento, id_movimiento_producto'),
+    ('idx_movimiento_persona_fecha', 'id_persona, fecha_movimiento, id_movimiento_producto'),
+    ('idx_movimiento_producto_fecha', 'id_producto, fecha_movimiento, id_movimiento_producto'),
+]
+
+# Filas de Movimiento_Producto por UPDATE al rellenar, para no bloquear la tabla entera
+LOTE_RELLENO = 5000
+
+# Proveedor de un movimiento anterior a la columna: el del inventario más reciente
+# del producto (lo que mostraba el listado) o, si ya no hay inventario, el de su recepción
+_PROVEEDOR_ANTERIOR = """
+    COALESCE(
+        (SELECT inv.id_proveedor FROM Inventario inv
+         WHERE inv.id_producto = m.id_producto
+         ORDER BY inv.id_inventario DESC LIMIT 1),
+        (SELECT ped.id_proveedor FROM Detalle_Ingreso di
+         INNER JOIN Pedido ped ON di.id_pedido = ped.id_pedido
+         WHERE di.id_producto = m.id_producto
+         ORDER BY di.id_detalle_ingreso DESC LIMIT 1)
+    )
+"""
+
+
+def preparar_esquema(cursor):
+    """Agregar la columna id_proveedor y los índices del historial que falten"""
+    columna, ddl = COLUMNA
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = 'Movimiento_Producto' AND column_name = %s
+    """, (columna,))
+    if not cursor.fetchone()[0]:
+        cursor.execute(ddl)
+        print(f"✅ Columna {columna} agregada a Movimiento_Producto")
+
+    for indice, columnas in INDICES:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = 'Movimiento_Producto' AND index_name = %s
+        """, (indice,))
+        if cursor.fetchone()[0]:
+            continue
+        cursor.execute(f"ALTER TABLE Movimiento_Producto ADD INDEX {indice} ({columnas})")
+        print(f"✅ Índice {indice} creado en Movimiento_Producto")
+
+
+def rellenar_proveedores(conn, cursor, lote=LOTE_RELLENO):
+    """Completar id_proveedor de los movimientos que no lo tienen, un rango de ids por transacción.
+
+    Devuelve la cantidad de filas actualizadas.
+    """
+    cursor.execute("SELECT MIN(id_movimiento_producto), MAX(id_movimiento_producto) FROM Movimiento_Producto")
+    minimo, maximo = cursor.fetchone()
+    if minimo is None:
+        return 0
+
+    total = 0
+    for desde in range(minimo, maximo + 1, lote):
+        cursor.execute(f"""
+            UPDATE Movimiento_Producto m
+            SET m.id_proveedor = {_PROVEEDOR_ANTERIOR}
+            WHERE m.id_movimiento_producto BETWEEN %s AND %s
+              AND m.id_proveedor IS NULL
+        """, (desde, desde + lote - 1))
+        total += cursor.rowcount
+        conn.commit()
+    return total
+
+
+def filtros_movimientos(fecha_desde='', fecha_hasta='', id_persona='', producto=''):
+    """Condiciones (sql, params) para consultas sobre Movimiento_Producto m con Producto p"""
+    sql = ""
+    params = []
+    if fecha_desde:
+        sql += " AND m.fecha_movimiento >= %s"
+        params.append(fecha_desde)
+    if fecha_hasta:
+        sql += " AND m.fecha_movimiento <= %s"
+        params.append(fecha_hasta)
+    if id_persona:
+        sql += " AND m.id_persona = %s"
+        params.append(int(id_persona))
+    if producto:
+        condicion, valores = condicion_producto(producto)
+        sql += condicion
+        params.extend(valores)
+    return sql, params
+
+
+def pagina_movimientos(cursor, filtros, params, desde, tamano):
+    """Movimientos más recientes primero, después de la clave `desde` [fecha, id].
+
+    Devuelve (filas, hay_mas). Trae una fila de más solo para saber si sigue otra página.
+    """
+    params = list(params)
+    if desde:
+        filtros += " AND (m.fecha_movimiento, m.id_movimiento_producto) < (%s, %s)"
+        params.extend(desde)
+
+    cursor.execute(f"""
+        SELECT m.id_movimiento_producto, m.cantidad_producto, m.motivo,
+            m.fecha_movimiento, m.id_persona, m.id_producto,
+            p.marca, cat.nombre_categoria,
+            per.nombre, per.apellido_paterno,
+            prov.nombre_proveedor, prov.empresa
+        FROM Movimiento_Producto m
+        INNER JOIN Producto p ON m.id_producto = p.id_producto
+        INNER JOIN Categoria_Producto cat ON p.id_categoria_producto = cat.id_categoria_producto
+        LEFT JOIN Persona per ON m.id_persona = per.id_persona
+        LEFT JOIN Proveedor prov ON m.id_proveedor = prov.id_proveedor
+        WHERE 1=1 {filtros}
+        ORDER BY m.fecha_movimiento DESC, m.id_movimiento_producto DESC
+        LIMIT %s
+    """, params + [tamano + 1])
+    filas = cursor.fetchall()
+    return filas[:tamano], len(filas) > tamano
@@ -0,0 +1,176 @@
+"""Líneas de recepción: validación e importación masiva desde CSV/XLSX.
+
+El archivo se lee fila por fila (csv del estándar u openpyxl en modo
+read_only) y se procesa en lotes de IMPORTACION_LOTE líneas: cada lote se
+valida junto y se inserta con un INSERT multi-fila. En memoria solo vive el
+lote actual y el mapa marca → id_producto, así el consumo no crece con el
+tamaño del archivo.
+
+Columnas reconocidas (sin importar mayúsculas): id_producto o producto/marca,
+cantidad, precio_unitario o precio.
+"""
+import csv
+import io
+from itertools import islice
+
+from app.config import Config
+from app.kpi import sumar_kpi, delta_pendientes
+
+COLUMNAS_PRODUCTO = ('id_producto', 'producto', 'marca')
+COLUMNAS_PRECIO = ('precio_unitario', 'precio')
+
+# Errores que se informan como máximo (el resto solo se cuenta)
+MAX_ERRORES = 50
+
+
+def validar_lineas(productos_ids, cantidades, precios, numeros=None):
+    """Validar en una pasada los arreglos paralelos del formulario.
+
+    Devuelve (lineas, errores): lineas es [(id_producto, cantidad, precio), ...]
+    y errores la lista de mensajes (vacía si todo es válido). `numeros` indica
+    el número de línea de cada elemento para los mensajes (por defecto 1, 2, ...).
+    """
+    if not (len(productos_ids) == len(cantidades) == len(precios)):
+        return [], ['la cantidad de productos, cantidades y precios no coincide']
+
+    numeros = numeros or range(1, len(productos_ids) + 1)
+    lineas = []
+    errores = []
+    for n, id_producto, cantidad, precio in zip(numeros, productos_ids, cantidades, precios):
+        try:
+            linea = (int(id_producto), int(cantidad), float(precio))
+        except (TypeError, ValueError):
+            errores.append(f'línea {n}: valores no numéricos')
+            continue
+        if linea[1] <= 0:
+            errores.append(f'línea {n}: la cantidad debe ser mayor a 0')
+        elif linea[2] < 0:
+            errores.append(f'línea {n}: el precio no puede ser negativo')
+        else:
+            lineas.append(linea)
+    return lineas, errores
+
+
+def leer_filas(archivo, nombre):
+    """Iterar las filas de un CSV o XLSX como dicts con claves en minúscula"""
+    if nombre.lower().endswith('.xlsx'):
+        return _filas_xlsx(archivo)
+    return _filas_csv(archivo)
+
+
+def _filas_csv(archivo):
+    texto = archivo if isinstance(archivo, io.TextIOBase) else io.TextIOWrapper(archivo, encoding='utf-8-sig')
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+    for fila in csv.DictReader(texto, dialect=dialecto):
+        yield {(clave or '').strip().lower(): valor for clave, valor in fila.items()}
+
+
+def _filas_xlsx(archivo):
+    # openpyxl solo se necesita para importar planillas
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = [str(c or '').strip().lower() for c in next(filas, [])]
+        for fila in filas:
+            if any(valor is not None for valor in fila):
+                yield dict(zip(encabezado, fila))
+    finally:
+        libro.close()
+
+
+def mapa_productos(cursor):
+    """marca (en minúscula) → id_producto más reciente, cargado una sola vez"""
+    cursor.execute("SELECT marca, MAX(id_producto) AS id_producto FROM Producto GROUP BY marca")
+    return {str(fila['marca']).strip().lower(): fila['id_producto'] for fila in cursor.fetchall()}
+
+
+def _columna(fila, nombres):
+    for nombre in nombres:
+        valor = fila.get(nombre)
+        if valor not in (None, ''):
+            return valor
+    return None
+
+
+def resolver_lote(filas, productos, desde):
+    """Pasar un lote de filas a los arreglos de validar_lineas, resolviendo marcas"""
+    ids, cantidades, precios, numeros, errores = [], [], [], [], []
+    for n, fila in enumerate(filas, start=desde):
+        producto = _columna(fila, COLUMNAS_PRODUCTO)
+        if producto is None:
+            errores.append(f'línea {n}: falta el producto')
+            continue
+        if fila.get('id_producto') in (None, ''):
+            id_producto = productos.get(str(producto).strip().lower())
+            if id_producto is None:
+                errores.append(f'línea {n}: el producto "{producto}" no existe')
+                continue
+            producto = id_producto
+        ids.append(producto)
+        cantidades.append(fila.get('cantidad'))
+        precios.append(_columna(fila, COLUMNAS_PRECIO))
+        numeros.append(n)
+    return ids, cantidades, precios, numeros, errores
+
+
+def importar_recepcion(cursor, filas, pedido, lote=None):
+    """Crear un Pedido con todas las líneas de `filas` en la transacción del cursor.
+
+    `pedido` trae numero_documento, fecha_pedido, fecha_entrega, estado e
+    id_proveedor. Devuelve (id_pedido, lineas, errores). Si hay errores el
+    llamador debe hacer rollback: las líneas válidas ya se insertaron.
+    """
+    lote = lote or Config.IMPORTACION_LOTE
+    productos = mapa_productos(cursor)
+
+    # El total se conoce al final; el encabezado se crea primero para tener id_pedido
+    cursor.execute("""
+        INSERT INTO Pedido (numero_documento, precio_total, fecha_pedido, fecha_entrega, estado, id_proveedor)
+        VALUES (%s, 0, %s, %s, %s, %s)
+    """, (pedido['numero_documento'], pedido['fecha_pedido'], pedido['fecha_entrega'],
+          pedido['estado'], pedido['id_proveedor']))
+    id_pedido = cursor.lastrowid
+
+    total_lineas = 0
+    precio_total = 0.0
+    errores = []
+    cantidad_errores = 0
+    filas = iter(filas)
+    desde = 2  # la fila 1 es el encabezado
+    while True:
+        bloque = list(islice(filas, lote))
+        if not bloque:
+            break
+
+        # Resolver y validar el lote completo; los números de línea son los del archivo
+        ids, cantidades, precios, numeros, errores_lote = resolver_lote(bloque, productos, desde)
+        lineas, errores_validacion = validar_lineas(ids, cantidades, precios, numeros)
+        errores_lote += errores_validacion
+
+        cantidad_errores += len(errores_lote)
+        errores += errores_lote[:MAX_ERRORES - len(errores)]
+
+        if lineas and not cantidad_errores:
+            cursor.executemany("""
+                INSERT INTO Detalle_Ingreso (precio_unitario, cantidad, id_producto, id_pedido)
+                VALUES (%s, %s, %s, %s)
+            """, [(precio, cantidad, id_producto, id_pedido) for id_producto, cantidad, precio in lineas])
+        total_lineas += len(lineas)
+        precio_total += sum(precio * cantidad for _, cantidad, precio in lineas)
+        desde += len(bloque)
+
+    if cantidad_errores > len(errores):
+        errores.append(f'... y {cantidad_errores - len(errores)} errores más')
+    if not total_lineas and not errores:
+        errores.append('el archivo no tiene líneas')
+
+    cursor.execute("UPDATE Pedido SET precio_total = %s WHERE id_pedido = %s", (precio_total, id_pedido))
+    sumar_kpi(cursor, delta_pendientes(None, pedido['estado']))
+    return id_pedido, total_lineas, errores
@@ -0,0 +1,137 @@
+"""Resumen_KPI: indicadores del dashboard mantenidos de forma incremental.
+
+Cada fila es un contador (clave, id_ref) → valor:
+
+    stock_almacen           id_almacen     unidades en inventario del almacén
+    stock_producto          id_producto    unidades en inventario del producto
+    recepciones_pendientes  0              pedidos en estado 'Pendiente'
+    movimientos_dia         AAAAMMDD       movimientos registrados ese día
+    version_proveedor       id_proveedor   cambios en la disponibilidad de la empresa
+
+Los flujos de escritura llaman a sumar_kpi() con el mismo cursor, dentro de
+su transacción, así el resumen se confirma o se descarta junto con el cambio.
+version_proveedor solo avanza: es el ETag de /despachos/productos/<id> y la
+suben el StockLedger, las reservas y las ediciones de estantes y almacenes.
+"""
+
+CREAR_TABLA = """
+    CREATE TABLE IF NOT EXISTS Resumen_KPI (
+        clave VARCHAR(30) NOT NULL,
+        id_ref INT NOT NULL,
+        valor BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (clave, id_ref),
+        KEY idx_resumen_kpi_valor (clave, valor)
+    )
+"""
+
+PENDIENTE = 'Pendiente'
+
+
+def clave_dia(fecha):
+    """id_ref de movimientos_dia para una fecha (AAAAMMDD)"""
+    return int(fecha.strftime('%Y%m%d'))
+
+
+def sumar_kpi(cursor, deltas):
+    """Aplicar deltas [(clave, id_ref, delta), ...] en una sola sentencia"""
+    filas = [(clave, id_ref, delta) for clave, id_ref, delta in deltas if delta]
+    if not filas:
+        return
+
+    cursor.executemany("""
+        INSERT INTO Resumen_KPI (clave, id_ref, valor)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE valor = valor + VALUES(valor)
+    """, filas)
+
+
+def deltas_stock(id_almacen, id_producto, cantidad):
+    """Deltas de un cambio de stock en un almacén"""
+    return [
+        ('stock_almacen', id_almacen, cantidad),
+        ('stock_producto', id_producto, cantidad)
+    ]
+
+
+def delta_movimientos(fecha, cantidad=1):
+    """Delta por movimientos registrados en una fecha"""
+    return [('movimientos_dia', clave_dia(fecha), cantidad)]
+
+
+def delta_pendientes(estado_anterior, estado_nuevo):
+    """Delta de recepciones pendientes por un cambio de estado de Pedido"""
+    delta = int(estado_nuevo == PENDIENTE) - int(estado_anterior == PENDIENTE)
+    return [('recepciones_pendientes', 0, delta)]
+
+
+def delta_versiones(ids_proveedor):
+    """Deltas que suben la versión de cada empresa afectada (una vez por empresa)"""
+    return [('version_proveedor', id_proveedor, 1)
+            for id_proveedor in sorted({i for i in ids_proveedor if i is not None})]
+
+
+def subir_versiones(cursor, condicion, params=()):
+    """Subir la versión de las empresas con líneas en `condicion`.
+
+    `condicion` filtra Inventario inv INNER JOIN Estante e, así sirve tanto
+    para líneas puntuales como para todo un estante o almacén.
+    """
+    cursor.execute(f"""
+        INSERT INTO Resumen_KPI (clave, id_ref, valor)
+        SELECT 'version_proveedor', inv.id_proveedor, 1
+        FROM Inventario inv
+        INNER JOIN Estante e ON inv.id_estante = e.id_estante
+        WHERE inv.id_proveedor IS NOT NULL AND {condicion}
+        GROUP BY inv.id_proveedor
+        ORDER BY inv.id_proveedor
+        ON DUPLICATE KEY UPDATE valor = valor + VALUES(valor)
+    """, params)
+
+
+def version_proveedor(cursor, id_proveedor):
+    """Versión actual de una empresa (0 si nunca cambió)"""
+    cursor.execute("""
+        SELECT valor FROM Resumen_KPI WHERE clave = 'version_proveedor' AND id_ref = %s
+    """, (id_proveedor,))
+    fila = cursor.fetchone()
+    if not fila:
+        return 0
+    return fila['valor'] if isinstance(fila, dict) else fila[0]
+
+
+def reconstruir_kpi(cursor):
+    """Recalcular Resumen_KPI desde cero con consultas de conjunto"""
+    cursor.execute(CREAR_TABLA)
+    # Las versiones no se recalculan: si volvieran a 0 un ETag viejo podría coincidir otra vez
+    cursor.execute("DELETE FROM Resumen_KPI WHERE clave <> 'version_proveedor'")
+
+    cursor.execute("""
+        INSERT INTO Resumen_KPI (clave, id_ref, valor)
+        SELECT 'stock_almacen', e.id_almacen, SUM(i.stock_producto)
+        FROM Inventario i
+        INNER JOIN Estante e ON i.id_estante = e.id_estante
+        GROUP BY e.id_almacen
+    """)
+    cursor.execute("""
+        INSERT INTO Resumen_KPI (clave, id_ref, valor)
+        SELECT 'stock_producto', id_producto, SUM(stock_producto)
+        FROM Inventario
+        GROUP BY id_producto
+    """)
+    cursor.execute("""
+        INSERT INTO Resumen_KPI (clave, id_ref, valor)
+        SELECT 'recepciones_pendientes', 0, COUNT(*)
+        FROM Pedido
+        WHERE estado = %s
+    """, (PENDIENTE,))
+    cursor.execute("""
+        INSERT INTO Resumen_KPI (clave, id_ref, valor)
+        SELECT 'movimientos_dia', m.dia, COUNT(*)
+        FROM (
+            SELECT YEAR(fecha_movimiento) * 10000 + MONTH(fecha_movimiento) * 100
+                + DAY(fecha_movimiento) AS dia
+            FROM Movimiento_Producto
+            WHERE fecha_movimiento IS NOT NULL
+        ) m
+        GROUP BY m.dia
+    """)
@@ -0,0 +1,151 @@
+"""Planificación de rutas de picking.
+
+Cada almacén se modela como pasillos paralelos unidos por un pasillo
+transversal adelante (y = 0, donde está la entrada) y otro al fondo. El campo
+Estante.pasillo se interpreta como "<pasillo>-<posición>" ("A-03", "B12",
+"3/7"): la parte final numérica es la posición dentro del pasillo y el resto
+identifica el pasillo. Sin posición, el estante queda al inicio del pasillo.
+
+La ruta se arma con la heurística S-shape (recorrer los pasillos con picks
+alternando el sentido) y, si hay pocas paradas, se mejora con 2-opt.
+"""
+import re
+from itertools import groupby
+
+from app.config import Config
+
+_UBICACION = re.compile(r'^(?:pasillo\s*)?(.*?)[\s\-_/.]*(\d+)?$', re.IGNORECASE)
+_TROZOS = re.compile(r'(\d+)')
+
+
+def ubicacion(pasillo):
+    """Separar Estante.pasillo en (pasillo, posición)"""
+    texto = (pasillo or '').strip()
+    coincidencia = _UBICACION.match(texto)
+    nombre, posicion = coincidencia.group(1), coincidencia.group(2)
+    if not nombre:
+        # Solo número ("7", "Pasillo 7"): es el pasillo, no la posición
+        return posicion or '', 0
+    return nombre.upper(), int(posicion) if posicion else 0
+
+
+def orden_natural(texto):
+    """Clave para ordenar "A2" antes que "A10" """
+    return [int(t) if t.isdigit() else t for t in _TROZOS.split(texto)]
+
+
+def construir_plano(estantes):
+    """Plano por almacén a partir de [{id_almacen, id_estante, pasillo}, ...].
+
+    Devuelve {id_almacen: {'estantes': {id_estante: (x, y)}, 'largo': metros}}
+    con las coordenadas en metros; la entrada está en (0, 0).
+    """
+    planos = {}
+    por_almacen = sorted(estantes, key=lambda e: e['id_almacen'])
+    for id_almacen, grupo in groupby(por_almacen, key=lambda e: e['id_almacen']):
+        grupo = [(e['id_estante'], *ubicacion(e['pasillo'])) for e in grupo]
+        pasillos = sorted({nombre for _, nombre, _ in grupo}, key=orden_natural)
+        indice = {nombre: i + 1 for i, nombre in enumerate(pasillos)}
+        profundidad = max(posicion for _, _, posicion in grupo) + 1
+        planos[id_almacen] = {
+            'estantes': {
+                id_estante: (indice[nombre] * Config.PICKING_ANCHO_PASILLO,
+                             posicion * Config.PICKING_LARGO_POSICION)
+                for id_estante, nombre, posicion in grupo
+            },
+            'largo': profundidad * Config.PICKING_LARGO_POSICION
+        }
+    return planos
+
+
+def distancia(a, b, largo):
+    """Metros entre dos puntos; para cambiar de pasillo se sale por adelante o por el fondo"""
+    if a[0] == b[0]:
+        return abs(a[1] - b[1])
+    return abs(a[0] - b[0]) + min(a[1] + b[1], 2 * largo - a[1] - b[1])
+
+
+def longitud_ruta(puntos, largo):
+    """Metros de entrada → puntos → entrada"""
+    recorrido = [(0, 0)] + list(puntos) + [(0, 0)]
+    return sum(distancia(recorrido[i], recorrido[i + 1], largo) for i in range(len(recorrido) - 1))
+
+
+def s_shape(puntos):
+    """Orden S-shape: pasillos de izquierda a derecha alternando subida y bajada"""
+    ordenados = []
+    subiendo = True
+    for _, grupo in groupby(sorted(puntos), key=lambda p: p[0]):
+        grupo = list(grupo)
+        ordenados += grupo if subiendo else grupo[::-1]
+        subiendo = not subiendo
+    return ordenados
+
+
+def dos_opt(puntos, largo):
+    """Mejorar una ruta invirtiendo tramos mientras se acorte (entrada fija en ambos extremos)"""
+    nodos = [(0, 0)] + list(puntos) + [(0, 0)]
+    d = [[distancia(p, q, largo) for q in nodos] for p in nodos]
+    orden = list(range(len(nodos)))
+    mejora = True
+    while mejora:
+        mejora = False
+        for i in range(1, len(orden) - 2):
+            for j in range(i + 1, len(orden) - 1):
+                a, b, c, e = orden[i - 1], orden[i], orden[j], orden[j + 1]
+                if d[a][b] + d[c][e] - d[a][c] - d[b][e] > 1e-9:
+                    orden[i:j + 1] = orden[i:j + 1][::-1]
+                    mejora = True
+    return [nodos[i] for i in orden[1:-1]]
+
+
+def planificar_ruta(detalles, planos):
+    """Ordenar las líneas de picking y estimar el recorrido en metros.
+
+    Las líneas se agrupan por estante (una parada por estante) y los almacenes
+    se recorren en el orden de su nombre. Las líneas sin ubicación van al final.
+    Devuelve (detalles_ordenados, distancia_total).
+    """
+    sin_ubicacion = [d for d in detalles if d.get('id_estante') is None or d.get('id_almacen') not in planos]
+    con_ubicacion = [d for d in detalles if d.get('id_estante') is not None and d.get('id_almacen') in planos]
+
+    ordenados = []
+    total = 0.0
+    por_almacen = sorted(con_ubicacion, key=lambda d: (d.get('nombre_almacen') or '', d['id_almacen']))
+    for id_almacen, lineas in groupby(por_almacen, key=lambda d: d['id_almacen']):
+        plano = planos[id_almacen]
+        paradas = {}
+        for linea in lineas:
+            paradas.setdefault(plano['estantes'][linea['id_estante']], []).append(linea)
+
+        ruta = s_shape(paradas)
+        if len(ruta) <= Config.PICKING_2OPT_MAX_PARADAS:
+            ruta = dos_opt(ruta, plano['largo'])
+
+        total += longitud_ruta(ruta, plano['largo'])
+        for punto in ruta:
+            ordenados += paradas[punto]
+
+    return ordenados + sin_ubicacion, round(total, 1)
+
+
+def consolidar_oleada(detalles):
+    """Unir las líneas de varios despachos por ubicación de inventario.
+
+    Devuelve (lineas_consolidadas, separacion): cada línea consolidada suma la
+    cantidad solicitada de un mismo id_inventario y guarda en 'pedidos' cuánto
+    lleva cada despacho; separacion agrupa por despacho lo que hay que
+    repartirle al final del recorrido.
+    """
+    consolidadas = {}
+    separacion = {}
+    for d in detalles:
+        # Sin inventario asignado no hay ubicación: se agrupa por producto
+        clave = ('inventario', d['id_inventario']) if d.get('id_inventario') else ('producto', d['id_producto'])
+        linea = consolidadas.get(clave)
+        if linea is None:
+            linea = consolidadas[clave] = dict(d, cantidad_total=0, pedidos=[])
+        linea['cantidad_total'] += d['cantidad_solicitada']
+        linea['pedidos'].append((d['numero_guia'], d['cantidad_solicitada']))
+        separacion.setdefault(d['numero_guia'], []).append(d)
+    return list(consolidadas.values()), separacion
@@ -0,0 +1,110 @@
+"""Reserva de stock entre la creación y la confirmación de un despacho.
+
+Reserva_Inventario guarda, por línea de inventario, las unidades comprometidas
+por despachos abiertos ('Pendiente' o 'En Preparación'). Lo disponible para
+prometer es stock_producto - cantidad reservada:
+
+    crear despacho     → reservar()  (valida con las filas de Inventario bloqueadas)
+    cancelar despacho  → liberar()
+    confirmar despacho → liberar() lo solicitado; el stock ya se descontó
+
+Las dos suben la versión de las empresas afectadas (app.kpi, version_proveedor)
+en la misma transacción. Las funciones reciben un cursor con dictionary=True.
+"""
+from app.kpi import sumar_kpi, subir_versiones, delta_versiones
+from app.utils.sql import tabla_valores
+
+CREAR_TABLA = """
+    CREATE TABLE IF NOT EXISTS Reserva_Inventario (
+        id_inventario INT NOT NULL PRIMARY KEY,
+        cantidad BIGINT NOT NULL DEFAULT 0
+    )
+"""
+
+ESTADOS_ABIERTOS = ('Pendiente', 'En Preparación')
+
+# Expresión de disponible para consultas con Inventario inv LEFT JOIN Reserva_Inventario r
+DISPONIBLE = "CAST(inv.stock_producto AS SIGNED) - COALESCE(r.cantidad, 0)"
+
+
+def agrupar(lineas):
+    """Sumar [(id_inventario, cantidad), ...] por inventario"""
+    totales = {}
+    for id_inventario, cantidad in lineas:
+        if id_inventario:
+            totales[int(id_inventario)] = totales.get(int(id_inventario), 0) + int(cantidad)
+    return totales
+
+
+def reservar(cursor, lineas):
+    """Reservar stock para [(id_inventario, cantidad), ...] o fallar sin reservar nada.
+
+    Las filas de Inventario quedan bloqueadas hasta el commit, así dos
+    despachos simultáneos no pueden prometer las mismas unidades.
+    """
+    totales = agrupar(lineas)
+    if not totales:
+        return
+
+    marcadores = ', '.join(['%s'] * len(totales))
+    cursor.execute(f"""
+        SELECT inv.id_inventario, inv.id_proveedor, {DISPONIBLE} AS disponible
+        FROM Inventario inv
+        LEFT JOIN Reserva_Inventario r ON inv.id_inventario = r.id_inventario
+        WHERE inv.id_inventario IN ({marcadores})
+        FOR UPDATE
+    """, list(totales))
+    filas = cursor.fetchall()
+    disponibles = {fila['id_inventario']: fila['disponible'] for fila in filas}
+
+    insuficientes = [i for i, cantidad in totales.items() if disponibles.get(i, 0) < cantidad]
+    if insuficientes:
+        raise ValueError(f'Stock disponible insuficiente en {len(insuficientes)} ubicación(es) '
+                         f'(inventario {", ".join(map(str, insuficientes))})')
+
+    cursor.executemany("""
+        INSERT INTO Reserva_Inventario (id_inventario, cantidad) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE cantidad = cantidad + VALUES(cantidad)
+    """, list(totales.items()))
+    sumar_kpi(cursor, delta_versiones(fila['id_proveedor'] for fila in filas))
+
+
+def liberar(cursor, lineas):
+    """Descontar de la reserva [(id_inventario, cantidad), ...]"""
+    totales = agrupar(lineas)
+    if not totales:
+        return
+
+    valores, params = tabla_valores(('id', 'cantidad'), list(totales.items()))
+    cursor.execute(f"""
+        UPDATE Reserva_Inventario r
+        INNER JOIN ({valores}) v ON r.id_inventario = v.id
+        SET r.cantidad = GREATEST(r.cantidad - v.cantidad, 0)
+    """, params)
+    marcadores = ', '.join(['%s'] * len(totales))
+    subir_versiones(cursor, f"inv.id_inventario IN ({marcadores})", list(totales))
+
+
+def lineas_despacho(cursor, id_pedido_despacho):
+    """Lo que reserva un despacho: [(id_inventario, cantidad_solicitada), ...]"""
+    cursor.execute("""
+        SELECT id_inventario, cantidad_solicitada
+        FROM Detalle_Despacho
+        WHERE id_pedido_despacho = %s AND id_inventario IS NOT NULL
+    """, (id_pedido_despacho,))
+    return [(fila['id_inventario'], fila['cantidad_solicitada']) for fila in cursor.fetchall()]
+
+
+def reconstruir_reservas(cursor):
+    """Recalcular Reserva_Inventario desde los despachos abiertos"""
+    cursor.execute(CREAR_TABLA)
+    cursor.execute("DELETE FROM Reserva_Inventario")
+    cursor.execute("""
+        INSERT INTO Reserva_Inventario (id_inventario, cantidad)
+        SELECT dd.id_inventario, SUM(dd.cantidad_solicitada)
+        FROM Detalle_Despacho dd
+        INNER JOIN Pedido_Despacho pd ON dd.id_pedido_despacho = pd.id_pedido_despacho
+        WHERE pd.estado IN (%s, %s) AND dd.id_inventario IS NOT NULL
+        GROUP BY dd.id_inventario
+    """, ESTADOS_ABIERTOS)
+
@@ -0,0 +1,73 @@
+"""Secuencias atómicas para numeraciones (guías de despacho).
+
+Cada secuencia es una fila de la tabla Secuencia. Se incrementa con
+LAST_INSERT_ID(expr), que deja el valor nuevo en la sesión y lo devuelve en
+el paquete OK: una sola sentencia, O(1) y segura con muchos workers porque
+MySQL serializa el incremento con el bloqueo de la fila.
+
+La reserva se confirma en una conexión propia del pool, fuera de la
+transacción de la petición: el bloqueo dura solo lo que dura el UPDATE. Si la
+petición termina en rollback el número se pierde (hay huecos), pero nunca se
+repite.
+"""
+from mysql.connector import errorcode
+from mysql.connector.errors import ProgrammingError
+
+from app.db import obtener_conexion_pool
+
+CREAR_TABLA = """
+    CREATE TABLE IF NOT EXISTS Secuencia (
+        nombre VARCHAR(50) NOT NULL PRIMARY KEY,
+        valor BIGINT NOT NULL DEFAULT 0
+    )
+"""
+
+GUIA_DESPACHO = 'numero_guia'
+
+# Valor inicial de cada secuencia a partir de los datos existentes
+VALORES_INICIALES = {
+    GUIA_DESPACHO: "SELECT COUNT(*) FROM Pedido_Despacho"
+}
+
+
+def crear_secuencias(cursor):
+    """Crear la tabla y sembrar las secuencias que falten con los datos actuales"""
+    cursor.execute(CREAR_TABLA)
+    for nombre, consulta in VALORES_INICIALES.items():
+        cursor.execute(f"""
+            INSERT IGNORE INTO Secuencia (nombre, valor)
+            SELECT %s, ({consulta})
+        """, (nombre,))
+
+
+def reservar(nombre, cantidad=1):
+    """Reservar `cantidad` números consecutivos; devuelve el range reservado.
+
+    Una secuencia que no existe empieza en 1.
+    """
+    conn = obtener_conexion_pool()
+    cursor = conn.cursor()
+    sql = """
+        INSERT INTO Secuencia (nombre, valor) VALUES (%s, LAST_INSERT_ID(%s))
+        ON DUPLICATE KEY UPDATE valor = LAST_INSERT_ID(valor + %s)
+    """
+    try:
+        try:
+            cursor.execute(sql, (nombre, cantidad, cantidad))
+        except ProgrammingError as e:
+            # Primer uso sin haber corrido `flask despachos secuencias`
+            if e.errno != errorcode.ER_NO_SUCH_TABLE:
+                raise
+            crear_secuencias(cursor)
+            cursor.execute(sql, (nombre, cantidad, cantidad))
+        ultimo = cursor.lastrowid
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    return range(ultimo - cantidad + 1, ultimo + 1)
+
+
+def siguiente(nombre):
+    """Siguiente número de la secuencia"""
+    return reservar(nombre)[0]
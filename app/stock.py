@@ -0,0 +1,331 @@
+"""Servicio único de cambios de stock.
+
+Asignar, trasladar, ajustar y confirmar despachos describen su operación
+como una lista de deltas sobre un StockLedger; aplicar() los agrupa por línea
+de inventario, estante y almacén y los escribe en la transacción del cursor
+con una sentencia por tabla, sin importar cuántas líneas tenga la operación:
+
+    lecturas     Inventario de origen (FOR UPDATE), estantes y destinos sin proveedor
+    Estante      UPDATE ... JOIN con el neto por estante, condicionado a la capacidad
+    Inventario   UPDATE por conjunto, upsert multi-fila de destinos, DELETE de agotadas
+    Almacen      UPDATE ... JOIN con el neto por almacén
+    Movimiento_Producto  INSERT multi-fila (uno por operación)
+    Resumen_KPI  un upsert con los deltas ya sumados y la versión de cada empresa tocada
+
+La capacidad no se lee y compara en Python (dos operadores podrían pasar el
+control a la vez): el UPDATE de Estante solo suma donde cabe y se compara la
+cantidad de filas afectadas. Si algo no cuadra (stock o capacidad
+insuficiente, línea inexistente) se lanza ValueError; el llamador descarta la
+transacción. Lo reservado para despachos abiertos (Reserva_Inventario) no se
+puede sacar de una línea: solo cuenta stock_producto - reservado, y una línea
+con reserva nunca se vacía ni se borra. Confirmar un despacho libera su
+reserva antes de descontar. El commit lo hace el llamador, idealmente con
+app.db.en_transaccion para reintentar si choca con otra transacción.
+
+Los destinos se escriben con INSERT ... ON DUPLICATE KEY UPDATE sobre la
+clave única producto/estante/proveedor (`flask movimientos colocacion`), sin
+leerlos antes. Una clave única no iguala NULL con NULL, así que los destinos
+sin proveedor se siguen buscando con SELECT. Sin esa clave el upsert
+insertaría líneas repetidas en silencio: se verifica una vez por proceso y si
+falta se lanza RuntimeError antes de escribir.
+"""
+from datetime import datetime
+
+from app.kpi import sumar_kpi, delta_movimientos, delta_versiones
+from app.reservas import DISPONIBLE
+from app.utils.sql import tabla_valores
+
+CLAVE_UBICACION = ('uq_inventario_ubicacion', 'id_producto, id_estante, id_proveedor')
+
+_clave_verificada = False
+
+
+def verificar_clave_ubicacion(cursor):
+    """Fallar si Inventario no tiene la clave única del upsert (se consulta una sola vez)"""
+    global _clave_verificada
+    if _clave_verificada:
+        return
+    cursor.execute("""
+        SELECT COUNT(*) AS existe FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = 'Inventario' AND index_name = %s
+    """, (CLAVE_UBICACION[0],))
+    if not cursor.fetchone()['existe']:
+        raise RuntimeError(f'Falta la clave única {CLAVE_UBICACION[0]} en Inventario: '
+                           f'ejecute `flask movimientos colocacion`')
+    _clave_verificada = True
+
+
+def ocupar_estantes(cursor, netos, controlados=()):
+    """Sumar {id_estante: delta} a capacidad_ocupada en una sentencia.
+
+    En los estantes de `controlados` el aumento solo se aplica si cabe
+    (capacidad_ocupada + delta <= capacidad), evaluado por MySQL con la fila
+    bloqueada; si alguno no entra se lanza ValueError. Recibe un cursor con
+    dictionary=True.
+    """
+    filas = sorted((int(i), delta, int(int(i) in controlados and delta > 0)) for i, delta in netos.items() if delta)
+    if not filas:
+        return
+    valores, params = tabla_valores(('id', 'cantidad', 'controlar'), filas)
+    cursor.execute(f"""
+        UPDATE Estante e
+        INNER JOIN ({valores}) v ON e.id_estante = v.id
+        SET e.capacidad_ocupada = e.capacidad_ocupada + v.cantidad
+        WHERE v.controlar = 0 OR e.capacidad_ocupada + v.cantidad <= e.capacidad
+    """, params)
+    if cursor.rowcount == len(filas):
+        return
+
+    # Solo en el caso de error: averiguar cuáles no entraron para el mensaje
+    pedidos = {i: delta for i, delta, controlar in filas if controlar}
+    marcadores = ', '.join(['%s'] * len(pedidos))
+    cursor.execute(f"""
+        SELECT id_estante, capacidad - capacidad_ocupada AS libre
+        FROM Estante WHERE id_estante IN ({marcadores})
+    """, list(pedidos))
+    llenos = [f'{fila["id_estante"]} (libre {fila["libre"]}, se piden {pedidos[fila["id_estante"]]})'
+              for fila in cursor.fetchall() if fila['libre'] < pedidos[fila['id_estante']]]
+    raise ValueError(f'Capacidad insuficiente en el estante {", ".join(llenos) or "de destino"}')
+
+
+def _validar_cantidad(cantidad):
+    """Entradas, salidas y traslados solo con cantidades positivas (el signo lo da la operación)"""
+    if cantidad <= 0:
+        raise ValueError('Las cantidades deben ser mayores a 0')
+
+
+class StockLedger:
+
+    def __init__(self, cursor, id_persona, estado_agotado=None):
+        """`estado_agotado`: None borra las líneas que quedan en 0; un estado las conserva marcadas"""
+        self.cursor = cursor
+        self.id_persona = id_persona
+        self.estado_agotado = estado_agotado
+        self._operaciones = []
+
+    # --- Deltas -------------------------------------------------------------
+
+    def entrada(self, id_producto, id_estante, id_proveedor, cantidad, motivo):
+        """Sumar stock en un estante; crea la línea producto/estante/proveedor si no existe"""
+        _validar_cantidad(cantidad)
+        self._operaciones.append(('entrada', (id_producto, id_estante, id_proveedor), cantidad, motivo))
+
+    def salida(self, id_inventario, cantidad, motivo):
+        """Descontar stock de una línea de inventario"""
+        _validar_cantidad(cantidad)
+        self._operaciones.append(('ajuste', int(id_inventario), -cantidad, motivo))
+
+    def ajuste(self, id_inventario, cantidad, motivo):
+        """Corregir una línea en `cantidad` unidades (positivo o negativo)"""
+        self._operaciones.append(('ajuste', int(id_inventario), cantidad, motivo))
+
+    def traslado(self, id_inventario, id_estante_destino, cantidad, motivo='Traslado'):
+        """Mover unidades de una línea a otro estante (mismo producto y proveedor)"""
+        _validar_cantidad(cantidad)
+        self._operaciones.append(('traslado', (int(id_inventario), int(id_estante_destino)), cantidad, motivo))
+
+    # --- Aplicación ---------------------------------------------------------
+
+    def aplicar(self):
+        """Escribir todos los deltas; devuelve la cantidad de movimientos registrados"""
+        if not self._operaciones:
+            return 0
+        hoy = datetime.now().date()
+
+        origenes = self._leer_origenes()
+
+        # Líneas existentes: neto por id_inventario; destinos: neto por (producto, estante, proveedor)
+        lineas = {}
+        destinos = {}
+        movimientos = []
+        for tipo, ref, cantidad, motivo in self._operaciones:
+            if tipo == 'entrada':
+                destinos[ref] = destinos.get(ref, 0) + cantidad
+                movimientos.append((cantidad, motivo, ref[0], ref[2]))
+                continue
+            id_inventario = ref[0] if tipo == 'traslado' else ref
+            origen = origenes[id_inventario]
+            if tipo == 'traslado':
+                lineas[id_inventario] = lineas.get(id_inventario, 0) - cantidad
+                destino = (origen['id_producto'], ref[1], origen['id_proveedor'])
+                destinos[destino] = destinos.get(destino, 0) + cantidad
+            else:
+                lineas[id_inventario] = lineas.get(id_inventario, 0) + cantidad
+            movimientos.append((abs(cantidad), motivo, origen['id_producto'], origen['id_proveedor']))
+
+        estantes = self._leer_estantes({estante for _, estante, _ in destinos})
+        nuevas = self._resolver_destinos(destinos, origenes, lineas)
+        if nuevas:
+            verificar_clave_ubicacion(self.cursor)
+
+        # Validar el resultado completo antes de escribir
+        for id_inventario, delta in lineas.items():
+            disponible = origenes[id_inventario]['disponible']
+            if delta < 0 and disponible + delta < 0:
+                reservado = origenes[id_inventario]['stock_producto'] - disponible
+                raise ValueError(f'Stock insuficiente en el inventario {id_inventario} '
+                                 f'(disponible {disponible}, reservado {reservado}, se piden {-delta})')
+
+        # Netos por estante y almacén, y deltas del dashboard por (almacén, producto)
+        por_estante = {}
+        por_almacen = {}
+        kpi = {}
+        for id_inventario, delta in lineas.items():
+            linea = origenes[id_inventario]
+            self._acumular(por_estante, por_almacen, kpi, linea['id_estante'], linea['id_almacen'],
+                           linea['id_producto'], delta)
+        for (id_producto, id_estante, _), delta in nuevas.items():
+            self._acumular(por_estante, por_almacen, kpi, id_estante, estantes[id_estante]['id_almacen'],
+                           id_producto, delta)
+
+        # Primero la capacidad: si un destino no entra se corta antes de tocar Inventario
+        ocupar_estantes(self.cursor, por_estante, controlados=estantes)
+        self._escribir_inventario(origenes, lineas, nuevas, hoy)
+        self._sumar_almacenes(por_almacen)
+
+        self.cursor.executemany("""
+            INSERT INTO Movimiento_Producto (cantidad_producto, motivo, fecha_movimiento, id_persona, id_producto, id_proveedor)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [(cantidad, motivo, hoy, self.id_persona, id_producto, id_proveedor)
+              for cantidad, motivo, id_producto, id_proveedor in movimientos])
+
+        deltas = [('stock_almacen', id_almacen, delta) for (id_almacen, _), delta in kpi.items()]
+        productos = {}
+        for (_, id_producto), delta in kpi.items():
+            productos[id_producto] = productos.get(id_producto, 0) + delta
+        deltas += [('stock_producto', id_producto, delta) for id_producto, delta in productos.items()]
+        deltas += delta_movimientos(hoy, len(movimientos))
+        deltas += delta_versiones(id_proveedor for _, _, _, id_proveedor in movimientos)
+        sumar_kpi(self.cursor, deltas)
+
+        self._operaciones = []
+        return len(movimientos)
+
+    @staticmethod
+    def _acumular(por_estante, por_almacen, kpi, id_estante, id_almacen, id_producto, delta):
+        por_estante[id_estante] = por_estante.get(id_estante, 0) + delta
+        por_almacen[id_almacen] = por_almacen.get(id_almacen, 0) + delta
+        kpi[(id_almacen, id_producto)] = kpi.get((id_almacen, id_producto), 0) + delta
+
+    def _leer_origenes(self):
+        """Líneas de inventario referidas por id, bloqueadas hasta el commit"""
+        ids = sorted({ref[0] if tipo == 'traslado' else ref
+                      for tipo, ref, _, _ in self._operaciones if tipo != 'entrada'})
+        if not ids:
+            return {}
+        marcadores = ', '.join(['%s'] * len(ids))
+        self.cursor.execute(f"""
+            SELECT inv.id_inventario, inv.id_producto, inv.id_estante, inv.id_proveedor,
+                inv.stock_producto, {DISPONIBLE} AS disponible, e.id_almacen
+            FROM Inventario inv
+            INNER JOIN Estante e ON inv.id_estante = e.id_estante
+            LEFT JOIN Reserva_Inventario r ON inv.id_inventario = r.id_inventario
+            WHERE inv.id_inventario IN ({marcadores})
+            FOR UPDATE
+        """, ids)
+        origenes = {fila['id_inventario']: fila for fila in self.cursor.fetchall()}
+        faltantes = [str(i) for i in ids if i not in origenes]
+        if faltantes:
+            raise ValueError(f'No existe el inventario {", ".join(faltantes)}')
+        return origenes
+
+    def _leer_estantes(self, ids):
+        """Estantes de destino con su almacén (la capacidad la controla ocupar_estantes)"""
+        ids = sorted(int(i) for i in ids)
+        if not ids:
+            return {}
+        marcadores = ', '.join(['%s'] * len(ids))
+        self.cursor.execute(f"""
+            SELECT id_estante, id_almacen
+            FROM Estante
+            WHERE id_estante IN ({marcadores})
+        """, ids)
+        estantes = {fila['id_estante']: fila for fila in self.cursor.fetchall()}
+        faltantes = [str(i) for i in ids if i not in estantes]
+        if faltantes:
+            raise ValueError(f'No existe el estante {", ".join(faltantes)}')
+        return estantes
+
+    def _resolver_destinos(self, destinos, origenes, lineas):
+        """Separar los destinos que ya tienen línea (se suman en `lineas`) de los que van al upsert"""
+        if not destinos:
+            return {}
+        nuevas = {(int(p), int(e), int(v) if v is not None else None): d for (p, e, v), d in destinos.items()}
+
+        # Un destino igual a un origen ya leído se resuelve sin consultar
+        for id_inventario, origen in origenes.items():
+            clave = (origen['id_producto'], origen['id_estante'], origen['id_proveedor'])
+            if clave in nuevas:
+                lineas[id_inventario] = lineas.get(id_inventario, 0) + nuevas.pop(clave)
+
+        sin_proveedor = [clave for clave in nuevas if clave[2] is None]
+        if not sin_proveedor:
+            return nuevas
+        condicion = ' OR '.join(['(id_producto = %s AND id_estante = %s AND id_proveedor IS NULL)'] * len(sin_proveedor))
+        self.cursor.execute(f"""
+            SELECT inv.id_inventario, inv.id_producto, inv.id_estante, inv.id_proveedor,
+                inv.stock_producto, {DISPONIBLE} AS disponible, e.id_almacen
+            FROM Inventario inv
+            INNER JOIN Estante e ON inv.id_estante = e.id_estante
+            LEFT JOIN Reserva_Inventario r ON inv.id_inventario = r.id_inventario
+            WHERE {condicion}
+            FOR UPDATE
+        """, [valor for producto, estante, _ in sin_proveedor for valor in (producto, estante)])
+
+        for fila in self.cursor.fetchall():
+            clave = (fila['id_producto'], fila['id_estante'], fila['id_proveedor'])
+            if clave not in nuevas:
+                continue  # otra línea del mismo destino: la primera recibe el stock
+            origenes.setdefault(fila['id_inventario'], fila)
+            lineas[fila['id_inventario']] = lineas.get(fila['id_inventario'], 0) + nuevas.pop(clave)
+        return nuevas
+
+    def _escribir_inventario(self, origenes, lineas, nuevas, hoy):
+        cambios = [(i, delta) for i, delta in lineas.items() if delta]
+        if cambios:
+            # Si la línea se agota se calcula con el stock leído con la fila bloqueada: en un
+            # UPDATE con JOIN MySQL no garantiza el orden de las asignaciones del SET
+            valores, params = tabla_valores(('id', 'cantidad', 'agotada'),
+                                            [(i, delta, int(origenes[i]['stock_producto'] + delta == 0))
+                                             for i, delta in cambios])
+            estado = ", inv.estado = IF(v.agotada = 1, %s, inv.estado)" if self.estado_agotado else ""
+            self.cursor.execute(f"""
+                UPDATE Inventario inv
+                INNER JOIN ({valores}) v ON inv.id_inventario = v.id
+                SET inv.stock_producto = CAST(inv.stock_producto AS SIGNED) + v.cantidad,
+                    inv.fecha_modificacion = %s{estado}
+            """, params + [hoy] + ([self.estado_agotado] if self.estado_agotado else []))
+
+            agotadas = [i for i, delta in cambios if origenes[i]['stock_producto'] + delta == 0]
+            if agotadas and not self.estado_agotado:
+                marcadores = ', '.join(['%s'] * len(agotadas))
+                self.cursor.execute(f"""
+                    DELETE FROM Inventario
+                    WHERE id_inventario IN ({marcadores}) AND stock_producto = 0
+                      AND id_inventario NOT IN (SELECT id_inventario FROM Reserva_Inventario WHERE cantidad > 0)
+                """, agotadas)
+
+        filas = [(delta, hoy, id_estante, id_producto, id_proveedor)
+                 for (id_producto, id_estante, id_proveedor), delta in nuevas.items() if delta > 0]
+        if filas:
+            # Una línea existente que recibe stock vuelve a estar disponible (aunque estuviera
+            # agotada y marcada como despachada)
+            self.cursor.executemany("""
+                INSERT INTO Inventario (stock_producto, fecha_modificacion, id_estante, id_producto, id_proveedor, estado)
+                VALUES (%s, %s, %s, %s, %s, 'Disponible')
+                ON DUPLICATE KEY UPDATE
+                    estado = 'Disponible',
+                    stock_producto = stock_producto + VALUES(stock_producto),
+                    fecha_modificacion = VALUES(fecha_modificacion)
+            """, filas)
+
+    def _sumar_almacenes(self, netos):
+        filas = sorted((i, delta) for i, delta in netos.items() if delta)
+        if not filas:
+            return
+        valores, params = tabla_valores(('id', 'cantidad'), filas)
+        self.cursor.execute(f"""
+            UPDATE Almacen a
+            INNER JOIN ({valores}) v ON a.id_almacen = v.id
+            SET a.capacidad_ocupada = a.capacidad_ocupada + v.cantidad
+        """, params)
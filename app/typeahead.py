@@ -0,0 +1,180 @@
+"""Índice en memoria de productos para el autocompletado (typeahead).
+
+Cada producto se indexa por los trigramas de "marca categoría" normalizada
+(minúsculas, sin tildes). Una búsqueda intersecta los trigramas de todas las
+palabras, empezando por el conjunto más chico, y confirma la coincidencia
+sobre el texto; las palabras de 1-2 letras se buscan entre los prefijos de
+igual largo. Si quedan muchos candidatos no se ordenan: se recorren listas ya
+ordenadas por relevancia y se corta al juntar los pedidos.
+
+El índice es por proceso y nunca se arma dentro de una petición: iniciar()
+lanza un hilo de fondo que lo carga al arrancar el worker (gunicorn
+post_fork) y lo recarga completo cada TYPEAHEAD_TTL, mientras se sigue
+respondiendo con el anterior. crear_producto lo actualiza al momento en el
+worker que atendió el alta.
+"""
+import heapq
+import os
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from itertools import islice
+
+from app.config import Config
+
+N = 3
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'Café' → 'cafe'"""
+    descompuesto = unicodedata.normalize('NFKD', str(texto or '').lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def trigramas(palabra):
+    return {palabra[i:i + N] for i in range(len(palabra) - N + 1)}
+
+
+class IndiceProductos:
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._pid = None         # proceso en el que corre el hilo de recarga
+        self._productos = {}     # id → (marca, categoría, texto normalizado)
+        self._postings = {}      # trigrama → set(ids)
+        self._prefijos = {}      # prefijo de 1-2 letras de cada palabra → set(ids)
+        self._textos = []        # [(texto, id)] ordenada: coincidencias al inicio de la marca
+        self._orden = []         # [(largo marca, texto, id)] ordenada: el resto
+
+    def listo(self):
+        return bool(self._productos)
+
+    def iniciar(self, conectar):
+        """Cargar y recargar el índice en un hilo de fondo de este proceso (una vez por proceso).
+
+        `conectar` devuelve una conexión MySQL; se cierra tras cada carga.
+        """
+        with self._lock:
+            # Tras un fork el hilo del padre no existe en el hijo: se lanza de nuevo
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._recargar, args=(conectar,), name='typeahead', daemon=True).start()
+
+    def _recargar(self, conectar):
+        while True:
+            espera = self.ttl
+            try:
+                conn = conectar()
+                cursor = conn.cursor(dictionary=True)
+                try:
+                    self.cargar(cursor)
+                finally:
+                    cursor.close()
+                    conn.close()
+            except Exception as e:
+                print(f"❌ Error cargando el índice de productos: {e}")
+                espera = min(self.ttl, 10)  # base no disponible al arrancar: reintentar pronto
+            time.sleep(espera)
+
+    def cargar(self, cursor):
+        """Reconstruir el índice completo con una consulta"""
+        cursor.execute("""
+            SELECT p.id_producto, p.marca, c.nombre_categoria
+            FROM Producto p
+            INNER JOIN Categoria_Producto c ON p.id_categoria_producto = c.id_categoria_producto
+        """)
+        nuevo = IndiceProductos(self.ttl)
+        for fila in cursor.fetchall():
+            nuevo._indexar(fila['id_producto'], fila['marca'], fila['nombre_categoria'])
+        nuevo._textos.sort()
+        nuevo._orden.sort()
+
+        # Se arma aparte y se reemplaza de una vez: las búsquedas en curso no ven un índice a medias
+        with self._lock:
+            self._productos, self._postings, self._prefijos = nuevo._productos, nuevo._postings, nuevo._prefijos
+            self._textos, self._orden = nuevo._textos, nuevo._orden
+
+    def agregar(self, id_producto, marca, categoria):
+        """Sumar un producto recién creado sin recargar todo"""
+        with self._lock:
+            if not self._productos:
+                return  # aún no cargado: la carga en curso lo incluirá
+            self._indexar(id_producto, marca, categoria)
+            # _indexar agregó al final: se reubica en su lugar
+            insort(self._textos, self._textos.pop())
+            insort(self._orden, self._orden.pop())
+
+    def _indexar(self, id_producto, marca, categoria):
+        texto = normalizar(f'{marca} {categoria}')
+        self._productos[id_producto] = (marca, categoria, texto)
+        self._textos.append((texto, id_producto))
+        self._orden.append((len(marca), texto, id_producto))
+        for palabra in set(texto.split()):
+            for largo in range(1, N):
+                self._prefijos.setdefault(palabra[:largo], set()).add(id_producto)
+            for trigrama in trigramas(palabra):
+                self._postings.setdefault(trigrama, set()).add(id_producto)
+
+    def _listas(self, palabra):
+        """Conjuntos de ids que debe contener un producto para coincidir con `palabra`"""
+        if len(palabra) < N:
+            return [self._prefijos.get(palabra, set())]
+        return [self._postings.get(t, set()) for t in trigramas(palabra)]
+
+    def buscar(self, termino, limite=10):
+        """Los `limite` mejores [(id_producto, marca, categoría)] que contienen todas las palabras.
+
+        Primero los que empiezan con la primera palabra (en orden alfabético),
+        luego el resto por marca más corta.
+        """
+        palabras = normalizar(termino).split()
+        if not palabras:
+            return []
+        primera = palabras[0]
+
+        with self._lock:
+            # Intersección empezando por el conjunto más chico de todas las palabras
+            listas = sorted((lista for palabra in palabras for lista in self._listas(palabra)), key=len)
+            candidatos = listas[0]
+            for lista in listas[1:]:
+                if not candidatos:
+                    break
+                candidatos = candidatos & lista
+            if not candidatos:
+                return []
+
+            productos = self._productos
+
+            def coincide(id_producto):
+                texto = productos[id_producto][2]
+                return all(p in texto for p in palabras)
+
+            if len(candidatos) <= limite * 50:
+                # Pocos candidatos: se verifican y ordenan todos
+                encontrados = [id_producto for id_producto in candidatos if coincide(id_producto)]
+                mejores = heapq.nsmallest(limite, encontrados, key=lambda i: (
+                    (0, productos[i][2], i) if productos[i][2].startswith(primera)
+                    else (1, len(productos[i][0]), productos[i][2], i)
+                ))
+            else:
+                # Muchos candidatos: se recorren los órdenes ya armados y se corta al llenar
+                mejores = []
+                inicio = bisect_left(self._textos, (primera,))
+                for texto, id_producto in islice(self._textos, inicio, None):
+                    if len(mejores) == limite or not texto.startswith(primera):
+                        break
+                    if id_producto in candidatos and coincide(id_producto):
+                        mejores.append(id_producto)
+                for _, texto, id_producto in self._orden:
+                    if len(mejores) == limite:
+                        break
+                    if id_producto in candidatos and not texto.startswith(primera) and coincide(id_producto):
+                        mejores.append(id_producto)
+
+            return [(i, productos[i][0], productos[i][1]) for i in mejores]
+
+
+indice_productos = IndiceProductos(Config.TYPEAHEAD_TTL)
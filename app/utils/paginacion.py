@@ -0,0 +1,33 @@
+import base64
+import json
+
+from app.config import Config
+
+
+def codificar_cursor(valores):
+    """Convertir la clave de la última fila en un token apto para la URL"""
+    datos = json.dumps(valores, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token, longitud):
+    """Recuperar la clave de un token; None si viene vacío o manipulado"""
+    if not token:
+        return None
+    try:
+        relleno = '=' * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(token + relleno))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != longitud:
+        return None
+    return valores
+
+
+def tamano_pagina(valor):
+    """Filas por página pedidas en la URL, acotadas a PAGINA_MAXIMA"""
+    try:
+        tamano = int(valor)
+    except (TypeError, ValueError):
+        return Config.PAGINA_TAMANO
+    return max(1, min(tamano, Config.PAGINA_MAXIMA))
@@ -0,0 +1,20 @@
+def tabla_valores(columnas, filas):
+    """Tabla derivada (sql, params) con filas literales para unir en un UPDATE.
+
+    tabla_valores(('id', 'cantidad'), [(1, 5), (2, 3)]) genera
+    "SELECT %s AS id, %s AS cantidad UNION ALL SELECT %s, %s" y sus parámetros,
+    para usarla como UPDATE t JOIN (<sql>) v ON ... en una sola sentencia.
+    """
+    primera = ', '.join(f'%s AS {columna}' for columna in columnas)
+    resto = ', '.join(['%s'] * len(columnas))
+    sql = ' UNION ALL '.join([f'SELECT {primera}'] + [f'SELECT {resto}'] * (len(filas) - 1))
+    params = [valor for fila in filas for valor in fila]
+    return sql, params
+
+
+def sumar_por(filas, clave, valor):
+    """Agrupar filas (dicts) sumando `valor` por `clave`: [(clave, total), ...]"""
+    totales = {}
+    for fila in filas:
+        totales[fila[clave]] = totales.get(fila[clave], 0) + fila[valor]
+    return list(totales.items())
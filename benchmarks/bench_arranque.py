@@ -0,0 +1,52 @@
+"""Benchmark: tiempo de importación y arranque de create_app().
+
+Cada medición corre en un proceso nuevo (como el arranque de un worker) e
+informa el tiempo de `from app import create_app; create_app()` y si quedaron
+cargadas las librerías de analítica. Sale con código 1 si alguna se importa
+durante el arranque, para detectar regresiones de la carga diferida de
+app.controllers.reportes. No abre conexiones a la base de datos.
+
+    python -m benchmarks.bench_arranque [repeticiones]
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+PESADAS = ['pandas', 'matplotlib', 'seaborn', 'xlsxwriter']
+
+SCRIPT = f"""
+import json, sys, time
+inicio = time.perf_counter()
+from app import create_app
+importado = time.perf_counter()
+create_app()
+fin = time.perf_counter()
+print(json.dumps({{
+    'importar_ms': (importado - inicio) * 1000,
+    'total_ms': (fin - inicio) * 1000,
+    'modulos': len(sys.modules),
+    'pesadas': [m for m in {PESADAS!r} if m in sys.modules]
+}}))
+"""
+
+
+def medir():
+    salida = subprocess.run([sys.executable, '-c', SCRIPT], capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    medidas = [medir() for _ in range(repeticiones)]
+
+    totales = [m['total_ms'] for m in medidas]
+    print(f"create_app(): mediana {statistics.median(totales):.1f} ms, "
+          f"mín {min(totales):.1f} ms, máx {max(totales):.1f} ms ({repeticiones} procesos)")
+    print(f"Módulos cargados: {medidas[0]['modulos']}")
+
+    pesadas = medidas[0]['pesadas']
+    if pesadas:
+        print(f"❌ Librerías de analítica importadas al arrancar: {', '.join(pesadas)}")
+        sys.exit(1)
+    print("✅ Sin librerías de analítica en el arranque")
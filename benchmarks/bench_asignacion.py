@@ -0,0 +1,41 @@
+"""Benchmark: líneas asignadas por segundo en app/asignacion.py.
+
+Arma un índice de disponibilidad sintético (como el que devuelve
+cargar_disponibilidad) y asigna líneas aleatorias, con varias líneas que
+agotan estantes y pasan al siguiente. No usa la base de datos.
+
+    python -m benchmarks.bench_asignacion [lineas]
+"""
+import random
+import sys
+import time
+from collections import deque
+
+from app.asignacion import asignar
+
+ARTICULOS = 500
+FILAS_POR_ARTICULO = 12
+
+
+def indice():
+    return {
+        articulo: deque([[articulo * 100 + i, articulo, random.randint(5, 60)] for i in range(FILAS_POR_ARTICULO)])
+        for articulo in range(ARTICULOS)
+    }
+
+
+if __name__ == '__main__':
+    lineas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    disponibilidad = indice()
+    pedidos = [(random.randrange(ARTICULOS), random.randint(1, 40)) for _ in range(lineas)]
+
+    asignadas = faltantes = 0
+    inicio = time.perf_counter()
+    for articulo, cantidad in pedidos:
+        tomadas, faltante = asignar(disponibilidad[articulo], cantidad)
+        asignadas += len(tomadas)
+        faltantes += bool(faltante)
+    segundos = time.perf_counter() - inicio
+
+    print(f"{lineas} líneas en {segundos * 1000:.1f} ms → {lineas / segundos:,.0f} líneas/s")
+    print(f"Ubicaciones asignadas: {asignadas} | líneas con faltante: {faltantes}")
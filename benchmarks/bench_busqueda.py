@@ -0,0 +1,71 @@
+"""Benchmark: LIKE '%termino%' contra el índice FULLTEXT ngram de app/busqueda.py.
+
+Crea una tabla temporal Bench_Producto con N marcas sintéticas (1.000.000 por
+defecto), la indexa y mide ambas búsquedas. Necesita la base de datos
+configurada en .env; la tabla se elimina al terminar.
+
+    python -m benchmarks.bench_busqueda [filas]
+"""
+import random
+import string
+import sys
+import time
+
+from app.busqueda import frase
+from app.db import obtener_conexion_pool
+
+SILABAS = ['ca', 'so', 'ma', 'ri', 'lo', 'te', 'nu', 'pa', 've', 'do', 'xi', 'fo', 'ke', 'bu']
+TERMINOS = ['mari', 'sote', 'xifo', 'kebu', 'lote']
+LOTE = 5000
+
+
+def marca_aleatoria():
+    palabra = ''.join(random.choice(SILABAS) for _ in range(random.randint(2, 4)))
+    return f"{palabra.capitalize()} {random.choice(string.ascii_uppercase)}{random.randint(1, 999)}"
+
+
+def poblar(cursor, conn, filas):
+    cursor.execute("DROP TABLE IF EXISTS Bench_Producto")
+    cursor.execute("""
+        CREATE TABLE Bench_Producto (
+            id_producto INT AUTO_INCREMENT PRIMARY KEY,
+            marca VARCHAR(100) NOT NULL
+        )
+    """)
+    for inicio in range(0, filas, LOTE):
+        lote = [(marca_aleatoria(),) for _ in range(min(LOTE, filas - inicio))]
+        cursor.executemany("INSERT INTO Bench_Producto (marca) VALUES (%s)", lote)
+        conn.commit()
+    cursor.execute("ALTER TABLE Bench_Producto ADD FULLTEXT INDEX ft_bench_marca (marca) WITH PARSER ngram")
+
+
+def medir(cursor, sql, params, repeticiones=5):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        cursor.execute(sql, params)
+        filas = cursor.fetchall()
+    return (time.perf_counter() - inicio) * 1000 / repeticiones, len(filas)
+
+
+if __name__ == '__main__':
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    conn = obtener_conexion_pool()
+    cursor = conn.cursor()
+    try:
+        print(f"Poblando Bench_Producto con {filas} filas...")
+        poblar(cursor, conn, filas)
+
+        print(f"{'término':<8} {'LIKE ms':>10} {'FULLTEXT ms':>12} {'filas':>8}")
+        for termino in TERMINOS:
+            ms_like, n_like = medir(cursor, "SELECT id_producto FROM Bench_Producto WHERE marca LIKE %s",
+                                    (f'%{termino}%',))
+            ms_ft, n_ft = medir(cursor, """
+                SELECT id_producto FROM Bench_Producto
+                WHERE MATCH(marca) AGAINST (%s IN BOOLEAN MODE)
+            """, (frase(termino),))
+            print(f"{termino:<8} {ms_like:>10.2f} {ms_ft:>12.2f} {n_like:>8}"
+                  + ("" if n_like == n_ft else f"  (FULLTEXT: {n_ft})"))
+    finally:
+        cursor.execute("DROP TABLE IF EXISTS Bench_Producto")
+        cursor.close()
+        conn.close()
@@ -0,0 +1,146 @@
+"""Prueba de carga: muchos operadores llenando los mismos estantes a la vez.
+
+Crea estantes de prueba en el primer almacén y lanza N operadores (hilos,
+cada uno con su propia conexión) que suman unidades a uno o dos estantes por
+transacción, compitiendo por los mismos. Compara:
+
+    anterior   SELECT capacidad, capacidad_ocupada → comparar en Python → UPDATE
+    guardado   app.stock.ocupar_estantes (UPDATE condicionado) con app.db.en_transaccion
+
+Al final verifica que ningún estante supere su capacidad y que lo ocupado sea
+igual a lo que cada operador cree haber confirmado, e informa los reintentos
+por deadlock. Los estantes de prueba se eliminan al terminar. Necesita la base
+de datos configurada en .env.
+
+    python -m benchmarks.bench_concurrencia [operadores] [operaciones_por_operador]
+"""
+import random
+import sys
+import threading
+import time
+
+import mysql.connector
+
+from app.config import Config
+from app.db import en_transaccion
+from app.stock import ocupar_estantes
+
+ESTANTES = 4
+CAPACIDAD = 200
+
+
+def conectar():
+    return mysql.connector.connect(host=Config.MYSQL_HOST, user=Config.MYSQL_USER, password=Config.MYSQL_PASSWORD,
+                                   database=Config.MYSQL_DB, port=Config.MYSQL_PORT)
+
+
+def crear_estantes(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT id_almacen FROM Almacen ORDER BY id_almacen LIMIT 1")
+    fila = cursor.fetchone()
+    if not fila:
+        raise SystemExit("❌ No hay almacenes para crear estantes de prueba")
+    ids = []
+    for i in range(ESTANTES):
+        cursor.execute("""
+            INSERT INTO Estante (pasillo, capacidad, capacidad_ocupada, estado, id_almacen)
+            VALUES (%s, %s, 0, 'Disponible', %s)
+        """, (f'BENCH-{i}', CAPACIDAD, fila[0]))
+        ids.append(cursor.lastrowid)
+    conn.commit()
+    cursor.close()
+    return ids
+
+
+def ocupar_anterior(cursor, netos):
+    """Leer, comparar en Python y escribir: dos operadores pueden pasar el control a la vez"""
+    for id_estante, delta in netos.items():
+        cursor.execute("SELECT capacidad, capacidad_ocupada FROM Estante WHERE id_estante = %s", (id_estante,))
+        estante = cursor.fetchone()
+        if estante['capacidad_ocupada'] + delta > estante['capacidad']:
+            raise ValueError('sin capacidad')
+    for id_estante, delta in netos.items():
+        cursor.execute("UPDATE Estante SET capacidad_ocupada = capacidad_ocupada + %s WHERE id_estante = %s",
+                       (delta, id_estante))
+
+
+def ocupar_guardado(cursor, netos):
+    ocupar_estantes(cursor, netos, controlados=netos)
+
+
+def operador(estantes, ocupar, operaciones, totales, lock):
+    conn = conectar()
+    confirmado = {i: 0 for i in estantes}
+    intentos = rechazos = 0
+    try:
+        for _ in range(operaciones):
+            # Uno o dos estantes por transacción, en orden al azar
+            netos = {i: random.randint(1, 5) for i in random.sample(estantes, random.randint(1, 2))}
+
+            def transaccion(cursor):
+                nonlocal intentos
+                intentos += 1
+                ocupar(cursor, netos)
+
+            try:
+                en_transaccion(conn, transaccion)
+            except ValueError:
+                rechazos += 1
+                continue
+            for i, delta in netos.items():
+                confirmado[i] += delta
+    finally:
+        conn.close()
+
+    with lock:
+        for i, delta in confirmado.items():
+            totales['confirmado'][i] += delta
+        totales['transacciones'] += operaciones
+        totales['reintentos'] += intentos - operaciones
+        totales['rechazos'] += rechazos
+
+
+def correr(conn, nombre, ocupar, operadores, operaciones):
+    estantes = crear_estantes(conn)
+    totales = {'confirmado': {i: 0 for i in estantes}, 'transacciones': 0, 'reintentos': 0, 'rechazos': 0}
+    lock = threading.Lock()
+    hilos = [threading.Thread(target=operador, args=(estantes, ocupar, operaciones, totales, lock))
+             for _ in range(operadores)]
+
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    cursor = conn.cursor(dictionary=True)
+    marcadores = ', '.join(['%s'] * len(estantes))
+    cursor.execute(f"SELECT id_estante, capacidad, capacidad_ocupada FROM Estante WHERE id_estante IN ({marcadores})",
+                   estantes)
+    finales = cursor.fetchall()
+    cursor.execute(f"DELETE FROM Estante WHERE id_estante IN ({marcadores})", estantes)
+    conn.commit()
+    cursor.close()
+
+    excedidos = sum(1 for e in finales if e['capacidad_ocupada'] > e['capacidad'])
+    descuadres = sum(1 for e in finales if e['capacidad_ocupada'] != totales['confirmado'][e['id_estante']])
+    print(f"{nombre:<10} {totales['transacciones'] / segundos:>8.0f} tx/s {totales['reintentos']:>10} "
+          f"{totales['rechazos']:>9} {excedidos:>10} {descuadres:>10}")
+    return excedidos + descuadres
+
+
+if __name__ == '__main__':
+    operadores = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    operaciones = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    conn = conectar()
+    try:
+        print(f"{operadores} operadores × {operaciones} transacciones sobre {ESTANTES} estantes de {CAPACIDAD}")
+        print(f"{'camino':<10} {'ritmo':>13} {'reintentos':>10} {'rechazos':>9} {'excedidos':>10} {'descuadres':>10}")
+        correr(conn, 'anterior', ocupar_anterior, operadores, operaciones)
+        errores = correr(conn, 'guardado', ocupar_guardado, operadores, operaciones)
+    finally:
+        conn.close()
+    if errores:
+        raise SystemExit("❌ El camino guardado dejó estantes excedidos o descuadrados")
+    print("✅ Ningún estante excedido ni descuadrado con el UPDATE condicionado")
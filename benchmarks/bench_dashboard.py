@@ -0,0 +1,154 @@
+"""Benchmark: consultas y tiempo por render de dashboard.index.
+
+Compara el camino anterior (seis conexiones nuevas, catorce consultas) con
+get_dashboard_data() (una conexión del pool, seis consultas).
+Necesita la base de datos configurada en .env.
+
+    python -m benchmarks.bench_dashboard [repeticiones]
+"""
+import sys
+import time
+
+import mysql.connector
+
+from app.config import Config
+from app.cache import dashboard_cache
+from app.controllers import dashboard
+
+# Consultas del dashboard antes de consolidarlas, agrupadas por conexión
+CONSULTAS_ANTERIORES = [
+    [
+        "SELECT COUNT(DISTINCT id_producto) as total FROM Producto",
+        "SELECT COUNT(*) as total FROM Almacen",
+        "SELECT COUNT(*) as total FROM Pedido WHERE estado = 'Pendiente'",
+        "SELECT COUNT(*) as total FROM Cliente",
+        "SELECT COUNT(*) as total FROM Movimiento_Producto WHERE fecha_movimiento = CURDATE()",
+    ],
+    [
+        """SELECT a.nombre_almacen, COALESCE(SUM(i.stock_producto), 0) as total_productos
+           FROM Almacen a
+           LEFT JOIN Estante e ON a.id_almacen = e.id_almacen
+           LEFT JOIN Inventario i ON e.id_estante = i.id_estante
+           GROUP BY a.id_almacen, a.nombre_almacen
+           ORDER BY total_productos DESC""",
+    ],
+    [
+        """SELECT nombre_almacen, capacidad, capacidad_ocupada,
+               ROUND((capacidad_ocupada/capacidad)*100, 2) as porcentaje_ocupacion
+           FROM Almacen WHERE capacidad > 0 ORDER BY porcentaje_ocupacion DESC""",
+    ],
+    [
+        """SELECT DATE(fecha_pedido) as fecha, COUNT(*) as cantidad FROM Pedido
+           WHERE fecha_pedido >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+           GROUP BY DATE(fecha_pedido) ORDER BY fecha""",
+        """SELECT DATE(fecha_despacho) as fecha, COUNT(*) as cantidad FROM Pedido_Despacho
+           WHERE fecha_despacho >= DATE_SUB(CURDATE(), INTERVAL 30 DAY) AND fecha_despacho IS NOT NULL
+           GROUP BY DATE(fecha_despacho) ORDER BY fecha""",
+    ],
+    [
+        """SELECT cp.nombre_categoria, COUNT(p.id_producto) as cantidad
+           FROM Categoria_Producto cp
+           LEFT JOIN Producto p ON cp.id_categoria_producto = p.id_categoria_producto
+           WHERE cp.estado = 'ACTIVA'
+           GROUP BY cp.id_categoria_producto, cp.nombre_categoria
+           HAVING cantidad > 0 ORDER BY cantidad DESC""",
+    ],
+    [
+        """SELECT nombre_almacen, ROUND((capacidad_ocupada/capacidad)*100, 2) as porcentaje
+           FROM Almacen WHERE capacidad > 0 AND (capacidad_ocupada/capacidad)*100 > 90
+           ORDER BY porcentaje DESC""",
+        """SELECT p.marca, SUM(i.stock_producto) as stock_total
+           FROM Producto p JOIN Inventario i ON p.id_producto = i.id_producto
+           GROUP BY p.id_producto, p.marca
+           HAVING stock_total < 10 AND stock_total > 0 ORDER BY stock_total LIMIT 5""",
+        """SELECT numero_guia, DATEDIFF(CURDATE(), fecha_solicitud) as dias_retraso
+           FROM Pedido_Despacho WHERE estado IN ('Pendiente', 'En Preparación')
+           AND DATEDIFF(CURDATE(), fecha_solicitud) > 5 ORDER BY dias_retraso DESC LIMIT 5""",
+        """SELECT numero_documento, DATEDIFF(CURDATE(), fecha_pedido) as dias_pendiente
+           FROM Pedido WHERE estado = 'Pendiente'
+           AND DATEDIFF(CURDATE(), fecha_pedido) > 7 ORDER BY dias_pendiente DESC LIMIT 5""",
+    ],
+]
+
+
+class CursorContador:
+    """Cursor que cuenta cada execute() como un viaje de ida y vuelta"""
+
+    def __init__(self, cursor, contador):
+        self._cursor = cursor
+        self._contador = contador
+
+    def execute(self, *args, **kwargs):
+        self._contador['consultas'] += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        # Para INSERT, mysql.connector envía todas las filas en una sola sentencia
+        self._contador['consultas'] += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+class ConexionContador:
+    def __init__(self, cnx, contador):
+        self._cnx = cnx
+        self._contador = contador
+
+    def cursor(self, *args, **kwargs):
+        return CursorContador(self._cnx.cursor(*args, **kwargs), self._contador)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cnx, nombre)
+
+
+def render_anterior(contador):
+    for grupo in CONSULTAS_ANTERIORES:
+        conn = mysql.connector.connect(
+            host=Config.MYSQL_HOST,
+            user=Config.MYSQL_USER,
+            password=Config.MYSQL_PASSWORD,
+            database=Config.MYSQL_DB
+        )
+        contador['conexiones'] += 1
+        cursor = conn.cursor(dictionary=True)
+        for sql in grupo:
+            contador['consultas'] += 1
+            cursor.execute(sql)
+            cursor.fetchall()
+        cursor.close()
+        conn.close()
+
+
+def render_actual(contador):
+    obtener = dashboard.get_db_connection
+
+    def obtener_contando():
+        contador['conexiones'] += 1
+        return ConexionContador(obtener(), contador)
+
+    dashboard.get_db_connection = obtener_contando
+    dashboard_cache.invalidar()  # medir siempre la consulta, no la caché
+    try:
+        dashboard.get_dashboard_data()
+    finally:
+        dashboard.get_db_connection = obtener
+
+
+def medir(nombre, render, repeticiones):
+    contador = {'conexiones': 0, 'consultas': 0}
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        render(contador)
+    ms = (time.perf_counter() - inicio) * 1000 / repeticiones
+    print(f"{nombre:<10} {contador['conexiones'] / repeticiones:>10.1f} "
+          f"{contador['consultas'] / repeticiones:>10.1f} {ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    render_actual({'conexiones': 0, 'consultas': 0})  # calentar el pool
+    print(f"{'camino':<10} {'conexiones':>10} {'consultas':>10} {'ms/render':>10}")
+    medir('anterior', render_anterior, repeticiones)
+    medir('actual', render_actual, repeticiones)
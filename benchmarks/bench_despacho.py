@@ -0,0 +1,104 @@
+"""Benchmark: confirmar despachos de 10, 100 y 1.000 líneas.
+
+Compara el bucle anterior (una lectura y cinco escrituras por línea) con
+despachos.aplicar_despacho() (una sentencia por tabla vía app/stock.py). Crea un despacho de
+prueba con inventario existente y deshace todo con rollback al terminar cada
+medición. Necesita la base de datos configurada en .env con datos de ejemplo.
+
+    python -m benchmarks.bench_despacho [lineas ...]
+"""
+import sys
+import time
+from datetime import datetime
+
+from app.controllers.despachos import aplicar_despacho
+from app.db import obtener_conexion_pool
+from benchmarks.bench_dashboard import ConexionContador
+
+
+def preparar(cursor, lineas):
+    """Crear un despacho con `lineas` detalles sobre inventario existente"""
+    cursor.execute("SELECT id_proveedor FROM Proveedor LIMIT 1")
+    id_proveedor = cursor.fetchone()['id_proveedor']
+    cursor.execute("SELECT id_persona FROM Persona LIMIT 1")
+    id_persona = cursor.fetchone()['id_persona']
+    # Las líneas con más stock primero: el despacho no puede pedir más de lo que hay
+    cursor.execute("""
+        SELECT id_inventario, id_producto FROM Inventario
+        WHERE stock_producto > 0 ORDER BY stock_producto DESC LIMIT %s
+    """, (lineas,))
+    inventarios = cursor.fetchall()
+    if not inventarios:
+        raise SystemExit("❌ No hay inventario con stock para el benchmark")
+
+    cursor.execute("""
+        INSERT INTO Pedido_Despacho (numero_guia, fecha_solicitud, observaciones, id_proveedor, id_persona)
+        VALUES (%s, %s, %s, %s, %s)
+    """, ('BENCH-000000', datetime.now().date(), 'benchmark', id_proveedor, id_persona))
+    despacho = {'id_pedido_despacho': cursor.lastrowid, 'numero_guia': 'BENCH-000000', 'estado': 'En Preparación'}
+
+    # Si hay menos inventarios que líneas se repiten, como un pedido con varias líneas por ubicación
+    filas = [inventarios[i % len(inventarios)] for i in range(lineas)]
+    cursor.executemany("""
+        INSERT INTO Detalle_Despacho (id_pedido_despacho, id_producto, id_inventario, cantidad_solicitada)
+        VALUES (%s, %s, %s, %s)
+    """, [(despacho['id_pedido_despacho'], f['id_producto'], f['id_inventario'], 1) for f in filas])
+
+    cursor.execute("SELECT id_detalle_despacho FROM Detalle_Despacho WHERE id_pedido_despacho = %s",
+                   (despacho['id_pedido_despacho'],))
+    cantidades = {d['id_detalle_despacho']: 1 for d in cursor.fetchall()}
+    return despacho, cantidades, id_persona
+
+
+def confirmar_anterior(cursor, despacho, cantidades, id_persona):
+    """El bucle por línea que usaba despachos.confirmar"""
+    hoy = datetime.now().date()
+    for id_detalle, cantidad in cantidades.items():
+        cursor.execute("""
+            SELECT dd.*, inv.stock_producto, inv.id_estante, e.id_almacen
+            FROM Detalle_Despacho dd
+            LEFT JOIN Inventario inv ON dd.id_inventario = inv.id_inventario
+            LEFT JOIN Estante e ON inv.id_estante = e.id_estante
+            WHERE dd.id_detalle_despacho = %s
+        """, (id_detalle,))
+        detalle = cursor.fetchone()
+        cursor.execute("UPDATE Detalle_Despacho SET cantidad_despachada = %s WHERE id_detalle_despacho = %s",
+                       (cantidad, id_detalle))
+        cursor.execute("UPDATE Inventario SET stock_producto = %s, fecha_modificacion = %s WHERE id_inventario = %s",
+                       (max(detalle['stock_producto'] - cantidad, 0), hoy, detalle['id_inventario']))
+        cursor.execute("UPDATE Estante SET capacidad_ocupada = capacidad_ocupada - %s WHERE id_estante = %s",
+                       (cantidad, detalle['id_estante']))
+        cursor.execute("UPDATE Almacen SET capacidad_ocupada = capacidad_ocupada - %s WHERE id_almacen = %s",
+                       (cantidad, detalle['id_almacen']))
+        cursor.execute("""
+            INSERT INTO Movimiento_Producto (cantidad_producto, motivo, fecha_movimiento, id_persona, id_producto)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (cantidad, f'Despacho {despacho["numero_guia"]}', hoy, id_persona, detalle['id_producto']))
+
+
+def medir(conn, confirmar, lineas):
+    contador = {'consultas': 0}
+    cursor = conn.cursor(dictionary=True)
+    try:
+        despacho, cantidades, id_persona = preparar(cursor, lineas)
+        medido = ConexionContador(conn, contador).cursor(dictionary=True)
+        inicio = time.perf_counter()
+        confirmar(medido, despacho, cantidades, id_persona)
+        ms = (time.perf_counter() - inicio) * 1000
+    finally:
+        conn.rollback()
+        cursor.close()
+    return contador['consultas'], ms
+
+
+if __name__ == '__main__':
+    tamanos = [int(n) for n in sys.argv[1:]] or [10, 100, 1000]
+    conn = obtener_conexion_pool()
+    try:
+        print(f"{'líneas':>7} {'camino':<10} {'sentencias':>10} {'ms':>10}")
+        for lineas in tamanos:
+            for nombre, confirmar in (('anterior', confirmar_anterior), ('actual', aplicar_despacho)):
+                consultas, ms = medir(conn, confirmar, lineas)
+                print(f"{lineas:>7} {nombre:<10} {consultas:>10} {ms:>10.2f}")
+    finally:
+        conn.close()
@@ -0,0 +1,58 @@
+"""Benchmark: ruta de picking planificada contra el orden anterior (almacén, pasillo).
+
+Genera un almacén sintético (pasillos A..T con 40 posiciones, estantes
+"A-01"...) y listas de picking aleatorias. Mide la distancia estimada de
+cada orden con el mismo modelo de app/picking.py y el tiempo del planificador.
+No usa la base de datos.
+
+    python -m benchmarks.bench_picking [repeticiones]
+"""
+import random
+import statistics
+import string
+import sys
+import time
+
+from app.picking import construir_plano, planificar_ruta, longitud_ruta
+
+PASILLOS = string.ascii_uppercase[:20]
+POSICIONES = 40
+TAMANOS = [10, 50, 100, 500]
+
+ESTANTES = [
+    {'id_almacen': 1, 'id_estante': i, 'pasillo': f'{pasillo}-{posicion:02d}'}
+    for i, (pasillo, posicion) in enumerate((p, n) for p in PASILLOS for n in range(1, POSICIONES + 1))
+]
+
+
+def lista_picking(lineas):
+    return [
+        dict(random.choice(ESTANTES), nombre_almacen='Central', id_detalle_despacho=i)
+        for i in range(lineas)
+    ]
+
+
+def distancia_orden(detalles, plano):
+    return longitud_ruta([plano['estantes'][d['id_estante']] for d in detalles], plano['largo'])
+
+
+if __name__ == '__main__':
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    planos = construir_plano(ESTANTES)
+    plano = planos[1]
+
+    print(f"{'líneas':>7} {'anterior m':>11} {'ruta m':>9} {'ahorro':>7} {'ms/plan':>9}")
+    for lineas in TAMANOS:
+        anteriores, nuevas, tiempos = [], [], []
+        for _ in range(repeticiones):
+            detalles = lista_picking(lineas)
+            # Orden anterior: ORDER BY a.nombre_almacen, e.pasillo (texto)
+            anterior = sorted(detalles, key=lambda d: (d['nombre_almacen'], d['pasillo']))
+            inicio = time.perf_counter()
+            _, distancia = planificar_ruta(detalles, planos)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            anteriores.append(distancia_orden(anterior, plano))
+            nuevas.append(distancia)
+
+        a, n = statistics.mean(anteriores), statistics.mean(nuevas)
+        print(f"{lineas:>7} {a:>11.1f} {n:>9.1f} {(1 - n / a) * 100:>6.1f}% {statistics.median(tiempos):>9.2f}")
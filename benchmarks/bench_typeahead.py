@@ -0,0 +1,65 @@
+"""Benchmark: latencia del autocompletado de productos (app/typeahead.py).
+
+Carga el índice con un catálogo sintético (marcas y categorías al azar) y
+mide consultas de 1 a 3 palabras, incluidas las de 1-2 letras que van por
+prefijo. No usa la base de datos.
+
+    python -m benchmarks.bench_typeahead [productos]
+"""
+import random
+import string
+import sys
+import time
+
+from app.typeahead import IndiceProductos
+
+CATEGORIAS = ['Electrónica', 'Lácteos', 'Bebidas', 'Limpieza', 'Ferretería', 'Papelería', 'Panadería', 'Juguetería']
+CONSULTAS = 2_000
+
+
+class CatalogoSintetico:
+    """Cursor mínimo con el resultado de la consulta de IndiceProductos.cargar"""
+
+    def __init__(self, productos):
+        self.filas = [
+            {'id_producto': i, 'marca': self.marca(), 'nombre_categoria': random.choice(CATEGORIAS)}
+            for i in range(1, productos + 1)
+        ]
+
+    @staticmethod
+    def marca():
+        return ' '.join(''.join(random.choices(string.ascii_lowercase, k=random.randint(4, 9))).capitalize()
+                        for _ in range(random.randint(1, 2)))
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return self.filas
+
+
+if __name__ == '__main__':
+    productos = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    catalogo = CatalogoSintetico(productos)
+    indice = IndiceProductos(ttl=300)
+
+    inicio = time.perf_counter()
+    indice.cargar(catalogo)
+    print(f"Índice de {productos} productos cargado en {time.perf_counter() - inicio:.2f} s")
+
+    # Términos tomados del propio catálogo, cortados como los escribe un usuario
+    terminos = []
+    for _ in range(CONSULTAS):
+        fila = random.choice(catalogo.filas)
+        palabras = f"{fila['marca']} {fila['nombre_categoria']}".split()
+        terminos.append(' '.join(p[:random.randint(1, len(p))] for p in palabras[:random.randint(1, 3)]))
+
+    tiempos = []
+    for termino in terminos:
+        inicio = time.perf_counter()
+        indice.buscar(termino, 10)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+
+    print(f"{CONSULTAS} consultas: p50 {tiempos[len(tiempos) // 2]:.2f} ms, "
+          f"p99 {tiempos[int(len(tiempos) * 0.99)]:.2f} ms, máx {tiempos[-1]:.2f} ms")
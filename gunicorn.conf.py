@@ -0,0 +1,39 @@
+"""Configuración de Gunicorn para producción (gunicorn -c gunicorn.conf.py wsgi:app).
+
+Todos los valores se pueden ajustar con variables de entorno.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Procesos x hilos. Cada worker tiene su propio pool MySQL (app/db.py), así
+# que MYSQL_POOL_SIZE debe cubrir los hilos más DASHBOARD_WORKERS.
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# Importar la app una sola vez en el maestro: los workers comparten los
+# módulos por copy-on-write. create_app() no abre conexiones y el pool se
+# reinicia en cada hijo tras el fork.
+preload_app = True
+
+# Keep-alive detrás de un proxy (nginx): conexiones reutilizadas unos segundos
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+# Tiempo que un worker tiene para terminar sus peticiones en un reinicio
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Reciclar workers periódicamente (con desfase) para acotar la memoria
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+errorlog = os.getenv('GUNICORN_ERRORLOG', '-')
+
+
+def post_fork(server, worker):
+    """Cargar el índice del autocompletado en segundo plano apenas arranca el worker"""
+    from app.db import obtener_conexion_pool
+    from app.typeahead import indice_productos
+    indice_productos.iniciar(obtener_conexion_pool)
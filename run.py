@@ -1,6 +1,11 @@
 from app import create_app
+from app.config import Config
 
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Solo para desarrollo. En producción: gunicorn -c gunicorn.conf.py wsgi:app
+    print("✅ App Flask creada exitosamente")
+    print(f"   Base de datos: {Config.MYSQL_DB}")
+    print(f"   Host: {Config.MYSQL_HOST}")
+    app.run(debug=Config.DEBUG, host='0.0.0.0', port=5000)